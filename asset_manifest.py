@@ -0,0 +1,141 @@
+import os
+import time
+from typing import Dict, Any, List, Optional
+
+ASSETS_DIR = "assets"
+POSES = ["idle", "attack", "victory"]
+IMAGE_EXTENSIONS = [".png", ".jpg", ".gif"]
+
+# How often (seconds) lookups check the asset directories for changes
+MANIFEST_RECHECK_INTERVAL = 5.0
+
+# Global manifest storage
+_manifest = {
+    "exact": {},       # (category, pose, name) -> path
+    "prefix": {},      # (category, pose, prefix) -> path
+    "dir_mtimes": {},  # directory -> mtime when indexed
+    "built_at": 0.0,
+    "checked_at": 0.0
+}
+
+def _search_dirs() -> Dict[tuple, str]:
+    """Map (category, pose) to the directory holding those assets"""
+    dirs = {("pet", pose): os.path.join(ASSETS_DIR, "pets", pose) for pose in POSES}
+    dirs[("accessory", None)] = os.path.join(ASSETS_DIR, "accessories")
+    dirs[("background", None)] = os.path.join(ASSETS_DIR, "backgrounds")
+    dirs[("effect", None)] = os.path.join(ASSETS_DIR, "effects")
+    return dirs
+
+def normalize_name(name: str) -> str:
+    """Normalize an asset name for lookups"""
+    return name.strip().lower().replace(" ", "_")
+
+def _dir_mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def build_manifest() -> Dict[str, Any]:
+    """Scan the asset directories and rebuild the lookup indexes"""
+    exact = {}
+    prefix = {}
+    dir_mtimes = {}
+
+    for (category, pose), search_dir in _search_dirs().items():
+        dir_mtimes[search_dir] = _dir_mtime(search_dir)
+        try:
+            files = os.listdir(search_dir)
+        except OSError:
+            continue
+
+        # Prefer .png over .jpg over .gif, then alphabetical, so results are stable
+        images = []
+        for file in files:
+            stem, ext = os.path.splitext(file)
+            if ext.lower() in IMAGE_EXTENSIONS:
+                images.append((IMAGE_EXTENSIONS.index(ext.lower()), stem.lower(), file))
+        images.sort()
+
+        for _, stem, file in images:
+            path = os.path.join(search_dir, file)
+            exact.setdefault((category, pose, stem), path)
+
+            # Index prefixes of the whole stem and of each word in it,
+            # so "dragon" finds dragon_idle.png and "wings" finds rare_wings.png
+            for word in [stem] + stem.split("_")[1:]:
+                for end in range(1, len(word) + 1):
+                    prefix.setdefault((category, pose, word[:end]), path)
+
+    _manifest["exact"] = exact
+    _manifest["prefix"] = prefix
+    _manifest["dir_mtimes"] = dir_mtimes
+    _manifest["built_at"] = time.time()
+    _manifest["checked_at"] = time.time()
+    return _manifest
+
+def refresh_manifest(force: bool = False) -> None:
+    """Rebuild the manifest if any asset directory changed since it was built"""
+    now = time.time()
+    if not force and _manifest["built_at"] and now - _manifest["checked_at"] < MANIFEST_RECHECK_INTERVAL:
+        return
+    _manifest["checked_at"] = now
+
+    if force or not _manifest["built_at"]:
+        build_manifest()
+        return
+
+    for search_dir, mtime in _manifest["dir_mtimes"].items():
+        if _dir_mtime(search_dir) != mtime:
+            build_manifest()
+            return
+
+def lookup(category: str, name: str, pose: str = "idle") -> Optional[str]:
+    """Find the asset path for a name, trying an exact match and then a prefix match"""
+    refresh_manifest()
+    key = (category, pose if category == "pet" else None, normalize_name(name))
+    return _manifest["exact"].get(key) or _manifest["prefix"].get(key)
+
+def lookup_exact(category: str, name: str, pose: str = "idle") -> Optional[str]:
+    """Find the asset path whose file name matches exactly (ignoring extension)"""
+    refresh_manifest()
+    key = (category, pose if category == "pet" else None, normalize_name(name))
+    return _manifest["exact"].get(key)
+
+def list_assets(category: str, pose: str = None) -> List[str]:
+    """List every indexed asset path in a category (and pose, for pets)"""
+    refresh_manifest()
+    return sorted({path for (cat, asset_pose, _), path in _manifest["exact"].items()
+                   if cat == category and (pose is None or asset_pose == pose)})
+
+def validate_manifest(species: List[str]) -> Dict[str, Any]:
+    """Check which species poses and standard overlays have no art"""
+    refresh_manifest()
+    missing_species = {}
+    for name in species:
+        poses = [pose for pose in POSES if not lookup("pet", name, pose)]
+        if poses:
+            missing_species[name] = poses
+
+    required_overlays = [("accessory", "rare"), ("accessory", "mythic"),
+                         ("effect", "wounded"), ("effect", "happy")]
+    missing_overlays = [f"{category}:{name}" for category, name in required_overlays
+                        if not lookup(category, name)]
+
+    return {
+        "missing_species": missing_species,
+        "missing_overlays": missing_overlays,
+        "indexed_assets": len(_manifest["exact"])
+    }
+
+def format_validation_report(report: Dict[str, Any]) -> str:
+    """Format a validation report as readable text"""
+    lines = [f"Indexed {report['indexed_assets']} asset images"]
+    if report["missing_species"]:
+        for name, poses in report["missing_species"].items():
+            lines.append(f"Missing art for {name}: {', '.join(poses)}")
+    else:
+        lines.append("All species have idle, attack and victory art")
+    for overlay in report["missing_overlays"]:
+        lines.append(f"Missing overlay {overlay}")
+    return "\n".join(lines)
@@ -0,0 +1,220 @@
+import argparse
+import time
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from config import DOMAIN_EXPANSIONS, MAX_HEALTH, MOVES_BY_LEVEL
+from battle_engine import MAX_TURNS, get_available_moves, get_move_data
+from utils import RARITY_POOLS, RARITY_ORDER as RARITIES
+
+DEFAULT_LEVELS = sorted(MOVES_BY_LEVEL)
+DEFAULT_STRENGTHS = [5, 10, 15, 20, 25, 30, 35, 40, 50]
+
+# Upper bound on battles simulated at once, to keep the arrays around 100 MB
+MAX_BATCH = 2_000_000
+
+POLICIES = ["random", "greedy"]
+
+def build_grid(rarities: List[str] = None, levels: List[int] = None,
+               strengths: List[int] = None) -> List[Tuple[str, int, int]]:
+    """List every (rarity, level, strength) cell to simulate"""
+    return [(rarity, level, strength)
+            for rarity in rarities or RARITIES
+            for level in levels or DEFAULT_LEVELS
+            for strength in strengths or DEFAULT_STRENGTHS]
+
+def _cell_tables(grid: List[Tuple[str, int, int]], domain: bool) -> Dict[str, np.ndarray]:
+    """Build padded per-cell move tables (power, accuracy) plus strength and health ranges"""
+    move_lists = []
+    for rarity, level, _ in grid:
+        moves = [get_move_data(move) for move in get_available_moves(level)]
+        move_lists.append([(move["power"], move["accuracy"]) for move in moves])
+    width = max(len(moves) for moves in move_lists) + 1
+
+    power = np.zeros((len(grid), width))
+    accuracy = np.zeros((len(grid), width), dtype=np.int16)
+    count = np.zeros(len(grid), dtype=np.int16)
+    has_domain = np.zeros(len(grid), dtype=bool)
+    for i, moves in enumerate(move_lists):
+        power[i, :len(moves)] = [p for p, _ in moves]
+        accuracy[i, :len(moves)] = [a for _, a in moves]
+        count[i] = len(moves)
+        # Every mythic species has a domain expansion; it goes in the extra last slot
+        if domain and grid[i][0] == "mythic":
+            has_domain[i] = True
+            accuracy[i, len(moves)] = 100
+            count[i] += 1
+
+    # Greedy play picks the highest expected damage (power x hit chance) among normal moves;
+    # an unused domain expansion beats all of them
+    greedy = (power * accuracy / 100).argmax(axis=1)
+
+    return {
+        "power": power,
+        "accuracy": accuracy,
+        "count": count,
+        "has_domain": has_domain,
+        "greedy": greedy,
+        "strength": np.array([strength for _, _, strength in grid], dtype=float),
+        "health_low": np.array([RARITY_POOLS[rarity]["health"][0] for rarity, _, _ in grid]),
+        "health_high": np.array([RARITY_POOLS[rarity]["health"][1] for rarity, _, _ in grid])
+    }
+
+def simulate_battles(tables: Dict[str, np.ndarray], cells: np.ndarray, policy: str,
+                     rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Play out a batch of battles between cells[0] and cells[1]; returns (winner, turns)
+
+    winner is 0 (challenger), 1 (opponent) or -1 (draw at the turn limit)
+    """
+    battles = cells.shape[1]
+    domain_powers = np.array([data["power"] for data in DOMAIN_EXPANSIONS.values()], dtype=float)
+
+    hp = rng.integers(tables["health_low"][cells], tables["health_high"][cells] + 1).astype(float)
+    hp = np.minimum(hp, MAX_HEALTH)
+    strength = tables["strength"][cells]
+    # Each mythic pet is a random domain species, so it gets that species' domain power
+    domain_power = domain_powers[rng.integers(0, len(domain_powers), size=cells.shape)]
+
+    # Domain expansions can be used once per battle
+    domain_left = tables["has_domain"][cells]
+
+    winner = np.full(battles, -1, dtype=np.int8)
+    turns = np.full(battles, MAX_TURNS, dtype=np.int16)
+    active = np.arange(battles)
+
+    for turn in range(MAX_TURNS):
+        if active.size == 0:
+            break
+        side = turn % 2
+        attacker = cells[side, active]
+
+        # Pick each battle's move as an index into the attacker's move table
+        count = tables["count"][attacker]
+        can_domain = domain_left[side, active]
+        if policy == "greedy":
+            choice = np.where(can_domain, count - 1, tables["greedy"][attacker])
+        else:
+            # A used domain drops out of the choice (it's always the last slot)
+            usable = count - (tables["has_domain"][attacker] & ~can_domain)
+            choice = (rng.random(active.size) * usable).astype(np.int16)
+        is_domain = can_domain & (choice == count - 1)
+        domain_left[side, active[is_domain]] = False
+
+        # Accuracy roll (randint(1, 100) <= accuracy) and damage, as in battle_engine.apply_move
+        hit = rng.integers(1, 101, size=active.size) <= tables["accuracy"][attacker, choice]
+        scale = strength[side, active] / 20
+        damage = np.where(is_domain,
+                          domain_power[side, active] * scale,
+                          np.floor(tables["power"][attacker, choice] * scale))
+        target_hp = np.maximum(0, hp[1 - side, active] - damage * hit)
+        hp[1 - side, active] = target_hp
+
+        fainted = target_hp <= 0
+        winner[active[fainted]] = side
+        turns[active[fainted]] = turn + 1
+        active = active[~fainted]
+
+    return winner, turns
+
+def run_simulation(grid: List[Tuple[str, int, int]], battles: int = 200, policy: str = "random",
+                   domain: bool = True, seed: int = 0) -> Dict[str, Any]:
+    """Simulate every ordered pair of grid cells and collect win, draw and turn matrices"""
+    tables = _cell_tables(grid, domain)
+    rng = np.random.default_rng(seed)
+    size = len(grid)
+
+    wins = np.zeros(size * size)
+    draws = np.zeros(size * size)
+    total_turns = np.zeros(size * size)
+
+    # Simulate whole rows of the matrix per batch
+    pairs = np.arange(size * size)
+    pairs_per_batch = max(1, MAX_BATCH // battles)
+    for start in range(0, pairs.size, pairs_per_batch):
+        batch_pairs = np.repeat(pairs[start:start + pairs_per_batch], battles)
+        cells = np.stack([batch_pairs // size, batch_pairs % size])
+        winner, turns = simulate_battles(tables, cells, policy, rng)
+        wins += np.bincount(batch_pairs, weights=winner == 0, minlength=size * size)
+        draws += np.bincount(batch_pairs, weights=winner == -1, minlength=size * size)
+        total_turns += np.bincount(batch_pairs, weights=turns, minlength=size * size)
+
+    return {
+        "grid": grid,
+        "battles": battles,
+        "policy": policy,
+        "domain": domain,
+        "seed": seed,
+        # [challenger cell, opponent cell]
+        "win_probability": (wins / battles).reshape(size, size),
+        "draw_probability": (draws / battles).reshape(size, size),
+        "average_turns": (total_turns / battles).reshape(size, size)
+    }
+
+def summarize_by(results: Dict[str, Any], field: int) -> Tuple[List[Any], np.ndarray]:
+    """Average the win-probability matrix over one grid axis (0 rarity, 1 level, 2 strength)"""
+    labels = sorted({cell[field] for cell in results["grid"]}, key=lambda v: (RARITIES.index(v) if v in RARITIES else v))
+    groups = np.array([labels.index(cell[field]) for cell in results["grid"]])
+    matrix = np.zeros((len(labels), len(labels)))
+    for i in range(len(labels)):
+        for j in range(len(labels)):
+            matrix[i, j] = results["win_probability"][np.ix_(groups == i, groups == j)].mean()
+    return labels, matrix
+
+def format_matrix(labels: List[Any], matrix: np.ndarray, title: str) -> str:
+    """Format a square matrix with row and column labels"""
+    lines = [title, f"{'':>10}" + "".join(f"{str(label):>9}" for label in labels)]
+    for label, row in zip(labels, matrix):
+        lines.append(f"{str(label):>10}" + "".join(f"{value:>9.3f}" for value in row))
+    return "\n".join(lines)
+
+def save_results(results: Dict[str, Any], path: str) -> None:
+    """Save simulation results as a compressed .npz file"""
+    np.savez_compressed(
+        path,
+        grid=np.array([f"{rarity}:{level}:{strength}" for rarity, level, strength in results["grid"]]),
+        win_probability=results["win_probability"],
+        draw_probability=results["draw_probability"],
+        average_turns=results["average_turns"],
+        battles=results["battles"],
+        policy=results["policy"],
+        domain=results["domain"],
+        seed=results["seed"]
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Monte Carlo battle balance simulator")
+    parser.add_argument("--battles", type=int, default=200, help="Battles per ordered pair of grid cells")
+    parser.add_argument("--rarities", nargs="+", choices=RARITIES, default=RARITIES)
+    parser.add_argument("--levels", nargs="+", type=int, default=DEFAULT_LEVELS)
+    parser.add_argument("--strengths", nargs="+", type=int, default=DEFAULT_STRENGTHS)
+    parser.add_argument("--policy", choices=POLICIES, default="random", help="How both sides pick moves")
+    parser.add_argument("--no-domain", action="store_true", help="Don't give mythic pets their domain expansion")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Save the full matrices to this .npz file")
+    args = parser.parse_args()
+
+    grid = build_grid(args.rarities, args.levels, args.strengths)
+    started = time.perf_counter()
+    results = run_simulation(grid, args.battles, args.policy, not args.no_domain, args.seed)
+    elapsed = time.perf_counter() - started
+    total = len(grid) ** 2 * args.battles
+    print(f"Simulated {total:,} battles over {len(grid)} cells in {elapsed:.1f}s "
+          f"({total / elapsed:,.0f} battles/s)")
+
+    for field, name in [(0, "rarity"), (1, "level"), (2, "strength")]:
+        labels, matrix = summarize_by(results, field)
+        print()
+        print(format_matrix(labels, matrix, f"Challenger win probability by {name} (rows: challenger)"))
+
+    print()
+    print(f"Average battle length: {results['average_turns'].mean():.2f} turns, "
+          f"draws: {results['draw_probability'].mean() * 100:.2f}%")
+
+    if args.output:
+        save_results(results, args.output)
+        print(f"Saved matrices to {args.output}")
+
+if __name__ == "__main__":
+    # Usage: python balance_sim.py [--battles 500] [--policy greedy] [--output balance.npz]
+    main()
@@ -0,0 +1,254 @@
+import random
+from collections import namedtuple
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from config import (BASIC_MOVES, ADVANCED_MOVES, MOVES_BY_LEVEL, DOMAIN_EXPANSIONS,
+                    MAX_HEALTH, MAX_LEVEL, XP_PER_LEVEL)
+
+DOMAIN_MOVE = "DOMAIN EXPANSION"
+
+# Every move by a small integer id, so event logs and replays stay compact
+MOVE_LIST = list(BASIC_MOVES) + list(ADVANCED_MOVES) + [DOMAIN_MOVE]
+MOVE_IDS = {move: i for i, move in enumerate(MOVE_LIST)}
+NO_MOVE = -1
+
+# Event kinds
+EVENT_HIT = 0
+EVENT_MISS = 1
+EVENT_DOMAIN = 2
+EVENT_SKIP = 3
+EVENT_FORFEIT = 4
+
+# Battles where nobody lands a finishing blow end in a draw after this many turns
+MAX_TURNS = 200
+
+# Sides
+CHALLENGER = 0
+OPPONENT = 1
+SIDE_NAMES = ["challenger", "opponent"]
+
+# One entry in a battle's event log; hp is both pets' HP after the event
+BattleEvent = namedtuple("BattleEvent", ["turn", "side", "kind", "move", "damage", "hp1", "hp2"])
+
+# A policy picks a move name for a side from its legal moves (None skips the turn)
+MovePolicy = Callable[[Dict[str, Any], int, List[str]], Optional[str]]
+
+def get_available_moves(level: int) -> List[str]:
+    """Get available moves for the given level"""
+    moves = []
+    for req_level, level_moves in MOVES_BY_LEVEL.items():
+        if level >= req_level:
+            moves.extend(level_moves)
+    return moves
+
+def get_move_data(move: str) -> Dict[str, Any]:
+    """Get a normal move's power and accuracy"""
+    return BASIC_MOVES.get(move, ADVANCED_MOVES.get(move))
+
+def domain_damage(state: Dict[str, Any], side: int) -> float:
+    """Damage a side's domain expansion would deal"""
+    domain_data = DOMAIN_EXPANSIONS[state["pets"][side]["species"]]
+    return domain_data["power"] * (state["strength"][side] / 20)
+
+def expected_damage(state: Dict[str, Any], side: int, move: str) -> float:
+    """Average damage of a move, accounting for its hit chance"""
+    if move == DOMAIN_MOVE:
+        return domain_damage(state, side)
+    move_data = get_move_data(move)
+    return int(move_data["power"] * (state["strength"][side] / 20)) * move_data["accuracy"] / 100
+
+def new_battle(pet1: Dict[str, Any], pet2: Dict[str, Any], seed: int = None,
+               domain: Tuple[bool, bool] = (False, False)) -> Dict[str, Any]:
+    """Set up a battle; domain says which side may use its domain expansion"""
+    if seed is None:
+        seed = random.getrandbits(32)
+
+    moves = []
+    for pet, allowed in zip((pet1, pet2), domain):
+        pet_moves = get_available_moves(pet.get("level", 1))
+        if allowed and pet["species"] in DOMAIN_EXPANSIONS:
+            pet_moves.append(DOMAIN_MOVE)
+        moves.append(pet_moves)
+
+    return {
+        "pets": (pet1, pet2),
+        "seed": seed,
+        "rng": random.Random(seed),
+        # Policies draw from their own stream, so seed and moves alone replay the combat rolls
+        "policy_rng": random.Random(f"{seed}:policy"),
+        "max_hp": [pet1["health"], pet2["health"]],
+        "hp": [pet1["health"], pet2["health"]],
+        "strength": [pet1["strength"], pet2["strength"]],
+        "moves": moves,
+        "side": CHALLENGER,
+        "turn": 0,
+        "events": [],
+        "forfeited": None
+    }
+
+def is_over(state: Dict[str, Any]) -> bool:
+    """Check whether a pet has fainted, a side forfeited or the turn limit was reached"""
+    return (state["hp"][0] <= 0 or state["hp"][1] <= 0 or state["forfeited"] is not None
+            or state["turn"] >= MAX_TURNS)
+
+def apply_move(state: Dict[str, Any], move: Optional[str]) -> BattleEvent:
+    """Resolve the current side's move (None skips the turn) and pass the turn over"""
+    side = state["side"]
+    target = 1 - side
+    hp = state["hp"]
+    strength = state["strength"][side]
+
+    if move is None:
+        kind, damage = EVENT_SKIP, 0
+    elif move == DOMAIN_MOVE:
+        # Domain expansions always land, and only once per battle
+        kind, damage = EVENT_DOMAIN, domain_damage(state, side)
+        state["moves"][side] = [m for m in state["moves"][side] if m != DOMAIN_MOVE]
+    else:
+        move_data = get_move_data(move)
+        if state["rng"].randint(1, 100) <= move_data["accuracy"]:
+            kind, damage = EVENT_HIT, int(move_data["power"] * (strength / 20))
+        else:
+            kind, damage = EVENT_MISS, 0
+
+    hp[target] = max(0, hp[target] - damage)
+    event = BattleEvent(state["turn"], side, kind, MOVE_IDS.get(move, NO_MOVE), damage, hp[0], hp[1])
+    state["events"].append(event)
+    state["side"] = target
+    state["turn"] += 1
+    return event
+
+def forfeit(state: Dict[str, Any], side: int) -> BattleEvent:
+    """End the battle with one side giving up"""
+    state["forfeited"] = side
+    event = BattleEvent(state["turn"], side, EVENT_FORFEIT, NO_MOVE, 0, state["hp"][0], state["hp"][1])
+    state["events"].append(event)
+    return event
+
+def get_winner(state: Dict[str, Any]) -> str:
+    """Get "challenger", "opponent" or "draw" for a finished battle"""
+    if state["forfeited"] is not None:
+        return SIDE_NAMES[1 - state["forfeited"]]
+    if state["hp"][0] <= 0:
+        return "opponent"
+    if state["hp"][1] <= 0:
+        return "challenger"
+    return "draw"
+
+def get_result(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarise a finished battle"""
+    return {
+        "winner": get_winner(state),
+        "turns": state["turn"],
+        "hp": list(state["hp"]),
+        "seed": state["seed"],
+        "events": state["events"]
+    }
+
+def add_experience(pet: Dict[str, Any], xp: int, rng: random.Random = random) -> None:
+    """Add experience to a pet and handle leveling up"""
+    current_level = pet.get("level", 1)
+    current_xp = pet.get("xp", 0)
+
+    # Add XP
+    new_xp = current_xp + xp
+    xp_needed = current_level * XP_PER_LEVEL
+
+    # Check for level up
+    while new_xp >= xp_needed and current_level < MAX_LEVEL:
+        new_xp -= xp_needed
+        current_level += 1
+        xp_needed = current_level * XP_PER_LEVEL
+
+        # Increase stats on level up
+        pet["health"] = min(MAX_HEALTH, pet["health"] + rng.randint(5, 10))
+        pet["strength"] = min(50, pet["strength"] + rng.randint(2, 5))
+
+    # Update pet
+    pet["level"] = current_level
+    pet["xp"] = new_xp
+
+def settle_battle(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Write a finished battle's HP and XP back to both pets and return the result"""
+    result = get_result(state)
+    pet1, pet2 = state["pets"]
+
+    # Ensure pets don't faint completely
+    pet1["health"] = max(1, state["hp"][0])
+    pet2["health"] = max(1, state["hp"][1])
+
+    # Level-up stat rolls come from the battle's RNG so settling is reproducible too
+    add_experience(pet1, 50 if result["winner"] == "challenger" else 25, state["rng"])
+    add_experience(pet2, 50 if result["winner"] == "opponent" else 25, state["rng"])
+    return result
+
+def first_move_policy(state: Dict[str, Any], side: int, moves: List[str]) -> Optional[str]:
+    """Always use the first move"""
+    return moves[0]
+
+def random_policy(state: Dict[str, Any], side: int, moves: List[str]) -> Optional[str]:
+    """Pick a move at random with the battle's policy RNG"""
+    return state["policy_rng"].choice(moves)
+
+def greedy_policy(state: Dict[str, Any], side: int, moves: List[str]) -> Optional[str]:
+    """Use the move with the highest expected damage"""
+    return max(moves, key=lambda move: expected_damage(state, side, move))
+
+def domain_timing_policy(state: Dict[str, Any], side: int, moves: List[str]) -> Optional[str]:
+    """Play greedy, but save the domain expansion for a finishing blow or a last stand"""
+    normal_moves = [move for move in moves if move != DOMAIN_MOVE]
+    if DOMAIN_MOVE not in moves:
+        return greedy_policy(state, side, moves)
+    if not normal_moves:
+        return DOMAIN_MOVE
+
+    target = 1 - side
+    # Finish the opponent off when the domain alone is enough
+    if domain_damage(state, side) >= state["hp"][target]:
+        return DOMAIN_MOVE
+
+    # Use it now if the opponent's hardest hit could knock this pet out next turn
+    strongest = max(int(get_move_data(move)["power"] * (state["strength"][target] / 20))
+                    for move in state["moves"][target] if move != DOMAIN_MOVE)
+    if DOMAIN_MOVE in state["moves"][target]:
+        strongest = max(strongest, domain_damage(state, target))
+    if strongest >= state["hp"][side]:
+        return DOMAIN_MOVE
+
+    return greedy_policy(state, side, normal_moves)
+
+# Move policies by name, for commands and simulations that take a policy setting
+POLICIES = {
+    "first": first_move_policy,
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "domain_timing": domain_timing_policy
+}
+
+def describe_event(state: Dict[str, Any], event: BattleEvent) -> str:
+    """Describe one event as a line of play-by-play text"""
+    pet = state["pets"][event.side]
+    max_hp = state["max_hp"]
+    hp = f"({event.hp1:g}/{max_hp[0]} vs {event.hp2:g}/{max_hp[1]})"
+    if event.kind == EVENT_SKIP:
+        return f"Turn {event.turn + 1}: {pet['name']} hesitated and lost the turn {hp}"
+    if event.kind == EVENT_FORFEIT:
+        return f"Turn {event.turn + 1}: {pet['name']} forfeited the battle {hp}"
+    if event.kind == EVENT_DOMAIN:
+        domain_name = DOMAIN_EXPANSIONS[pet["species"]]["name"]
+        return f"Turn {event.turn + 1}: {pet['name']} unleashed {domain_name} for {event.damage:g} damage! {hp}"
+    move = MOVE_LIST[event.move]
+    if event.kind == EVENT_HIT:
+        return f"Turn {event.turn + 1}: {pet['name']} used {move} for {event.damage:g} damage {hp}"
+    return f"Turn {event.turn + 1}: {pet['name']} used {move} but missed {hp}"
+
+def run_battle(pet1: Dict[str, Any], pet2: Dict[str, Any], policy: MovePolicy = random_policy,
+               seed: int = None, domain: Tuple[bool, bool] = (False, False),
+               policy2: MovePolicy = None) -> Dict[str, Any]:
+    """Run a whole battle without any I/O; the same pets, policies and seed give the same log"""
+    state = new_battle(pet1, pet2, seed, domain)
+    policies = (policy, policy2 or policy)
+    while not is_over(state):
+        side = state["side"]
+        apply_move(state, policies[side](state, side, state["moves"][side]))
+    return get_result(state)
@@ -0,0 +1,187 @@
+import asyncio
+import itertools
+import time
+from typing import Dict, Any, List, Optional, Awaitable
+
+from config import (MAX_BATTLES, MAX_BATTLES_PER_GUILD, MAX_BATTLES_PER_CHANNEL,
+                    BATTLE_IDLE_TIMEOUT)
+
+# How often the reaper looks for abandoned battles
+REAP_INTERVAL = 15
+
+# Ways a battle can be stopped before a pet faints
+STOP_FORFEIT = "forfeit"
+STOP_CANCEL = "cancelled"
+STOP_IDLE = "idle"
+
+# Global battle registry storage
+_battles: Dict[int, Dict[str, Any]] = {}   # battle id -> battle
+_by_channel: Dict[int, set] = {}           # channel id -> battle ids
+_by_guild: Dict[int, set] = {}             # guild id -> battle ids
+_by_user: Dict[str, int] = {}              # user id -> battle id
+_by_pet: Dict[str, int] = {}               # pet key -> battle id
+_ids = itertools.count(1)
+_stats = {
+    "started": 0,
+    "finished": 0,
+    "rejected": 0,
+    STOP_FORFEIT: 0,
+    STOP_CANCEL: 0,
+    STOP_IDLE: 0,
+    "reclaimed": 0
+}
+
+def pet_key(user_id: str, pet: Dict[str, Any]) -> str:
+    """Key a pet by its owner and name, like the domain expansion cooldowns"""
+    return f"{user_id}_{pet['name']}"
+
+def check_battle_slots(guild_id: Optional[int], channel_id: int, user_ids: List[str],
+                       pet_keys: List[str]) -> Optional[str]:
+    """Explain why a battle can't start right now, or return None if it can"""
+    reason = None
+    if any(user_id in _by_user for user_id in user_ids):
+        reason = "One of you is already in a battle! Finish it or use `!forfeit` first."
+    elif any(key in _by_pet for key in pet_keys):
+        reason = "That pet is already fighting in another battle!"
+    elif len(_battles) >= MAX_BATTLES:
+        reason = "Too many battles are running right now. Try again in a moment!"
+    elif guild_id is not None and len(_by_guild.get(guild_id, ())) >= MAX_BATTLES_PER_GUILD:
+        reason = f"This server already has {MAX_BATTLES_PER_GUILD} battles running. Try again in a moment!"
+    elif len(_by_channel.get(channel_id, ())) >= MAX_BATTLES_PER_CHANNEL:
+        reason = "This channel is busy with battles. Try another channel or wait a moment!"
+    if reason:
+        _stats["rejected"] += 1
+    return reason
+
+def register_battle(guild_id: Optional[int], channel_id: int, user_ids: List[str],
+                    pet_keys: List[str]) -> Dict[str, Any]:
+    """Record a battle that passed check_battle_slots; the calling task becomes its owner"""
+    battle = {
+        "id": next(_ids),
+        "guild_id": guild_id,
+        "channel_id": channel_id,
+        "user_ids": list(user_ids),
+        "pet_keys": list(pet_keys),
+        "task": asyncio.current_task(),
+        "waiter": None,        # the pending wait for player input, if any
+        "stopped": None,       # (reason, side that gave up or None) once stopped early
+        "started": time.monotonic(),
+        "last_input": time.monotonic(),
+        "side": 0              # whose turn it is; the idle reaper makes them forfeit
+    }
+    _battles[battle["id"]] = battle
+    _by_channel.setdefault(channel_id, set()).add(battle["id"])
+    if guild_id is not None:
+        _by_guild.setdefault(guild_id, set()).add(battle["id"])
+    for user_id in user_ids:
+        _by_user[user_id] = battle["id"]
+    for key in pet_keys:
+        _by_pet[key] = battle["id"]
+    _stats["started"] += 1
+    return battle
+
+def end_battle(battle: Dict[str, Any]) -> None:
+    """Remove a finished or stopped battle from the registry"""
+    if _battles.pop(battle["id"], None) is None:
+        return
+    for index, key in [(_by_channel, battle["channel_id"]), (_by_guild, battle["guild_id"])]:
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(battle["id"])
+            if not ids:
+                del index[key]
+    for user_id in battle["user_ids"]:
+        if _by_user.get(user_id) == battle["id"]:
+            del _by_user[user_id]
+    for key in battle["pet_keys"]:
+        if _by_pet.get(key) == battle["id"]:
+            del _by_pet[key]
+    _stats["finished"] += 1
+
+def get_user_battle(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get the battle a user is in, if any"""
+    battle_id = _by_user.get(user_id)
+    return _battles.get(battle_id) if battle_id is not None else None
+
+def get_channel_battles(channel_id: int) -> List[Dict[str, Any]]:
+    """Get every battle running in a channel"""
+    return [_battles[battle_id] for battle_id in _by_channel.get(channel_id, ())]
+
+def note_input(battle: Dict[str, Any]) -> None:
+    """Record player input, which keeps the battle off the reaper's list"""
+    battle["last_input"] = time.monotonic()
+
+def is_pet_battling(key: str) -> bool:
+    """Check whether a pet is in a running battle"""
+    return key in _by_pet
+
+def stop_battle(battle: Dict[str, Any], reason: str, side: Optional[int] = None) -> None:
+    """Stop a battle early; side is the one that forfeits (None when nobody wins)"""
+    if battle["stopped"] is not None:
+        return
+    battle["stopped"] = (reason, side)
+    _stats[reason] += 1
+    # Wake the battle up if it's waiting on a move so it can wrap up right away
+    if battle["waiter"] is not None:
+        battle["waiter"].cancel()
+
+async def wait_for_input(battle: Dict[str, Any], awaitable: Awaitable) -> Any:
+    """Wait for player input; returns None if the battle was stopped meanwhile
+
+    Timeouts from the awaitable are raised as usual.
+    """
+    # A stop that landed while the last turn was rendering has no waiter to wake
+    if battle["stopped"] is not None:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        return None
+    waiter = asyncio.ensure_future(awaitable)
+    battle["waiter"] = waiter
+    try:
+        await asyncio.wait({waiter})
+    finally:
+        battle["waiter"] = None
+        if not waiter.done():
+            waiter.cancel()
+    if waiter.cancelled():
+        return None
+    return waiter.result()
+
+def reap_battles(now: float = None) -> int:
+    """Stop idle battles and drop ones whose coroutine died; returns how many were reclaimed"""
+    now = now if now is not None else time.monotonic()
+    reclaimed = 0
+    for battle in list(_battles.values()):
+        task = battle["task"]
+        if task is not None and task.done():
+            # The battle's coroutine ended without cleaning up (it crashed or was cancelled)
+            end_battle(battle)
+            reclaimed += 1
+        elif battle["stopped"] is None and now - battle["last_input"] > BATTLE_IDLE_TIMEOUT:
+            # Whoever was supposed to move walked away; they forfeit
+            stop_battle(battle, STOP_IDLE, battle["side"])
+            reclaimed += 1
+    _stats["reclaimed"] += reclaimed
+    return reclaimed
+
+async def battle_reaper_task() -> None:
+    """Background task: reclaim abandoned battles so coroutines and memory stay bounded"""
+    while True:
+        await asyncio.sleep(REAP_INTERVAL)
+        try:
+            reclaimed = reap_battles()
+            if reclaimed:
+                print(f"Reclaimed {reclaimed} abandoned battle{'s' if reclaimed != 1 else ''}")
+        except Exception as e:
+            print(f"Error reaping battles: {e}")
+
+def get_battle_stats() -> Dict[str, Any]:
+    """Get active battle counts and how battles ended"""
+    return dict(_stats, active=len(_battles), channels=len(_by_channel), guilds=len(_by_guild))
+
+def format_battle_stats() -> str:
+    """Format battle statistics as one line"""
+    stats = get_battle_stats()
+    return (f"{stats['active']} active in {stats['channels']} channels, {stats['started']} started, "
+            f"{stats[STOP_FORFEIT]} forfeited, {stats[STOP_CANCEL]} cancelled, "
+            f"{stats[STOP_IDLE]} idle, {stats['rejected']} rejected")
@@ -0,0 +1,128 @@
+import asyncio
+from collections import deque
+from typing import Dict, List, Optional
+
+import discord
+
+import outbound
+from outbound import route_interval, PRIORITY_INTERACTIVE, PRIORITY_ANIMATION
+
+# Bounds on the time between two frames of the same battle message
+MIN_FRAME_INTERVAL = 1.0
+MAX_FRAME_INTERVAL = 8.0
+
+# Seconds of animation a battle may play per move; frames that don't fit are dropped,
+# so a busy channel gets exactly one edit per turn
+ANIMATION_BUDGET = 1.0
+DOMAIN_ANIMATION_BUDGET = 3.0
+
+# Recent events shown in the battle log field
+LOG_LINES = 4
+
+HP_BAR_WIDTH = 10
+
+# Battles currently shown per channel; they share the channel's edit bucket
+_views: Dict[int, int] = {}
+
+def frame_interval(channel_id: int) -> float:
+    """Seconds between frames of one battle message, given how busy its channel is"""
+    share = route_interval("edit", channel_id) * max(1, _views.get(channel_id, 0))
+    return min(MAX_FRAME_INTERVAL, max(MIN_FRAME_INTERVAL, share))
+
+def hp_bar_text(hp: float, max_hp: float, width: int = HP_BAR_WIDTH) -> str:
+    """Draw remaining HP as a bar of block characters"""
+    filled = round(width * max(0, hp) / max(1, max_hp))
+    if hp > 0:
+        filled = max(1, filled)
+    return "█" * filled + "░" * (width - filled)
+
+def pick_frames(frames: List[str], count: int) -> List[str]:
+    """Pick count evenly spaced frames, always keeping the last one"""
+    if count <= 0:
+        return []
+    if count >= len(frames):
+        return list(frames)
+    step = len(frames) / count
+    return [frames[len(frames) - 1 - int(i * step)] for i in reversed(range(count))]
+
+class BattleView:
+    """A whole battle shown in one message; each turn's changes are folded into a single edit"""
+
+    def __init__(self, channel, title: str, color: int = 0xFF0000):
+        self.channel = channel
+        self.channel_id = channel.id
+        self.title = title
+        self.color = color
+        self.message = None
+        self.image_url = None
+        self.banner = ""
+        self.arena = ""
+        self.log = deque(maxlen=LOG_LINES)
+        self.prompt = None  # (field name, field text) for the move menu
+        self.footer = None
+        self.edits = 0
+        self.dropped_frames = 0
+
+    def set_arena(self, pets, hp, max_hp) -> None:
+        """Show both pets' current HP"""
+        lines = [f"{pet['name'][:14]:<14} {hp_bar_text(current, maximum)} {current:g}/{maximum}"
+                 for pet, current, maximum in zip(pets, hp, max_hp)]
+        self.arena = "```\n" + "\n".join(lines) + "\n```"
+
+    def add_log(self, line: str) -> None:
+        """Add a line to the battle log"""
+        self.log.append(line)
+
+    def build_embed(self) -> discord.Embed:
+        """Build the embed for the current frame"""
+        embed = discord.Embed(title=self.title, description=f"{self.banner}\n{self.arena}".strip(), color=self.color)
+        if self.log:
+            embed.add_field(name="Battle Log", value="\n".join(self.log)[-1024:], inline=False)
+        if self.prompt:
+            embed.add_field(name=self.prompt[0], value=self.prompt[1][:1024], inline=False)
+        if self.image_url:
+            embed.set_image(url=self.image_url)
+        if self.footer:
+            embed.set_footer(text=self.footer)
+        return embed
+
+    async def start(self, file: Optional[discord.File] = None) -> None:
+        """Send the battle message, with the battle scene attached if there is one"""
+        _views[self.channel_id] = _views.get(self.channel_id, 0) + 1
+        embed = self.build_embed()
+        if file:
+            embed.set_image(url=f"attachment://{file.filename}")
+            self.message = await outbound.send(self.channel, embed=embed, file=file)
+            # Later edits point at the uploaded copy instead of re-uploading it
+            if self.message.embeds and self.message.embeds[0].image.url:
+                self.image_url = self.message.embeds[0].image.url
+        else:
+            self.message = await outbound.send(self.channel, embed=embed)
+
+    async def flush(self, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Edit the message with the current frame, superseding any animation frame still queued"""
+        try:
+            await outbound.edit(self.message, priority=priority, embed=self.build_embed())
+        except discord.NotFound:
+            # The battle message was deleted; carry on in a new one
+            self.message = await outbound.send(self.channel, embed=self.build_embed())
+        except discord.HTTPException as e:
+            print(f"Error updating battle message: {e}")
+        self.edits += 1
+
+    async def animate(self, frames: List[str], final: str, budget: float = ANIMATION_BUDGET) -> None:
+        """Play as many frames as fit in the time budget, then leave final for the next edit"""
+        interval = frame_interval(self.channel_id)
+        shown = pick_frames(frames, int(budget / interval))
+        self.dropped_frames += len(frames) - len(shown)
+        for frame in shown:
+            self.banner = frame
+            # Frames the channel can't fit in time are merged into the next one by the scheduler
+            outbound.edit_later(self.message, priority=PRIORITY_ANIMATION, embed=self.build_embed())
+            await asyncio.sleep(interval)
+        # The final frame is folded into the turn's edit rather than sent on its own
+        self.banner = final
+
+    def close(self) -> None:
+        """Stop counting this battle against its channel's frame rate"""
+        _views[self.channel_id] = max(0, _views.get(self.channel_id, 0) - 1)
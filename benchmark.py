@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+from typing import Dict, Any, List, Optional, Callable
+
+import numpy as np
+import PIL
+from PIL import Image
+
+from config import SPECIES, COLORS
+import utils
+from overlays import clear_overlay_cache
+from fonts import clear_text_cache
+from render_cache import clear_render_cache
+from image_encoder import get_encode_stats
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    # Not available on Windows; peak RSS is reported as None there
+    RESOURCE_AVAILABLE = False
+
+RARITIES = ["common", "rare", "mythic"]
+
+# "None" covers pets whose trait has no visual effect
+BENCHMARK_TRAITS = [None] + sorted(utils.TRAIT_EFFECTS)
+
+# Health/happiness cycled through so the wounded and happy overlays get rendered too
+STAT_VARIANTS = [(100, 50), (20, 50), (90, 95)]
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+def build_combinations() -> List[Dict[str, Any]]:
+    """Build one pet per species, color, rarity and trait combination"""
+    pets = []
+    for i, (species, color, rarity, trait) in enumerate(
+            itertools.product(SPECIES, COLORS, RARITIES, BENCHMARK_TRAITS)):
+        health, happiness = STAT_VARIANTS[i % len(STAT_VARIANTS)]
+        trait_word = trait.capitalize() if trait else "Plain"
+        pets.append({
+            "name": f"{color} {trait_word} {species}",
+            "species": species,
+            "color": color,
+            "trait": trait_word,
+            "health": health,
+            "happiness": happiness,
+            "strength": 20,
+            "rarity": rarity,
+            "level": 1,
+            "xp": 0
+        })
+    return pets
+
+def _output_bytes(result: Any) -> int:
+    """Size of a stage's output: encoded bytes for uploads, raw pixel bytes for images"""
+    if result is None:
+        return 0
+    if isinstance(result, Image.Image):
+        return len(result.mode) * result.width * result.height
+    return len(result.fp.getbuffer())
+
+def _peak_rss_kb() -> Optional[int]:
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _stage_pet_image(loop, pet, opponent):
+    return loop.run_until_complete(utils.generate_pet_image(pet))
+
+def _stage_load_pet_image(loop, pet, opponent):
+    return loop.run_until_complete(utils.load_pet_image(pet))
+
+def _stage_trait_effect(loop, pet, opponent):
+    img = loop.run_until_complete(utils.load_pet_image(pet))
+    return utils.apply_trait_effect(img, pet["trait"]) if img is not None else None
+
+def _stage_battle_image(loop, pet, opponent):
+    return loop.run_until_complete(utils.generate_battle_image(pet, opponent))
+
+# Stage name -> render function(loop, pet, opponent)
+STAGES: Dict[str, Callable] = {
+    "generate_pet_image": _stage_pet_image,
+    "load_pet_image": _stage_load_pet_image,
+    "apply_trait_effect": _stage_trait_effect,
+    "generate_battle_image": _stage_battle_image
+}
+
+def run_stage(name: str, pets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Render every pet through one stage and summarise latency, memory and output size"""
+    render = STAGES[name]
+    loop = asyncio.new_event_loop()
+
+    # Start each stage cold so its first cache misses are part of the numbers
+    clear_overlay_cache()
+    clear_text_cache()
+    clear_render_cache()
+
+    timings = []
+    output_bytes = []
+    failures = 0
+    rss_before = _peak_rss_kb()
+    try:
+        for i, pet in enumerate(pets):
+            # Battles pair each combination with the next one so every pet appears on both sides
+            opponent = pets[(i + 1) % len(pets)]
+            started = time.perf_counter()
+            result = render(loop, pet, opponent)
+            timings.append((time.perf_counter() - started) * 1000)
+            if result is None:
+                failures += 1
+            output_bytes.append(_output_bytes(result))
+    finally:
+        loop.close()
+
+    rss_after = _peak_rss_kb()
+    timings = np.array(timings)
+    output_bytes = np.array(output_bytes)
+    return {
+        "count": len(pets),
+        "failures": failures,
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "mean_ms": round(float(timings.mean()), 3),
+        "max_ms": round(float(timings.max()), 3),
+        "total_s": round(float(timings.sum()) / 1000, 3),
+        "peak_rss_kb": rss_after,
+        "peak_rss_growth_kb": rss_after - rss_before if rss_after is not None else None,
+        "output_bytes_avg": int(output_bytes.mean()),
+        "output_bytes_max": int(output_bytes.max()),
+        "output_bytes_total": int(output_bytes.sum())
+    }
+
+def run_benchmark(stages: List[str] = None, sample: int = None, seed: int = 0) -> Dict[str, Any]:
+    """Run the selected stages over every combination (or a seeded sample of them)"""
+    pets = build_combinations()
+    total = len(pets)
+    if sample and sample < total:
+        pets = random.Random(seed).sample(pets, sample)
+
+    results = {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "combinations": total,
+        "rendered": len(pets),
+        "seed": seed,
+        "stages": {}
+    }
+    for name in stages or list(STAGES):
+        print(f"Running {name} over {len(pets)} pets...")
+        results["stages"][name] = run_stage(name, pets)
+    results["encoding"] = get_encode_stats()
+    return results
+
+def format_results(results: Dict[str, Any]) -> str:
+    """Format benchmark results as a table"""
+    lines = [f"{'stage':<24}{'p50 ms':>10}{'p95 ms':>10}{'peak RSS MB':>13}{'avg KB':>10}{'fail':>6}"]
+    for name, stage in results["stages"].items():
+        rss = f"{stage['peak_rss_kb'] / 1024:.1f}" if stage["peak_rss_kb"] is not None else "n/a"
+        lines.append(f"{name:<24}{stage['p50_ms']:>10.2f}{stage['p95_ms']:>10.2f}{rss:>13}"
+                     f"{stage['output_bytes_avg'] / 1024:>10.1f}{stage['failures']:>6}")
+    return "\n".join(lines)
+
+def _change(old: Optional[float], new: Optional[float]) -> str:
+    if old is None or new is None:
+        return "n/a"
+    if not old:
+        return f"{new:+.2f}"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any]) -> str:
+    """Format the change in each stage's numbers between two benchmark runs"""
+    lines = [f"{'stage':<24}{'p50':>10}{'p95':>10}{'peak RSS':>10}{'bytes':>10}"]
+    for name, stage in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if old is None:
+            lines.append(f"{name:<24}{'(not in baseline)':>40}")
+            continue
+        lines.append(f"{name:<24}{_change(old['p50_ms'], stage['p50_ms']):>10}"
+                     f"{_change(old['p95_ms'], stage['p95_ms']):>10}"
+                     f"{_change(old['peak_rss_kb'], stage['peak_rss_kb']):>10}"
+                     f"{_change(old['output_bytes_avg'], stage['output_bytes_avg']):>10}")
+    if baseline.get("rendered") != current.get("rendered"):
+        lines.append(f"Note: baseline rendered {baseline.get('rendered')} pets, this run rendered {current.get('rendered')}")
+    return "\n".join(lines)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark pet image rendering")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="Stages to run (default: all)")
+    parser.add_argument("--sample", type=int, help="Render a seeded random sample instead of every combination")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --sample")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to save the JSON results")
+    parser.add_argument("--compare", help="Earlier results JSON to compare this run against")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.stages, args.sample, args.seed)
+    print(format_results(results))
+
+    try:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Saved results to {args.output}")
+    except Exception as e:
+        print(f"Error saving benchmark results: {e}")
+
+    if args.compare:
+        try:
+            with open(args.compare, "r") as f:
+                baseline = json.load(f)
+        except Exception as e:
+            print(f"Error loading baseline {args.compare}: {e}")
+            return
+        print(f"\nChange vs {args.compare}:")
+        print(compare_results(baseline, results))
+
+if __name__ == "__main__":
+    # Usage: python benchmark.py [--sample 200] [--compare benchmark_results.json]
+    main()
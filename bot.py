@@ -1,15 +1,34 @@
-import discord
-from discord.ext import commands
 import os
 import asyncio
 import random
 import logging
+import time
 from datetime import datetime
 
+# Time each import so slow startups can be traced to a module
+from startup import (phase, record_phase, elapsed_ms, finish_startup, format_startup_profile,
+                     load_startup_baseline, save_startup_baseline, find_startup_regressions)
+
+with phase("import discord"):
+    import discord
+    from discord.ext import commands
+
 # Import our custom modules
-from config import DISCORD_TOKEN, validate_config
-from database import load_data, auto_backup_task
-from utils import create_embed
+with phase("import config"):
+    from config import DISCORD_TOKEN, validate_config
+    from config import SPECIES
+with phase("import database"):
+    from database import load_data, auto_backup_task, get_all_pets
+    from replay_store import load_replays
+    from pedigree import load_pedigree
+with phase("import battle"):
+    from battle_registry import battle_reaper_task
+    import dispatcher
+with phase("import utils"):
+    from utils import create_embed, render_pet_image
+    from render_cache import warm_render_cache, note_activity
+    from asset_manifest import build_manifest, validate_manifest, format_validation_report
+    from sprite_atlas import load_atlas
 
 # Configure logging
 logging.basicConfig(
@@ -28,11 +47,16 @@ intents.message_content = True
 intents.members = True
 bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
 
+# Replies the cogs wait on are routed by channel, user and message instead of bot.wait_for
+bot.add_listener(dispatcher.on_message)
+bot.add_listener(dispatcher.on_reaction_add)
+
 # Cogs to load
 COGS = [
     "cogs.pet_commands",
     "cogs.shop_commands",
-    "cogs.admin_commands"
+    "cogs.admin_commands",
+    "cogs.tournament_commands"
 ]
 
 @bot.event
@@ -40,19 +64,70 @@ async def on_ready():
     """Event: Bot is ready"""
     logger.info(f"{bot.user} has connected to Discord!")
     
+    # on_ready also fires after reconnects; startup work only runs once
+    if finish_startup():
+        record_phase("gateway connect", (time.perf_counter() - _connect_started[0]) * 1000)
+        log_startup_profile()
+        
+        # Start auto-backup task
+        bot.loop.create_task(auto_backup_task())
+        
+        # Reclaim battles abandoned mid-fight
+        bot.loop.create_task(battle_reaper_task())
+        
+        # Load the sprite atlas, then pre-render common pet portraits, in the background
+        bot.loop.create_task(prepare_renders())
+    
     # Set bot activity
     await bot.change_presence(activity=discord.Game(name="!help | Virtual Pet Breeder"))
     
-    # Load data
-    load_data()
-    
-    # Start auto-backup task
-    bot.loop.create_task(auto_backup_task())
-    
     # Print info
     logger.info(f"Connected to {len(bot.guilds)} servers")
     logger.info(f"Bot is ready at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
+# perf_counter() when bot.start() was called
+_connect_started = [time.perf_counter()]
+
+def log_startup_profile():
+    """Log per-phase startup times and compare them with the recorded baseline"""
+    logger.info(f"Startup took {elapsed_ms():.0f} ms to reach the gateway")
+    for line in format_startup_profile().splitlines():
+        logger.info(f"Startup: {line}")
+    
+    baseline = load_startup_baseline()
+    if not baseline:
+        # The first profiled start becomes the baseline later starts are compared with
+        save_startup_baseline()
+        logger.info("Recorded startup baseline")
+        return
+    for regression in find_startup_regressions(baseline):
+        logger.warning(f"Startup regression: {regression}")
+
+def prepare_assets():
+    """Index assets, report missing art and load the sprite atlas"""
+    build_manifest()
+    for line in format_validation_report(validate_manifest(SPECIES)).splitlines():
+        logger.info(f"Assets: {line}")
+    
+    # Load (or rebuild) the pre-scaled sprite atlas; renders resize sprites until it's ready
+    load_atlas()
+
+async def prepare_renders():
+    """Background task: prepare assets and fill the render cache after a restart"""
+    started = datetime.now()
+    await bot.loop.run_in_executor(None, prepare_assets)
+    logger.info(f"Assets ready in {(datetime.now() - started).total_seconds():.1f}s")
+    
+    started = datetime.now()
+    warmed = await warm_render_cache(get_all_pets(), render_pet_image)
+    logger.info(f"Render cache warmed with {warmed} portraits in {(datetime.now() - started).total_seconds():.1f}s")
+
+@bot.event
+async def on_command(ctx):
+    """Event: a command is about to run"""
+    # Live commands take priority over the render cache warmer
+    note_activity()
+
 @bot.event
 async def on_guild_join(guild):
     """Event: Bot joins a new server"""
@@ -175,7 +250,8 @@ async def load_cogs():
     """Load all cogs"""
     for cog in COGS:
         try:
-            await bot.load_extension(cog)
+            with phase(f"cog {cog}"):
+                await bot.load_extension(cog)
             logger.info(f"Loaded cog: {cog}")
         except Exception as e:
             logger.error(f"Error loading cog {cog}: {e}")
@@ -198,12 +274,19 @@ async def main():
         with open("cogs/__init__.py", "w") as f:
             f.write("# This file is required to make the cogs directory a Python package")
     
+    # Load saved data before any command can run
+    with phase("load data"):
+        load_data()
+        load_replays()
+        load_pedigree()
+    
     # Load cogs
     logger.info("Loading cogs...")
     await load_cogs()
 
 # Run the bot
     logger.info("Starting bot...")
+    _connect_started[0] = time.perf_counter()
     try:
         async with bot:
             await bot.start(DISCORD_TOKEN)
@@ -1,14 +1,24 @@
 from discord.ext import commands
-from utils import create_embed, generate_pet_image, generate_battle_image, generate_pet
+from utils import create_embed, generate_pet_image, generate_battle_image, generate_pet, generate_pets, event_rng
 import asyncio
 import discord
 import random
 from datetime import datetime, timedelta
 from typing import Optional
-from config import ADMIN_IDS
+from config import ADMIN_IDS, SPECIES, MAX_PETS, EVENT_RARITY_WEIGHTS
+from image_encoder import format_encode_stats
+from render_cache import format_render_cache_stats
+import outbound
+from outbound import PRIORITY_BULK, format_scheduler_stats
+from battle_registry import get_channel_battles, stop_battle, format_battle_stats, STOP_CANCEL
+from dispatcher import wait_for_reaction, format_dispatcher_stats
+from replay_store import format_replay_stats
+from matchmaking import format_matchmaking_stats
+from pedigree import format_pedigree_stats
+from asset_manifest import refresh_manifest, validate_manifest, format_validation_report
 from database import (get_user_pets, set_user_pets, get_user_coins, 
                      set_user_coins, add_user_coins, get_user_inventory,
-                     add_to_inventory, remove_from_inventory, _data)
+                     add_to_inventory, remove_from_inventory, add_pets_bulk, _data)
 
 class AdminCommands(commands.Cog):
     def __init__(self, bot):
@@ -30,8 +40,8 @@ class AdminCommands(commands.Cog):
             fields=[
                 ("User Management", "`!listusers` - List all users\n`!viewuser <user>` - View user details\n`!resetuser <user>` - Reset user data", False),
                 ("Economy", "`!givecoins <user> <amount>` - Give coins to user\n`!giveitem <user> <item> <amount>` - Give item to user", False),
-                ("Pet Management", "`!givepet <user> <rarity>` - Give pet to user\n`!setlevel <user> <pet_num> <level>` - Set pet level\n`!heal <user> <pet_num>` - Heal pet", False),
-                ("System", "`!broadcast <message>` - Broadcast message\n`!stats` - View bot statistics", False)
+                ("Pet Management", "`!givepet <user> <rarity>` - Give pet to user\n`!eventpets <per_user> [rarity|mixed] [seed]` - Give pets to the whole server\n`!setlevel <user> <pet_num> <level>` - Set pet level\n`!heal <user> <pet_num>` - Heal pet", False),
+                ("System", "`!broadcast <message>` - Broadcast message\n`!stats` - View bot statistics\n`!assetcheck` - Report missing pet art\n`!cancelbattles` - Cancel battles in this channel", False)
             ]
         )
         await ctx.send(embed=embed)
@@ -96,11 +106,65 @@ class AdminCommands(commands.Cog):
         )
         
         if pet_image:
-            embed.set_image(url="attachment://pet.png")
+            embed.set_image(url=f"attachment://{pet_image.filename}")
             await ctx.send(embed=embed, file=pet_image)
         else:
             await ctx.send(embed=embed)
 
+    @commands.command(name="eventpets")
+    @commands.guild_only()
+    async def event_pets(self, ctx, per_user: int = 1, rarity: str = "mixed", seed: Optional[int] = None):
+        """Give every member of the server up to per_user event pets in one batch"""
+        rarity = rarity.lower()
+        if rarity == "mixed":
+            weights = EVENT_RARITY_WEIGHTS
+        elif rarity in ["common", "rare", "mythic"]:
+            weights = {rarity: 1.0}
+        else:
+            await ctx.send("Invalid rarity! Use common, rare, mythic, or mixed.")
+            return
+        if per_user <= 0:
+            await ctx.send("Pets per user must be positive!")
+            return
+
+        # Nobody is pushed past MAX_PETS; members with full collections are skipped
+        slots = {}
+        for member in ctx.guild.members:
+            if member.bot:
+                continue
+            free = min(per_user, MAX_PETS - len(get_user_pets(str(member.id))))
+            if free > 0:
+                slots[str(member.id)] = free
+        if not slots:
+            await ctx.send("Everyone here already has a full collection!")
+            return
+
+        # The seed is reported so an event's pets can be generated again exactly
+        seed = seed if seed is not None else random.getrandbits(63)
+        total = sum(slots.values())
+        loop = asyncio.get_running_loop()
+        pets = await loop.run_in_executor(None, generate_pets, total, weights, event_rng(seed))
+
+        new_pets, start = {}, 0
+        for user_id, count in sorted(slots.items()):
+            new_pets[user_id] = pets[start:start + count]
+            start += count
+        add_pets_bulk(new_pets)
+
+        counts = {name: sum(1 for pet in pets if pet["rarity"] == name) for name in ["common", "rare", "mythic"]}
+        embed = create_embed(
+            title="🎉 Event Pets Given!",
+            description=f"Gave {total} pets to {len(slots)} members!",
+            color=0x00FF00,
+            fields=[
+                ("Common", str(counts["common"]), True),
+                ("Rare", str(counts["rare"]), True),
+                ("Mythic", str(counts["mythic"]), True),
+                ("Seed", str(seed), False)
+            ]
+        )
+        await ctx.send(embed=embed)
+
     @commands.command(name="giveitem")
     async def give_item(self, ctx, user: discord.Member, item: str, amount: int = 1):
         """Give an item to a user"""
@@ -199,18 +263,17 @@ class AdminCommands(commands.Cog):
                 ("Message", message, False)
             ]
         )
-        confirm_msg = await ctx.send(embed=embed)
+        confirm_msg = await outbound.send(ctx, embed=embed)
         
-        await confirm_msg.add_reaction("✅")
-        await confirm_msg.add_reaction("❌")
+        await outbound.add_reaction(confirm_msg, "✅")
+        await outbound.add_reaction(confirm_msg, "❌")
         
+        # The dispatcher only hands this check the author's reactions on the confirmation
         def check(reaction, reactor):
-            return (reactor == ctx.author and 
-                    reaction.message.id == confirm_msg.id and 
-                    str(reaction.emoji) in ["✅", "❌"])
+            return str(reaction.emoji) in ["✅", "❌"]
                     
         try:
-            reaction, _ = await self.bot.wait_for("reaction_add", timeout=30.0, check=check)
+            reaction, _ = await wait_for_reaction(ctx.channel.id, ctx.author.id, confirm_msg.id, 30.0, check)
             
             if str(reaction.emoji) == "✅":
                 broadcast_embed = create_embed(
@@ -219,20 +282,21 @@ class AdminCommands(commands.Cog):
                     color=0x9B59B6
                 )
                 
-                successful = 0
+                # Queue every guild at bulk priority; the scheduler paces them against the
+                # global bucket and keeps headroom for interactive replies
+                sends = []
                 failed = 0
-                
                 for guild in self.bot.guilds:
-                    try:
-                        # Try to find system channel or general
-                        channel = guild.system_channel or discord.utils.get(guild.text_channels, name="general")
-                        if channel and channel.permissions_for(guild.me).send_messages:
-                            await channel.send(embed=broadcast_embed)
-                            successful += 1
-                        else:
-                            failed += 1
-                    except:
+                    # Try to find system channel or general
+                    channel = guild.system_channel or discord.utils.get(guild.text_channels, name="general")
+                    if channel and channel.permissions_for(guild.me).send_messages:
+                        sends.append(outbound.send(channel, embed=broadcast_embed, priority=PRIORITY_BULK))
+                    else:
                         failed += 1
+                
+                results = await asyncio.gather(*sends, return_exceptions=True)
+                successful = sum(1 for result in results if not isinstance(result, Exception))
+                failed += len(results) - successful
                         
                 await ctx.send(f"Broadcast complete! Sent to {successful} servers. Failed: {failed}")
             else:
@@ -260,12 +324,46 @@ class AdminCommands(commands.Cog):
                 ("Total Users", str(total_members), True),
                 ("Total Pets", str(total_pets), True),
                 ("Total Coins", str(total_coins), True),
-                ("Active Users", str(len(_data["pets"])), True)
+                ("Active Users", str(len(_data["pets"])), True),
+                ("Image Encoding", format_encode_stats(), False),
+                ("Render Cache", format_render_cache_stats(), False),
+                ("Outbound Queue", format_scheduler_stats(), False),
+                ("Battles", format_battle_stats(), False),
+                ("Interaction Waiters", format_dispatcher_stats(), False),
+                ("Replays", format_replay_stats(), False),
+                ("Matchmaking", format_matchmaking_stats(), False),
+                ("Pedigree", format_pedigree_stats(), False)
             ]
         )
         
         await ctx.send(embed=embed)
 
+    @commands.command(name="cancelbattles")
+    async def cancel_battles(self, ctx):
+        """Cancel every battle running in this channel"""
+        battles = get_channel_battles(ctx.channel.id)
+        if not battles:
+            await ctx.send("No battles are running in this channel.")
+            return
+            
+        # Each battle wraps itself up without a winner
+        for battle in battles:
+            stop_battle(battle, STOP_CANCEL)
+        await ctx.send(f"Cancelled {len(battles)} battle{'s' if len(battles) != 1 else ''}.")
+
+    @commands.command(name="assetcheck")
+    async def asset_check(self, ctx):
+        """Report species and overlays that have no art"""
+        refresh_manifest(force=True)
+        report = validate_manifest(SPECIES)
+        
+        embed = create_embed(
+            title="Asset Report",
+            description=f"```\n{format_validation_report(report)}\n```",
+            color=0xFFA500 if report["missing_species"] or report["missing_overlays"] else 0x00FF00
+        )
+        await ctx.send(embed=embed)
+
 # Setup function for the cog
 async def setup(bot):
     await bot.add_cog(AdminCommands(bot)) 
\ No newline at end of file
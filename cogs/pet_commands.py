@@ -2,16 +2,34 @@ import discord
 from discord.ext import commands
 import random
 from typing import Dict, Any, Optional, List
-import time
 import asyncio
 import io
 from datetime import datetime, timedelta
 
-from config import MAX_PETS, SHOP_ITEMS, MAX_HEALTH, MAX_LEVEL, XP_PER_LEVEL, BASIC_MOVES, ADVANCED_MOVES, MOVES_BY_LEVEL, DOMAIN_EXPANSIONS
+from config import MAX_PETS, SHOP_ITEMS, DOMAIN_EXPANSIONS, AUTO_BATTLE_POLICY, PVE_DIFFICULTIES, MAX_MISSED_TURNS, MATCH_WINDOW_START, MATCH_WIDEN_INTERVAL, PEDIGREE_MAX_GENERATIONS
 from database import (get_user_pets, set_user_pets, get_user_coins, 
                      set_user_coins, add_user_coins, get_user_inventory,
                      add_to_inventory, remove_from_inventory, _data)
-from utils import generate_pet, format_pet_info, calculate_fight_rewards, create_embed, generate_pet_image, generate_battle_image, load_pet_image
+from battle_engine import (new_battle, apply_move, is_over, settle_battle, get_available_moves,
+                           get_move_data, add_experience, MOVE_LIST, NO_MOVE, DOMAIN_MOVE,
+                           EVENT_SKIP, EVENT_DOMAIN, EVENT_HIT, EVENT_MISS, CHALLENGER, OPPONENT,
+                           POLICIES, random_policy, domain_timing_policy, describe_event,
+                           forfeit, get_result)
+from battle_registry import (pet_key, check_battle_slots, register_battle, end_battle, get_user_battle,
+                             note_input, is_pet_battling, stop_battle, wait_for_input, STOP_FORFEIT)
+from utils import generate_pet, format_pet_info, calculate_fight_rewards, create_embed, generate_pet_image, generate_battle_image, load_pet_image, generate_gallery_image
+from battle_view import BattleView, DOMAIN_ANIMATION_BUDGET
+import outbound
+from outbound import PRIORITY_ANIMATION
+from dispatcher import wait_for_message, wait_for_reaction
+from matchmaking import enqueue, dequeue, get_entry, queue_size, sweep_queue, get_rating, update_ratings
+from genetics import breed, preview_breeding
+from pedigree import record_birth, child_inbreeding, inbreeding, get_ancestors, format_pedigree
+from replay_store import (save_replay, get_replay, rebuild_battle, get_user_replays, get_pet_replays,
+                          KIND_BATTLE, KIND_AUTO, KIND_PVE, KIND_NAMES)
+
+# Play-by-play lines shown in a replay's embed; the full log is attached
+LOG_TAIL = 8
 
 class PetCommands(commands.Cog):
     def __init__(self, bot):
@@ -19,6 +37,7 @@ class PetCommands(commands.Cog):
         self.pending_trades = {}  # Store pending trades
         self.pending_fights = {}  # Store pending fights
         self.domain_cooldowns = {}  # Store cooldowns for domain expansion
+        self.matchmaker = None  # Task widening queue windows while anyone is waiting
 
     @commands.command(name="adopt")
     async def adopt_pet(self, ctx):
@@ -52,7 +71,7 @@ class PetCommands(commands.Cog):
         try:
             pet_image = await generate_pet_image(new_pet)
             if pet_image:
-                embed.set_image(url="attachment://pet.png")
+                embed.set_image(url=f"attachment://{pet_image.filename}")
                 await ctx.send(embed=embed, file=pet_image)
             else:
                 await ctx.send(embed=embed)
@@ -88,40 +107,37 @@ class PetCommands(commands.Cog):
             )
             
         # Send initial list without images
-        await ctx.send(embed=embed)
+        await outbound.send(ctx, embed=embed)
         
         # Ask if user wants to see pet images
         if len(pets) > 0:
-            view_msg = await ctx.send("Would you like to see your pet images? React with 🖼️ to view.")
-            await view_msg.add_reaction("🖼️")
+            view_msg = await outbound.send(ctx, "Would you like to see your pet images? React with 🖼️ to view.")
+            await outbound.add_reaction(view_msg, "🖼️")
             
+            # The dispatcher only hands this check reactions from this user on this message
             def check(reaction, user):
-                return user == ctx.author and str(reaction.emoji) == "🖼️" and reaction.message.id == view_msg.id
+                return str(reaction.emoji) == "🖼️"
                 
             try:
-                await self.bot.wait_for("reaction_add", timeout=30.0, check=check)
+                await wait_for_reaction(ctx.channel.id, ctx.author.id, view_msg.id, 30.0, check)
                 
-                # User wants to see pet images
-                for i, pet in enumerate(pets):
-                    try:
-                        pet_image = await generate_pet_image(pet)
-                        if pet_image:
-                            pet_embed = create_embed(
-                                title=f"Pet #{i+1}: {pet['name']}",
-                                description=f"Health: {pet['health']}, Happiness: {pet['happiness']}, Strength: {pet['strength']}\nRarity: {pet.get('rarity', 'Common').capitalize()}",
-                                color=0x3498db
-                            )
-                            pet_embed.set_image(url="attachment://pet.png")
-                            await ctx.send(embed=pet_embed, file=pet_image)
-                        else:
-                            await ctx.send(f"Could not generate image for {pet['name']}")
-                    except Exception as e:
-                        print(f"Error generating pet image: {e}")
-                        await ctx.send(f"Error showing image for {pet['name']}")
+                # User wants to see pet images - one contact sheet, one upload
+                gallery = await generate_gallery_image(pets)
+                if gallery:
+                    gallery_embed = create_embed(
+                        title=f"{ctx.author.name}'s Pets",
+                        description=f"{len(pets)} pet{'s' if len(pets) != 1 else ''}",
+                        color=0x3498db
+                    )
+                    gallery_embed.set_image(url=f"attachment://{gallery.filename}")
+                    await outbound.send(ctx, embed=gallery_embed, file=gallery)
+                else:
+                    await outbound.send(ctx, "Could not generate your pet gallery.")
                         
             except asyncio.TimeoutError:
-                await view_msg.edit(content="Image view request timed out.")
-                await view_msg.clear_reactions()
+                # Nobody is waiting on the cleanup, so it yields to interactive replies
+                await outbound.edit(view_msg, priority=PRIORITY_ANIMATION, content="Image view request timed out.")
+                await outbound.clear_reactions(view_msg, priority=PRIORITY_ANIMATION)
 
     @commands.command(name="feed")
     async def feed_pet(self, ctx, pet_num: int):
@@ -173,38 +189,18 @@ class PetCommands(commands.Cog):
         parent1 = pets[pet1 - 1]
         parent2 = pets[pet2 - 1]
         
-        # Extract traits from pet names
-        p1_traits = parent1["name"].split()
-        p2_traits = parent2["name"].split()
-        
-        # Create hybrid pet
-        hybrid_color = random.choice([p1_traits[0], p2_traits[0]])
-        hybrid_trait = random.choice([p1_traits[1], p2_traits[1]])
-        hybrid_species = random.choice([p1_traits[2], p2_traits[2]])
-        
-        # Determine rarity - chance for upgrade
-        rarity1 = parent1.get("rarity", "common")
-        rarity2 = parent2.get("rarity", "common")
-        rarity_upgrade_chance = 0.2  # 20% chance for rarity upgrade
-        
-        if rarity1 == "mythic" or rarity2 == "mythic":
-            new_rarity = "mythic" if random.random() < 0.4 else "rare"
-        elif rarity1 == "rare" and rarity2 == "rare":
-            new_rarity = "mythic" if random.random() < rarity_upgrade_chance else "rare"
-        elif rarity1 == "rare" or rarity2 == "rare":
-            new_rarity = "rare" if random.random() < 0.6 else "common"
-        else:
-            new_rarity = "rare" if random.random() < rarity_upgrade_chance else "common"
-            
-        # Create new pet with averaged stats and possible bonus
-        new_pet = {
-            "name": f"{hybrid_color} {hybrid_trait} {hybrid_species}",
-            "health": min(100, (parent1["health"] + parent2["health"]) // 2 + random.randint(0, 10)),
-            "happiness": min(100, (parent1["happiness"] + parent2["happiness"]) // 2 + random.randint(0, 10)),
-            "strength": min(50, (parent1["strength"] + parent2["strength"]) // 2 + random.randint(0, 5)),
-            "rarity": new_rarity,
-            "created_at": time.time()
-        }
+        if is_pet_battling(pet_key(user_id, parent1)) or is_pet_battling(pet_key(user_id, parent2)):
+            await ctx.send("You can't breed a pet in the middle of a battle!")
+            return
+        
+        # Inheritance, rarity and stats all come from the parents' genomes
+        try:
+            new_pet = breed(parent1, parent2)
+        except ValueError as e:
+            await ctx.send(str(e))
+            return
+        inbreeding_coefficient = child_inbreeding(parent1, parent2)
+        record_birth(new_pet, parent1, parent2)
         
         # Check if at max pets capacity
         if len(pets) >= MAX_PETS:
@@ -238,7 +234,76 @@ class PetCommands(commands.Cog):
         embed.add_field(name="Happiness", value=str(new_pet['happiness']), inline=True)
         embed.add_field(name="Strength", value=str(new_pet['strength']), inline=True)
         embed.add_field(name="Rarity", value=new_pet['rarity'].capitalize(), inline=True)
+        if inbreeding_coefficient > 0:
+            embed.add_field(name="Inbreeding", value=f"{inbreeding_coefficient:.1%} - its parents are related!", inline=False)
+        
+        await ctx.send(embed=embed)
+
+    @commands.command(name="breedpreview")
+    async def breed_preview(self, ctx, pet1: int, pet2: int):
+        """Show the odds of what breeding two of your pets would give"""
+        user_id = str(ctx.author.id)
+        pets = get_user_pets(user_id)
         
+        if not (1 <= pet1 <= len(pets) and 1 <= pet2 <= len(pets)) or pet1 == pet2:
+            await ctx.send(f"Invalid pet numbers! You have {len(pets)} pets.")
+            return
+        
+        parent1 = pets[pet1 - 1]
+        parent2 = pets[pet2 - 1]
+        try:
+            preview = preview_breeding(parent1, parent2)
+        except ValueError as e:
+            await ctx.send(str(e))
+            return
+        
+        def odds_text(odds):
+            return "\n".join(f"{str(value).capitalize()}: {chance:.1%}" for value, chance in odds)
+        
+        stats = "\n".join(f"{stat.capitalize()}: {preview[stat][0]}-{preview[stat][1]} (avg {preview[stat][2]:.1f})"
+                          for stat in ("health", "happiness", "strength"))
+        embed = create_embed(
+            title="Breeding Preview",
+            description=f"{parent1['name']} × {parent2['name']}",
+            color=0xFFA500,
+            fields=[
+                ("Rarity", odds_text(preview["rarity"]), True),
+                ("Species", odds_text(preview["species"]), True),
+                ("Color", odds_text(preview["color"]), True),
+                ("Trait", odds_text(preview["trait"]), True),
+                ("Stats", stats, True)
+            ]
+        )
+        inbreeding_coefficient = child_inbreeding(parent1, parent2)
+        if inbreeding_coefficient > 0:
+            embed.add_field(name="⚠️ Related Parents", value=f"Inbreeding coefficient {inbreeding_coefficient:.1%}", inline=False)
+        embed.set_footer(text=f"Use !breed {pet1} {pet2} to breed them")
+        await ctx.send(embed=embed)
+
+    @commands.command(name="pedigree")
+    async def show_pedigree(self, ctx, pet_num: int, generations: int = 3):
+        """Show a pet's family tree"""
+        pets = get_user_pets(str(ctx.author.id))
+        if not 1 <= pet_num <= len(pets):
+            await ctx.send(f"Invalid pet number! You have {len(pets)} pets.")
+            return
+        
+        pet = pets[pet_num - 1]
+        if "id" not in pet:
+            await ctx.send(f"**{pet['name']}** has no recorded family. Pets get one when they're bred or become parents.")
+            return
+        
+        generations = max(1, min(generations, PEDIGREE_MAX_GENERATIONS))
+        tree = format_pedigree(pet["id"], generations)
+        embed = create_embed(
+            title=f"{pet['name']}'s Pedigree",
+            description=f"```\n{tree[:4000]}\n```",
+            color=0xFFA500,
+            fields=[
+                ("Known Ancestors", str(len(get_ancestors(pet["id"]))), True),
+                ("Inbreeding", f"{inbreeding(pet['id']):.1%}", True)
+            ]
+        )
         await ctx.send(embed=embed)
 
     @commands.command(name="release")
@@ -255,6 +320,10 @@ class PetCommands(commands.Cog):
             await ctx.send(f"Invalid pet number! You have {len(pets)} pets.")
             return
             
+        if is_pet_battling(pet_key(user_id, pets[pet_num - 1])):
+            await ctx.send("You can't release a pet in the middle of a battle!")
+            return
+            
         released_pet = pets.pop(pet_num - 1)
         set_user_pets(user_id, pets)
         
@@ -282,31 +351,23 @@ class PetCommands(commands.Cog):
         
         await ctx.send(embed=embed)
 
-    async def animate_domain_expansion(self, ctx, pet, domain_data):
-        """Create an enhanced animated sequence for domain expansion"""
+    async def animate_domain_expansion(self, view, pet, domain_data):
+        """Play the domain expansion animation in the battle message"""
         # Initial power-up animation
         power_up_frames = [
             "```\n   ⚡   \n  ⚡⚡  \n ⚡🔮⚡ \n  ⚡⚡  \n   ⚡   ```",
             "```\n   💫   \n  💫💫  \n 💫🔮💫 \n  💫💫  \n   💫   ```",
             "```\n   ✨   \n  ✨✨  \n ✨🔮✨ \n  ✨✨  \n   ✨   ```"
         ]
-        
-        msg = await ctx.send(f"**{pet['name']}** begins to channel immense power...")
-        for frame in power_up_frames:
-            await msg.edit(content=f"**{pet['name']}** channels their power...\n{frame}")
-            await asyncio.sleep(0.7)
+        frames = [f"**{pet['name']}** channels their power...\n{frame}" for frame in power_up_frames]
         
         # Domain announcement with dramatic effect
-        announcement = [
+        frames += [
             "```\n╔══════════════╗\n║ D O M A I N ║\n║              ║\n║ EXPANSION!! ║\n╚══════════════╝```",
             "```\n╔══════════════╗\n║⚡D O M A I N⚡║\n║   ══════    ║\n║⚡EXPANSION!!⚡║\n╚══════════════╝```",
             "```\n╔══════════════╗\n║💫D O M A I N💫║\n║   ══════    ║\n║💫EXPANSION!!💫║\n╚══════════════╝```"
         ]
         
-        for frame in announcement:
-            await msg.edit(content=frame)
-            await asyncio.sleep(0.8)
-        
         # Domain specific animation
         domain_frames = []
         if pet['species'] == "Dragon":
@@ -333,13 +394,7 @@ class PetCommands(commands.Cog):
                 "```\n🌪️  🦅  🌪️\n ⚡🦅⚡ \n  🌪️🌪️  ```",
                 "```\n⛈️  🦅  ⛈️\n 🌪️🦅🌪️ \n  ⚡⚡  ```"
             ]
-        
-        # Animate domain frames
-        await msg.edit(content=f"**{domain_data['name']}**")
-        for _ in range(2):
-            for frame in domain_frames:
-                await msg.edit(content=f"**{domain_data['name']}**\n{frame}")
-                await asyncio.sleep(0.6)
+        frames += [f"**{domain_data['name']}**\n{frame}" for frame in domain_frames]
         
         # Final impact animation
         impact_frames = [
@@ -347,12 +402,11 @@ class PetCommands(commands.Cog):
             "```\n  ⚡⚡⚡  \n ⚡⚡⚡⚡ \n⚡⚡⚡⚡⚡\n ⚡⚡⚡⚡ \n  ⚡⚡⚡  ```",
             "```\n  ✨✨✨  \n ✨✨✨✨ \n✨✨✨✨✨\n ✨✨✨✨ \n  ✨✨✨  ```"
         ]
+        frames += [f"**{domain_data['name']}**\n{frame}" for frame in impact_frames]
         
-        for frame in impact_frames:
-            await msg.edit(content=f"**{domain_data['name']}**\n{frame}\n{domain_data['description']}")
-            await asyncio.sleep(0.5)
-        
-        return msg
+        # Busy channels get fewer frames; the impact stays up until the next turn
+        final = f"**{domain_data['name']}**\n{impact_frames[-1]}\n{domain_data['description']}"
+        await view.animate(frames, final, DOMAIN_ANIMATION_BUDGET)
 
     async def can_use_domain_expansion(self, user_id: str, pet: Dict[str, Any]) -> bool:
         """Check if a pet can use domain expansion"""
@@ -370,37 +424,40 @@ class PetCommands(commands.Cog):
                 
         return True
 
-    @commands.command(name="fight")
-    async def fight(self, ctx, opponent: discord.Member, pet_num: int = 1):
-        """Start a battle with another user's pet"""
+    async def challenge_opponent(self, ctx, opponent: discord.Member, pet_num: int, title: str):
+        """Challenge another user and wait for them to pick a pet
+
+        Returns (challenger pet index, opponent pet index), or None if the challenge fell through
+        """
         if opponent.bot:
             await ctx.send("You can't fight with a bot!")
-            return
+            return None
             
         if opponent == ctx.author:
             await ctx.send("You can't fight with yourself!")
-            return
+            return None
             
-        challenger_id = str(ctx.author.id)
-        opponent_id = str(opponent.id)
-        
         # Get pets
-        challenger_pets = get_user_pets(challenger_id)
-        opponent_pets = get_user_pets(opponent_id)
+        challenger_pets = get_user_pets(str(ctx.author.id))
+        opponent_pets = get_user_pets(str(opponent.id))
         
         if not challenger_pets or not opponent_pets:
             await ctx.send("Both users need to have pets to fight!")
-            return
+            return None
             
         if pet_num < 1 or pet_num > len(challenger_pets):
             await ctx.send("Invalid pet number!")
-            return
+            return None
             
         challenger_pet = challenger_pets[pet_num - 1]
         
+        # Don't open a challenge that couldn't start anyway
+        if not await self.check_battle_slots(ctx, [str(ctx.author.id)], [pet_key(str(ctx.author.id), challenger_pet)]):
+            return None
+        
         # Send challenge
         embed = create_embed(
-            title="Pet Battle Challenge!",
+            title=title,
             description=f"{ctx.author.mention} challenges {opponent.mention} to a battle!\n"
                        f"Pet: {challenger_pet['name']}\n\n"
                        f"{opponent.mention}, choose your pet number to accept, or type 'decline' to refuse.",
@@ -409,43 +466,84 @@ class PetCommands(commands.Cog):
         
         challenge_msg = await ctx.send(embed=embed)
         
+        # The dispatcher only hands this check the opponent's messages in this channel
         def check(m):
-            if m.author != opponent:
-                return False
-            if m.channel != ctx.channel:
-                return False
             return m.content.lower() == 'decline' or m.content.isdigit()
             
         try:
-            response = await self.bot.wait_for('message', timeout=30.0, check=check)
+            response = await wait_for_message(ctx.channel.id, opponent.id, 30.0, check)
         except asyncio.TimeoutError:
             await ctx.send(f"{opponent.mention} didn't respond in time. Challenge expired!")
-            return
+            return None
             
         if response.content.lower() == 'decline':
             await ctx.send(f"{opponent.mention} declined the challenge!")
-            return
+            return None
             
         try:
             opponent_pet_num = int(response.content)
             if opponent_pet_num < 1 or opponent_pet_num > len(opponent_pets):
                 await ctx.send("Invalid pet number!")
-                return
-                
-            opponent_pet = opponent_pets[opponent_pet_num - 1]
+                return None
         except ValueError:
             await ctx.send("Invalid response!")
+            return None
+        
+        # Either side may have started another battle while the challenge was open
+        user_ids = [str(ctx.author.id), str(opponent.id)]
+        pet_keys = [pet_key(user_ids[0], challenger_pet), pet_key(user_ids[1], opponent_pets[opponent_pet_num - 1])]
+        if not await self.check_battle_slots(ctx, user_ids, pet_keys):
+            return None
+        
+        return pet_num - 1, opponent_pet_num - 1
+
+    async def check_battle_slots(self, ctx, user_ids: List[str], pet_keys: List[str]) -> bool:
+        """Check the battle limits and busy pets, telling the user why a battle can't start"""
+        guild_id = ctx.guild.id if ctx.guild else None
+        reason = check_battle_slots(guild_id, ctx.channel.id, user_ids, pet_keys)
+        if reason:
+            await ctx.send(reason)
+            return False
+        return True
+
+    @commands.command(name="forfeit")
+    async def forfeit_battle(self, ctx):
+        """Give up the battle you're in"""
+        user_id = str(ctx.author.id)
+        battle = get_user_battle(user_id)
+        if battle is None:
+            await ctx.send("You're not in a battle!")
+            return
+        
+        # The battle wraps itself up and announces the result
+        stop_battle(battle, STOP_FORFEIT, battle["user_ids"].index(user_id))
+        await ctx.send(f"🏳️ {ctx.author.mention} forfeits the battle!")
+
+    @commands.command(name="fight")
+    async def fight(self, ctx, opponent: discord.Member, pet_num: int = 1):
+        """Start a battle with another user's pet"""
+        accepted = await self.challenge_opponent(ctx, opponent, pet_num, "Pet Battle Challenge!")
+        if accepted is None:
             return
             
+        challenger_id = str(ctx.author.id)
+        opponent_id = str(opponent.id)
+        challenger_pets = get_user_pets(challenger_id)
+        opponent_pets = get_user_pets(opponent_id)
+        challenger_index, opponent_index = accepted
+        challenger_pet = challenger_pets[challenger_index]
+        opponent_pet = opponent_pets[opponent_index]
+            
         # Start battle
         battle = await self.start_battle(ctx, challenger_pet, opponent_pet, ctx.author, opponent)
         
-        # Update pets after battle
-        challenger_pets[pet_num - 1] = challenger_pet
-        opponent_pets[opponent_pet_num - 1] = opponent_pet
+        # The battle changed both pets in place; they're saved wherever they are now
+        ratings = None
+        if battle["winner"] != "cancelled":
+            ratings = self.rate_battle(challenger_pet, opponent_pet, battle["winner"])
         
-        set_user_pets(challenger_id, challenger_pets)
-        set_user_pets(opponent_id, opponent_pets)
+        set_user_pets(challenger_id, get_user_pets(challenger_id))
+        set_user_pets(opponent_id, get_user_pets(opponent_id))
         
         # Give rewards
         if battle["winner"] == "challenger":
@@ -456,256 +554,509 @@ class PetCommands(commands.Cog):
             reward = calculate_fight_rewards(opponent_pet, challenger_pet)
             add_user_coins(opponent_id, reward)
             await ctx.send(f"{opponent.mention} won {reward} coins!")
+        if ratings:
+            await ctx.send(f"📈 Ratings: {ratings}")
 
-    async def start_battle(self, ctx, pet1, pet2, owner1, owner2):
-        """Handle the battle between two pets"""
-        # Get available moves for each pet based on level
-        pet1_level = pet1.get("level", 1)
-        pet2_level = pet2.get("level", 1)
+    def rate_battle(self, pet1, pet2, winner: str) -> str:
+        """Update both pets' Elo ratings after a player battle and describe the change"""
+        change1, change2 = update_ratings(pet1, pet2, winner)
+        return (f"{pet1['name']} {get_rating(pet1):.0f} ({change1:+d}), "
+                f"{pet2['name']} {get_rating(pet2):.0f} ({change2:+d})")
+
+    @commands.command(name="autofight")
+    async def auto_fight(self, ctx, opponent: discord.Member, pet_num: int = 1, replay: str = None):
+        """Challenge another user to an instant battle; add 'replay' for the play-by-play"""
+        accepted = await self.challenge_opponent(ctx, opponent, pet_num, "Auto Battle Challenge!")
+        if accepted is None:
+            return
+            
+        challenger_id = str(ctx.author.id)
+        opponent_id = str(opponent.id)
+        challenger_pets = get_user_pets(challenger_id)
+        opponent_pets = get_user_pets(opponent_id)
+        challenger_index, opponent_index = accepted
+        challenger_pet = challenger_pets[challenger_index]
+        opponent_pet = opponent_pets[opponent_index]
+        
+        # Both sides play the configured policy; the whole battle resolves at once
+        policy = POLICIES.get(AUTO_BATTLE_POLICY, domain_timing_policy)
+        state = await self.resolve_auto_battle(challenger_pet, opponent_pet, ctx.author, opponent, policy, policy)
+        rewards = self.settle_player_battle(state, (challenger_id, opponent_id), (challenger_pets, opponent_pets),
+                                            (ctx.author, opponent))
+        await self.send_battle_summary(ctx, state, state["result"], (ctx.author.name, opponent.name), rewards, replay)
+
+    def settle_player_battle(self, state, user_ids, user_pets, members) -> str:
+        """Settle an auto battle between two players: XP, ratings, saving and coins
+
+        Returns the rewards text; the result is kept in state["result"].
+        """
+        pet1, pet2 = state["pets"]
+        result = settle_battle(state)
+        state["result"] = result
+        ratings = self.rate_battle(pet1, pet2, result["winner"])
+        
+        set_user_pets(user_ids[0], user_pets[0])
+        set_user_pets(user_ids[1], user_pets[1])
+        
+        # Give rewards
+        rewards = "No coins awarded"
+        if result["winner"] == "challenger":
+            reward = calculate_fight_rewards(pet1, pet2)
+            add_user_coins(user_ids[0], reward)
+            rewards = f"{members[0].mention} won {reward} coins!"
+        elif result["winner"] == "opponent":
+            reward = calculate_fight_rewards(pet2, pet1)
+            add_user_coins(user_ids[1], reward)
+            rewards = f"{members[1].mention} won {reward} coins!"
+        return f"{rewards}\n📈 {ratings}"
+
+    @commands.command(name="queue")
+    @commands.guild_only()
+    async def join_queue(self, ctx, pet_num: int = 1):
+        """Queue a pet for a rated auto battle against someone with a similar rating"""
+        user_id = str(ctx.author.id)
+        pets = get_user_pets(user_id)
+        
+        if not pets:
+            await ctx.send("You don't have any pets! Use `!adopt` to get one.")
+            return
+            
+        if pet_num < 1 or pet_num > len(pets):
+            await ctx.send("Invalid pet number!")
+            return
+            
+        if get_entry(user_id) is not None:
+            await ctx.send("You're already in the queue! Use `!leavequeue` to leave it.")
+            return
+            
+        pet = pets[pet_num - 1]
+        if get_user_battle(user_id) is not None or is_pet_battling(pet_key(user_id, pet)):
+            await ctx.send("Finish your current battle before queueing!")
+            return
+        
+        rating = get_rating(pet)
+        pair = enqueue(ctx.guild.id, user_id, pet_key(user_id, pet), rating, pet=pet, channel=ctx.channel, member=ctx.author)
+        if pair is not None:
+            asyncio.create_task(self.play_match(*pair))
+            return
+        
+        await ctx.send(f"🔎 {ctx.author.mention} queued **{pet['name']}** (rating {rating:.0f}). "
+                       f"Looking for an opponent within ±{MATCH_WINDOW_START}, widening the longer you wait. "
+                       f"{queue_size(ctx.guild.id)} waiting.")
+        if self.matchmaker is None or self.matchmaker.done():
+            self.matchmaker = asyncio.create_task(self.run_matchmaker())
+
+    @commands.command(name="leavequeue")
+    async def leave_queue(self, ctx):
+        """Leave the matchmaking queue"""
+        if dequeue(str(ctx.author.id)) is None:
+            await ctx.send("You're not in the queue!")
+            return
+        await ctx.send(f"{ctx.author.mention} left the queue.")
+
+    async def run_matchmaker(self):
+        """Background task: retry pairing with wider windows while anyone is waiting"""
+        while queue_size():
+            await asyncio.sleep(MATCH_WIDEN_INTERVAL)
+            try:
+                pairs, expired = sweep_queue()
+            except Exception as e:
+                print(f"Error sweeping the matchmaking queue: {e}")
+                continue
+            for pair in pairs:
+                asyncio.create_task(self.play_match(*pair))
+            for entry in expired:
+                await outbound.send(entry["channel"], f"{entry['member'].mention}, no opponent turned up. "
+                                                      f"You've been taken out of the queue.")
+
+    async def play_match(self, entry1, entry2):
+        """Fight a matchmade pair as an auto battle and post the result"""
+        members = (entry1["member"], entry2["member"])
+        user_ids = (entry1["user_id"], entry2["user_id"])
+        user_pets = (get_user_pets(user_ids[0]), get_user_pets(user_ids[1]))
+        
+        # The queued pets may have been released or traded while waiting; bred siblings can
+        # share a name, so it has to be the very pet that was queued
+        pets = [entry["pet"] if any(pet is entry["pet"] for pet in owned) else None
+                for owned, entry in zip(user_pets, (entry1, entry2))]
+        if None in pets or any(is_pet_battling(pet_key(entry["user_id"], entry["pet"])) for entry in (entry1, entry2)):
+            for entry in (entry1, entry2):
+                await outbound.send(entry["channel"], f"{entry['member'].mention}, your match fell through "
+                                                      f"because a pet is no longer available. Queue again with `!queue`.")
+            return
         
-        pet1_moves = self.get_available_moves(pet1_level)
-        pet2_moves = self.get_available_moves(pet2_level)
+        try:
+            policy = POLICIES.get(AUTO_BATTLE_POLICY, domain_timing_policy)
+            state = await self.resolve_auto_battle(pets[0], pets[1], members[0], members[1], policy, policy)
+            rewards = self.settle_player_battle(state, user_ids, user_pets, members)
+            
+            # The full summary goes where the second player queued; the first gets a pointer if elsewhere
+            channel = entry2["channel"]
+            await self.send_battle_summary(channel, state, state["result"], (members[0].name, members[1].name), rewards)
+            if entry1["channel"].id != channel.id:
+                await outbound.send(entry1["channel"], f"{members[0].mention}, your ranked match against "
+                                                       f"{members[1].name} finished in {channel.mention}.")
+        except Exception as e:
+            print(f"Error playing matchmade battle: {e}")
+
+    @commands.command(name="pve")
+    async def pve_battle(self, ctx, pet_num: int = 1, difficulty: str = "normal", replay: str = None):
+        """Battle a wild pet instantly (easy, normal or hard); add 'replay' for the play-by-play"""
+        user_id = str(ctx.author.id)
+        pets = get_user_pets(user_id)
         
-        # Add domain expansion if available
+        if not pets:
+            await ctx.send("You don't have any pets! Use `!adopt` to get one.")
+            return
+            
+        if pet_num < 1 or pet_num > len(pets):
+            await ctx.send("Invalid pet number!")
+            return
+            
+        difficulty = difficulty.lower()
+        if difficulty not in PVE_DIFFICULTIES:
+            await ctx.send(f"Difficulty must be one of: {', '.join(PVE_DIFFICULTIES)}")
+            return
+            
+        pet = pets[pet_num - 1]
+        if not await self.check_battle_slots(ctx, [user_id], [pet_key(user_id, pet)]):
+            return
+        
+        # Wild pets match the player's level and fight with the difficulty's policy
+        settings = PVE_DIFFICULTIES[difficulty]
+        wild_pet = generate_pet(rare=settings["rarity"] == "rare", mythic=settings["rarity"] == "mythic")
+        wild_pet["name"] = f"Wild {wild_pet['name']}"
+        wild_pet["level"] = pet.get("level", 1)
+        
+        policy = POLICIES.get(AUTO_BATTLE_POLICY, domain_timing_policy)
+        wild_policy = POLICIES.get(settings["policy"], random_policy)
+        state = await self.resolve_auto_battle(pet, wild_pet, ctx.author, None, policy, wild_policy)
+        result = settle_battle(state)
+        set_user_pets(user_id, pets)
+        
+        # Wild battles pay less than player battles so they don't replace them
+        rewards = "No coins awarded"
+        if result["winner"] == "challenger":
+            reward = max(1, calculate_fight_rewards(pet, wild_pet) * settings["reward_percent"] // 100)
+            add_user_coins(user_id, reward)
+            rewards = f"{ctx.author.mention} won {reward} coins!"
+        
+        await self.send_battle_summary(ctx, state, result, (ctx.author.name, "The wild"), rewards, replay)
+
+    async def resolve_auto_battle(self, pet1, pet2, owner1, owner2, policy1, policy2):
+        """Run a whole battle with move policies and return its finished state"""
+        # Domain expansion is only offered when it's off cooldown (wild pets have none)
         can_use_domain1 = await self.can_use_domain_expansion(str(owner1.id), pet1)
-        can_use_domain2 = await self.can_use_domain_expansion(str(owner2.id), pet2)
+        if owner2 is not None:
+            can_use_domain2 = await self.can_use_domain_expansion(str(owner2.id), pet2)
+        else:
+            can_use_domain2 = pet2["rarity"] == "mythic"
+        
+        state = new_battle(pet1, pet2, domain=(can_use_domain1, can_use_domain2))
+        policies = (policy1, policy2)
+        while not is_over(state):
+            side = state["side"]
+            apply_move(state, policies[side](state, side, state["moves"][side]))
+        
+        # Start the cooldown for any domain expansion that was used
+        for event in state["events"]:
+            owner = (owner1, owner2)[event.side]
+            if event.kind == EVENT_DOMAIN and owner is not None:
+                pet = state["pets"][event.side]
+                self.domain_cooldowns[f"{str(owner.id)}_{pet['name']}"] = datetime.now()
+        
+        # Recorded before settling, while the pets still have their pre-battle stats
+        owner_ids = [str(owner1.id), str(owner2.id) if owner2 is not None else None]
+        state["replay_id"] = save_replay(state, owner_ids, KIND_AUTO if owner2 is not None else KIND_PVE)
+        return state
+
+    async def send_battle_summary(self, ctx, state, result, owner_names, rewards: str, replay: str = None):
+        """Send a finished auto battle as one message, optionally with a play-by-play file"""
+        pet1, pet2 = state["pets"]
+        events = result["events"]
         
-        if can_use_domain1 and pet1['species'] in DOMAIN_EXPANSIONS:
-            pet1_moves.append("DOMAIN EXPANSION")
-        if can_use_domain2 and pet2['species'] in DOMAIN_EXPANSIONS:
-            pet2_moves.append("DOMAIN EXPANSION")
+        if result["winner"] == "draw":
+            outcome = "🤝 Both pets were too exhausted to continue. It's a draw!"
+        else:
+            winner_side = CHALLENGER if result["winner"] == "challenger" else OPPONENT
+            outcome = f"🏆 {owner_names[winner_side]}'s **{state['pets'][winner_side]['name']}** wins!"
+        
+        # Highlights: the biggest hit, domain expansions and misses
+        highlights = []
+        hits = [event for event in events if event.kind == EVENT_HIT]
+        if hits:
+            biggest = max(hits, key=lambda event: event.damage)
+            highlights.append(f"Biggest hit: {describe_event(state, biggest)}")
+        for event in events:
+            if event.kind == EVENT_DOMAIN:
+                highlights.append(f"🌟 {describe_event(state, event)}")
+        misses = sum(1 for event in events if event.kind == EVENT_MISS)
+        if misses:
+            highlights.append(f"{misses} attack{'s' if misses != 1 else ''} missed")
         
-        # Generate battle image
+        embed = create_embed(
+            title=f"⚔️ {pet1['name']} VS {pet2['name']} ⚔️",
+            description=outcome,
+            color=0xFF0000,
+            fields=[
+                ("Turns", str(result["turns"]), True),
+                ("Final HP", f"{pet1['name']}: {result['hp'][0]:g}\n{pet2['name']}: {result['hp'][1]:g}", True),
+                ("Highlights", "\n".join(highlights)[:1024] or "A quick scuffle", False),
+                ("Rewards", rewards, False)
+            ]
+        )
+        footer = f"Battle seed {result['seed']}"
+        if state.get("replay_id"):
+            footer += f" • !replay {state['replay_id']}"
+        embed.set_footer(text=footer)
+        
+        # Everything goes out in a single message: the scene image plus the optional replay
+        files = []
         battle_image = await generate_battle_image(pet1, pet2)
+        if battle_image:
+            embed.set_image(url=f"attachment://{battle_image.filename}")
+            files.append(battle_image)
+        if replay and replay.lower() in ("replay", "log"):
+            play_by_play = "\n".join(describe_event(state, event) for event in events)
+            files.append(discord.File(io.BytesIO(play_by_play.encode("utf-8")), filename="battle_replay.txt"))
+        
+        await ctx.send(embed=embed, files=files)
+
+    @commands.command(name="replay")
+    async def replay_battle(self, ctx, replay_id: int):
+        """Show a past battle's play-by-play, rebuilt from its record"""
+        record = get_replay(replay_id)
+        if record is None:
+            await ctx.send("That replay doesn't exist or is too old to keep!")
+            return
+        
+        state = rebuild_battle(record)
+        result = get_result(state)
+        pet1, pet2 = state["pets"]
+        if result["winner"] == "draw":
+            outcome = "🤝 Draw"
+        else:
+            winner_side = CHALLENGER if result["winner"] == "challenger" else OPPONENT
+            outcome = f"🏆 {state['pets'][winner_side]['name']} won"
+        owners = " vs ".join(f"<@{owner}>" if owner else "the wild" for owner in record["owners"])
+        play_by_play = [describe_event(state, event) for event in result["events"]]
+        
+        embed = create_embed(
+            title=f"📼 Replay #{replay_id}: {pet1['name']} VS {pet2['name']}",
+            description=f"{outcome} after {result['turns']} turns\n{KIND_NAMES[record['kind']].capitalize()}, {owners}, "
+                        f"<t:{record['created']}:R>",
+            color=0xFF0000,
+            fields=[("Final Turns", "\n".join(play_by_play[-LOG_TAIL:])[-1024:] or "No moves were made", False)]
+        )
+        embed.set_footer(text=f"Battle seed {record['seed']}")
+        file = discord.File(io.BytesIO("\n".join(play_by_play).encode("utf-8")), filename=f"replay_{replay_id}.txt")
+        await ctx.send(embed=embed, file=file)
+
+    @commands.command(name="replays")
+    async def list_replays(self, ctx, pet_num: int = None):
+        """List your recent battle replays, or one pet's"""
+        user_id = str(ctx.author.id)
+        if pet_num is None:
+            replay_ids = get_user_replays(user_id)
+            title = f"{ctx.author.name}'s Recent Battles"
+        else:
+            pets = get_user_pets(user_id)
+            if pet_num < 1 or pet_num > len(pets):
+                await ctx.send("Invalid pet number!")
+                return
+            replay_ids = get_pet_replays(pet_key(user_id, pets[pet_num - 1]))
+            title = f"{pets[pet_num - 1]['name']}'s Recent Battles"
         
-        # Initial battle state
-        current_hp1 = pet1["health"]
-        current_hp2 = pet2["health"]
+        lines = []
+        for replay_id in replay_ids:
+            record = get_replay(replay_id)
+            pet1, pet2 = record["pets"]
+            lines.append(f"`#{replay_id}` {pet1['name']} vs {pet2['name']} "
+                         f"({KIND_NAMES[record['kind']]}, <t:{record['created']}:R>)")
         
-        # Battle loop
-        current_turn = "challenger"
-        turn_count = 0
+        embed = create_embed(
+            title=title,
+            description="\n".join(lines) or "No recorded battles yet.",
+            color=0xFF0000,
+            fields=[("Watch One", "Use `!replay <id>` to see the play-by-play", False)]
+        )
+        await ctx.send(embed=embed)
+
+    async def start_battle(self, ctx, pet1, pet2, owner1, owner2):
+        """Handle the battle between two pets"""
+        # Domain expansion is only offered when it's off cooldown
+        can_use_domain1 = await self.can_use_domain_expansion(str(owner1.id), pet1)
+        can_use_domain2 = await self.can_use_domain_expansion(str(owner2.id), pet2)
         
-        # Battle start animation
-        vs_animation = [
-            "```\n╔═══════ VS ═══════╗\n║                  ║\n║    🆚 BATTLE    ║\n║                  ║\n╚══════════════════╝```",
-            "```\n╔═══════⚡VS⚡═══════╗\n║     PREPARE     ║\n║    🆚 BATTLE    ║\n║    TO FIGHT!    ║\n╚══════════════════╝```",
-            "```\n╔═══════💥VS💥═══════╗\n║    BATTLE!!!    ║\n║    🆚 START     ║\n║     NOW!!!      ║\n╚══════════════════╝```"
-        ]
+        # The engine owns the rules; this coroutine collects moves and renders events
+        state = new_battle(pet1, pet2, domain=(can_use_domain1, can_use_domain2))
+        owners = (owner1, owner2)
         
-        for frame in vs_animation:
-            await ctx.send(frame)
-            await asyncio.sleep(1)
+        # Registered battles lock both players and pets until they end
+        user_ids = [str(owner1.id), str(owner2.id)]
+        battle = register_battle(ctx.guild.id if ctx.guild else None, ctx.channel.id, user_ids,
+                                 [pet_key(user_ids[0], pet1), pet_key(user_ids[1], pet2)])
+        missed_turns = [0, 0]
         
-        while current_hp1 > 0 and current_hp2 > 0:
-            # Show battle status with ASCII art arena
-            arena_frame = f"```\n╔══════════════════════╗\n║ {pet1['name'][:10]:^10} VS {pet2['name'][:10]:^10} ║\n║ HP: {current_hp1:^3}/{pet1['health']:^3}  {current_hp2:^3}/{pet2['health']:^3} ║\n╚══════════════════════╝```"
-            
-            status_embed = create_embed(
-                title="⚔️ Battle Arena ⚔️",
-                description=arena_frame,
-                color=0xFF0000
-            )
+        # The whole battle plays out in one message that is edited once per turn
+        view = BattleView(ctx.channel, f"⚔️ {pet1['name']} VS {pet2['name']} ⚔️")
+        view.banner = "```\n╔═══════💥VS💥═══════╗\n║    BATTLE!!!    ║\n║    🆚 START     ║\n║     NOW!!!      ║\n╚══════════════════╝```"
+        view.set_arena(state["pets"], state["hp"], state["max_hp"])
+        self.show_move_menu(view, state, owners)
+        
+        try:
+            # The battle scene is uploaded once with the first frame
+            battle_image = await generate_battle_image(pet1, pet2)
+            await view.start(battle_image)
             
-            if battle_image:
-                status_embed.set_image(url="attachment://battle.png")
-                await ctx.send(embed=status_embed, file=battle_image)
-            else:
-                await ctx.send(embed=status_embed)
-            
-            # Get current player and moves
-            current_player = owner1 if current_turn == "challenger" else owner2
-            current_pet = pet1 if current_turn == "challenger" else pet2
-            current_moves = pet1_moves if current_turn == "challenger" else pet2_moves
-            
-            # Show available moves with fancy formatting
-            moves_text = "\n".join([
-                f"{i+1}. {'🌟 ' if move == 'DOMAIN EXPANSION' else ''}{move}" + 
-                (" - 🌈 DOMAIN EXPANSION! 🌈" if move == "DOMAIN EXPANSION" else 
-                f" - ⚔️ Power: {BASIC_MOVES.get(move, ADVANCED_MOVES.get(move))['power']}, "
-                f"🎯 Accuracy: {BASIC_MOVES.get(move, ADVANCED_MOVES.get(move))['accuracy']}")
-                for i, move in enumerate(current_moves)
-            ])
-            
-            move_embed = create_embed(
-                title=f"🎮 {current_player.name}'s turn!",
-                description=f"Choose your move (type the number):\n{moves_text}",
-                color=0x00FF00
-            )
-            await ctx.send(embed=move_embed)
-            
-            # Wait for move selection
-            def check(m):
-                return (m.author == current_player and 
-                        m.channel == ctx.channel and 
-                        m.content.isdigit() and 
-                        1 <= int(m.content) <= len(current_moves))
-                        
-            try:
-                move_msg = await self.bot.wait_for('message', timeout=30.0, check=check)
-                selected_move = current_moves[int(move_msg.content) - 1]
+            while not is_over(state):
+                # Wait for move selection
+                side = state["side"]
+                current_player = owners[side]
+                current_moves = state["moves"][side]
                 
-                # Handle Domain Expansion
-                if selected_move == "DOMAIN EXPANSION":
-                    current_species = current_pet['species']
-                    domain_data = DOMAIN_EXPANSIONS[current_species]
-                    
-                    # Animate domain expansion
-                    await self.animate_domain_expansion(ctx, current_pet, domain_data)
-                    
-                    # Apply massive damage
-                    damage = domain_data['power'] * (current_pet['strength'] / 20)
-                    
-                    if current_turn == "challenger":
-                        current_hp2 = max(0, current_hp2 - damage)
-                        # Set cooldown
-                        self.domain_cooldowns[f"{str(owner1.id)}_{pet1['name']}"] = datetime.now()
-                    else:
-                        current_hp1 = max(0, current_hp1 - damage)
-                        # Set cooldown
-                        self.domain_cooldowns[f"{str(owner2.id)}_{pet2['name']}"] = datetime.now()
-                        
-                    await ctx.send(f"💥 The domain expansion dealt **{damage}** damage!")
-                    
-                else:
-                    # Normal move handling with animation
-                    move_data = BASIC_MOVES.get(selected_move, ADVANCED_MOVES.get(selected_move))
-                    
-                    # Attack animation frames
-                    attack_frames = [
-                        f"```\n  {current_pet['name']} prepares...\n     ⚡     \n    ⚡⚡    \n   ⚡⚡⚡   ```",
-                        f"```\n  {selected_move} charging...\n     💫     \n    💫💫    \n   💫💫💫   ```",
-                        f"```\n  ATTACK!!!\n     ⭐     \n    ⭐⭐    \n   ⭐⭐⭐   ```"
-                    ]
-                    
-                    # Show attack animation
-                    attack_msg = await ctx.send(attack_frames[0])
-                    for frame in attack_frames[1:]:
-                        await attack_msg.edit(content=frame)
-                        await asyncio.sleep(0.7)
-                    
-                    # Calculate damage
-                    accuracy_roll = random.randint(1, 100)
-                    if accuracy_roll <= move_data["accuracy"]:
-                        # Hit!
-                        attacker_strength = pet1["strength"] if current_turn == "challenger" else pet2["strength"]
-                        base_damage = move_data["power"]
-                        damage = int(base_damage * (attacker_strength / 20))
-                        
-                        # Hit animation
-                        hit_frames = [
-                            "```\n   💥   \n  💥💥  \n 💥💥💥 \n  DIRECT  \n   HIT!   ```",
-                            "```\n   ⚡   \n  ⚡⚡  \n ⚡⚡⚡ \n  SUPER  \n EFFECTIVE```",
-                            "```\n   ✨   \n  ✨✨  \n ✨✨✨ \n  GREAT  \n  STRIKE! ```"
-                        ]
-                        
-                        for frame in hit_frames:
-                            await attack_msg.edit(content=frame)
-                            await asyncio.sleep(0.5)
-                        
-                        # Apply damage
-                        if current_turn == "challenger":
-                            current_hp2 = max(0, current_hp2 - damage)
-                            await ctx.send(f"💥 {pet1['name']} used {selected_move}! Dealt {damage} damage!")
-                        else:
-                            current_hp1 = max(0, current_hp1 - damage)
-                            await ctx.send(f"💥 {pet2['name']} used {selected_move}! Dealt {damage} damage!")
-                    else:
-                        # Miss animation
-                        miss_frames = [
-                            "```\n  MISSED!  \n   💨💨   \n  💨💨💨  ```",
-                            "```\n  DODGED!  \n   ✨✨   \n  ✨✨✨  ```",
-                            "```\n  EVADED!  \n   ⭐⭐   \n  ⭐⭐⭐  ```"
-                        ]
-                        
-                        for frame in miss_frames:
-                            await attack_msg.edit(content=frame)
-                            await asyncio.sleep(0.5)
-                        
-                        await ctx.send("❌ The attack missed!")
+                # The dispatcher only hands this check the current player's messages in this channel
+                def check(m):
+                    return m.content.isdigit() and 1 <= int(m.content) <= len(current_moves)
+                            
+                try:
+                    move_msg = await wait_for_input(battle, wait_for_message(ctx.channel.id, current_player.id, 30.0, check))
+                except asyncio.TimeoutError:
+                    move_msg = None
+                    # Players who keep letting their turn run out forfeit instead of stalling the battle
+                    missed_turns[side] += 1
+                    if missed_turns[side] >= MAX_MISSED_TURNS:
+                        stop_battle(battle, STOP_FORFEIT, side)
                 
-            except asyncio.TimeoutError:
-                await ctx.send(f"⏰ {current_player.mention} took too long! Turn skipped!")
+                # Forfeits, cancels and the idle reaper end the battle between turns
+                if battle["stopped"] is not None:
+                    break
+                
+                selected_move = None
+                if move_msg is not None:
+                    selected_move = current_moves[int(move_msg.content) - 1]
+                    missed_turns[side] = 0
+                    note_input(battle)
+                
+                event = apply_move(state, selected_move)
+                battle["side"] = state["side"]
+                await self.render_battle_event(view, state, event, owners)
+                
+                # The move's result, new HP and the next player's menu go out as one edit
+                view.set_arena(state["pets"], state["hp"], state["max_hp"])
+                if not is_over(state):
+                    self.show_move_menu(view, state, owners)
+                    await view.flush()
+            
+            view.prompt = None
+            stopped = battle["stopped"]
+            if stopped is not None and stopped[1] is None:
+                # Cancelled battles have no winner and leave both pets as they were
+                view.banner = "🛑 The battle was cancelled."
+                view.footer = f"Battle cancelled after {state['turn']} turns"
+                await view.flush()
+                return dict(get_result(state), winner="cancelled")
+            
+            if stopped is not None:
+                forfeit(state, stopped[1])
+                view.add_log(f"🏳️ {owners[stopped[1]].name}'s {state['pets'][stopped[1]]['name']} forfeited!")
+            
+            # Recorded before settling, while the pets still have their pre-battle stats
+            replay_id = save_replay(state, user_ids, KIND_BATTLE)
             
-            # Switch turns
-            current_turn = "opponent" if current_turn == "challenger" else "challenger"
-            turn_count += 1
+            # Update pet stats and experience
+            result = settle_battle(state)
             
-            # Add a short delay between turns
-            await asyncio.sleep(2)
+            # Victory frame
+            if result["winner"] == "draw":
+                view.banner = "```\n🤝 DRAW! 🤝\n\nBoth pets are\ntoo exhausted\nto continue!```"
+            else:
+                winner_side = CHALLENGER if result["winner"] == "challenger" else OPPONENT
+                winner_owner = owners[winner_side]
+                winner_pet = state["pets"][winner_side]
+                view.banner = f"```\n🏆 VICTORY! 🏆\n\n{winner_owner.name}'s\n{winner_pet['name']}\nWINS!```"
+            view.footer = f"Battle over after {result['turns']} turns"
+            if replay_id:
+                view.footer += f" • !replay {replay_id}"
+            await view.flush()
+        finally:
+            view.close()
+            end_battle(battle)
+        
+        return result
+
+    def show_move_menu(self, view, state, owners):
+        """Put the current player's move menu in the battle message"""
+        side = state["side"]
+        moves_text = "\n".join([
+            f"{i+1}. {'🌟 ' if move == DOMAIN_MOVE else ''}{move}" + 
+            (" - 🌈 DOMAIN EXPANSION! 🌈" if move == DOMAIN_MOVE else 
+            f" - ⚔️ Power: {get_move_data(move)['power']}, "
+            f"🎯 Accuracy: {get_move_data(move)['accuracy']}")
+            for i, move in enumerate(state["moves"][side])
+        ])
+        view.prompt = (f"🎮 {owners[side].name}'s turn!", f"Choose your move (type the number):\n{moves_text}")
+        view.footer = f"Turn {state['turn'] + 1}"
+
+    async def render_battle_event(self, view, state, event, owners):
+        """Show one battle event from the engine's log"""
+        pet = state["pets"][event.side]
+        move = MOVE_LIST[event.move] if event.move != NO_MOVE else None
+        
+        if event.kind == EVENT_SKIP:
+            view.banner = f"⏰ {owners[event.side].mention} took too long! Turn skipped!"
+            view.add_log(f"⏰ {pet['name']} lost the turn")
+            return
         
-        # Battle end animation
-        end_frames = [
-            "```\n╔════════════════╗\n║  BATTLE OVER!  ║\n╚════════════════╝```",
-            "```\n╔════════════════╗\n║⚡BATTLE OVER!⚡║\n╚════════════════╝```",
-            "```\n╔════════════════╗\n║💫BATTLE OVER!💫║\n╚════════════════╝```"
+        # Nobody can answer while the animation plays, so hide the menu
+        view.prompt = None
+        
+        if event.kind == EVENT_DOMAIN:
+            domain_data = DOMAIN_EXPANSIONS[pet['species']]
+            
+            # Animate domain expansion
+            await self.animate_domain_expansion(view, pet, domain_data)
+            
+            # Set cooldown
+            self.domain_cooldowns[f"{str(owners[event.side].id)}_{pet['name']}"] = datetime.now()
+            
+            view.add_log(f"💥 {domain_data['name']} dealt **{event.damage:g}** damage!")
+            return
+        
+        # Attack animation frames
+        attack_frames = [
+            f"```\n  {pet['name']} prepares...\n     ⚡     \n    ⚡⚡    \n   ⚡⚡⚡   ```",
+            f"```\n  {move} charging...\n     💫     \n    💫💫    \n   💫💫💫   ```",
+            f"```\n  ATTACK!!!\n     ⭐     \n    ⭐⭐    \n   ⭐⭐⭐   ```"
         ]
         
-        for frame in end_frames:
-            await ctx.send(frame)
-            await asyncio.sleep(0.7)
-        
-        # Determine winner with victory animation
-        if current_hp1 <= 0:
-            winner = "opponent"
-            victory_frames = [
-                f"```\n🏆 VICTORY! 🏆\n\n{owner2.name}'s\n{pet2['name']}\nWINS!```",
-                f"```\n✨ VICTORY! ✨\n\n{owner2.name}'s\n{pet2['name']}\nTRIUMPHS!```",
-                f"```\n⭐ VICTORY! ⭐\n\n{owner2.name}'s\n{pet2['name']}\nCONQUERS!```"
+        if event.kind == EVENT_HIT:
+            # Hit animation
+            result_frames = [
+                "```\n   💥   \n  💥💥  \n 💥💥💥 \n  DIRECT  \n   HIT!   ```",
+                "```\n   ⚡   \n  ⚡⚡  \n ⚡⚡⚡ \n  SUPER  \n EFFECTIVE```",
+                "```\n   ✨   \n  ✨✨  \n ✨✨✨ \n  GREAT  \n  STRIKE! ```"
             ]
+            view.add_log(f"💥 {pet['name']} used {move}! Dealt {event.damage} damage!")
         else:
-            winner = "challenger"
-            victory_frames = [
-                f"```\n🏆 VICTORY! 🏆\n\n{owner1.name}'s\n{pet1['name']}\nWINS!```",
-                f"```\n✨ VICTORY! ✨\n\n{owner1.name}'s\n{pet1['name']}\nTRIUMPHS!```",
-                f"```\n⭐ VICTORY! ⭐\n\n{owner1.name}'s\n{pet1['name']}\nCONQUERS!```"
+            # Miss animation
+            result_frames = [
+                "```\n  MISSED!  \n   💨💨   \n  💨💨💨  ```",
+                "```\n  DODGED!  \n   ✨✨   \n  ✨✨✨  ```",
+                "```\n  EVADED!  \n   ⭐⭐   \n  ⭐⭐⭐  ```"
             ]
+            view.add_log(f"❌ {pet['name']} used {move}, but the attack missed!")
         
-        victory_msg = await ctx.send(victory_frames[0])
-        for frame in victory_frames[1:]:
-            await victory_msg.edit(content=frame)
-            await asyncio.sleep(1)
-        
-        # Update pet stats
-        pet1["health"] = max(1, current_hp1)  # Ensure pet doesn't faint completely
-        pet2["health"] = max(1, current_hp2)
-        
-        # Add experience
-        self.add_experience(pet1, 50 if winner == "challenger" else 25)
-        self.add_experience(pet2, 50 if winner == "opponent" else 25)
-        
-        return {"winner": winner, "turns": turn_count}
+        # Busy channels get fewer frames; the result frame is folded into the next turn's edit
+        await view.animate(attack_frames + result_frames[:-1], result_frames[-1])
 
     def get_available_moves(self, level: int) -> List[str]:
         """Get available moves for the given level"""
-        moves = []
-        for req_level, level_moves in MOVES_BY_LEVEL.items():
-            if level >= req_level:
-                moves.extend(level_moves)
-        return moves
+        return get_available_moves(level)
 
     def add_experience(self, pet: Dict[str, Any], xp: int):
         """Add experience to a pet and handle leveling up"""
-        current_level = pet.get("level", 1)
-        current_xp = pet.get("xp", 0)
-        
-        # Add XP
-        new_xp = current_xp + xp
-        xp_needed = current_level * XP_PER_LEVEL
-        
-        # Check for level up
-        while new_xp >= xp_needed and current_level < MAX_LEVEL:
-            new_xp -= xp_needed
-            current_level += 1
-            xp_needed = current_level * XP_PER_LEVEL
-            
-            # Increase stats on level up
-            pet["health"] = min(MAX_HEALTH, pet["health"] + random.randint(5, 10))
-            pet["strength"] = min(50, pet["strength"] + random.randint(2, 5))
-        
-        # Update pet
-        pet["level"] = current_level
-        pet["xp"] = new_xp
+        add_experience(pet, xp)
 
     @commands.command(name="trade")
     async def trade_pet(self, ctx, pet_num: int, target: discord.Member):
@@ -739,6 +1090,9 @@ class PetCommands(commands.Cog):
             
         # Get the offered pet
         offered_pet = pets[pet_num - 1]
+        if is_pet_battling(pet_key(user_id, offered_pet)):
+            await ctx.send("You can't trade a pet in the middle of a battle!")
+            return
         
         # Store the trade offer
         self.pending_trades[target_id] = {
@@ -781,7 +1135,7 @@ class PetCommands(commands.Cog):
         acceptor_pets = get_user_pets(user_id)
         
         # Validate pet numbers
-        if offerer_pet_idx >= len(offerer_pets):
+        if offerer_pet_idx >= len(offerer_pets) or offerer_pets[offerer_pet_idx] is not offerer_pet:
             await ctx.send("The offered pet is no longer available.")
             del self.pending_trades[user_id]
             return
@@ -793,6 +1147,11 @@ class PetCommands(commands.Cog):
         # Get the pets to trade
         acceptor_pet = acceptor_pets[pet_num - 1]
         
+        # Either pet may have gone into a battle since the offer was made
+        if is_pet_battling(pet_key(str(offerer.id), offerer_pet)) or is_pet_battling(pet_key(user_id, acceptor_pet)):
+            await ctx.send("You can't trade a pet in the middle of a battle! Try again once it's over.")
+            return
+            
         # Execute the trade
         acceptor_pets[pet_num - 1] = offerer_pet
         offerer_pets[offerer_pet_idx] = acceptor_pet
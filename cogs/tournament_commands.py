@@ -0,0 +1,257 @@
+import discord
+from discord.ext import commands
+import asyncio
+from typing import Dict, Any
+
+from config import ADMIN_IDS, TOURNAMENT_MIN_ENTRANTS, TOURNAMENT_ROUND_DELAY, TOURNAMENT_PRIZES
+from database import get_user_pets, add_user_coins, get_tournament, get_all_tournaments, set_tournament
+from tournament import (FORMATS, new_tournament, add_entrant, remove_entrant, start_tournament,
+                        replay_journal, clear_journal, play_round, advance_round,
+                        get_standings, format_standings, round_summary)
+from utils import create_embed, generate_round_image
+import outbound
+from outbound import PRIORITY_BULK
+
+class TournamentCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.running: Dict[str, asyncio.Task] = {}  # guild id -> task playing its tournament
+
+    def can_manage(self, ctx, tournament: Dict[str, Any]) -> bool:
+        """Only the organizer or an admin may start or cancel a tournament"""
+        user_id = str(ctx.author.id)
+        return user_id == tournament["organizer"] or user_id in ADMIN_IDS
+
+    def owner_names(self, tournament: Dict[str, Any]) -> Dict[str, str]:
+        """Display names of the entrants' owners that are still in the server"""
+        guild = self.bot.get_guild(int(tournament["guild_id"]))
+        names = {}
+        for entrant in tournament["entrants"]:
+            member = guild.get_member(int(entrant["user_id"])) if guild else None
+            if member is not None:
+                names[entrant["user_id"]] = member.display_name
+        return names
+
+    def standings_embed(self, tournament: Dict[str, Any], title: str) -> discord.Embed:
+        table = format_standings(tournament, self.owner_names(tournament))
+        played = sum(1 for r in tournament["rounds"] if all(result is not None for result in r["results"]))
+        return create_embed(
+            title=title,
+            description=f"```\n{table}\n```",
+            color=0xFFD700,
+            fields=[("Progress", f"{tournament['format'].title()}, round {played} of {tournament['total_rounds']} done, "
+                                 f"{len(tournament['entrants'])} entrants", False)]
+        )
+
+    def launch(self, guild_id: str) -> None:
+        """Start playing a guild's tournament in the background unless it's already going"""
+        task = self.running.get(guild_id)
+        if task is not None and not task.done():
+            return
+        self.running[guild_id] = asyncio.create_task(self.run_tournament(guild_id))
+
+    async def run_tournament(self, guild_id: str) -> None:
+        """Play the rounds of a guild's running tournament, saving after each one"""
+        tournament = get_tournament(guild_id)
+        channel = self.bot.get_channel(tournament["channel_id"])
+        try:
+            # Matches finished before an interruption aren't played again
+            restored = replay_journal(tournament)
+            if restored:
+                print(f"Resumed tournament in guild {guild_id} with {restored} journaled results")
+
+            while tournament["status"] == "running":
+                await play_round(tournament)
+                round_no = len(tournament["rounds"]) - 1
+                await self.post_round(channel, tournament, round_no)
+
+                # One save per round; the journal only has to cover the round in progress
+                if not advance_round(tournament):
+                    await self.finish(channel, tournament)
+                set_tournament(guild_id, tournament)
+                clear_journal(tournament)
+                if tournament["status"] == "running":
+                    await asyncio.sleep(TOURNAMENT_ROUND_DELAY)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error running tournament in guild {guild_id}: {e}")
+            if channel is not None:
+                await outbound.send(channel, "The tournament hit an error and was paused. "
+                                             "An organizer can continue it with `!tournament resume`.")
+        finally:
+            if self.running.get(guild_id) is asyncio.current_task():
+                del self.running[guild_id]
+
+    async def post_round(self, channel, tournament: Dict[str, Any], round_no: int) -> None:
+        """Post a finished round's results image and the standings"""
+        if channel is None:
+            return
+        title = f"Round {round_no + 1} of {tournament['total_rounds']}"
+        if tournament["format"] == "bracket" and round_no == tournament["total_rounds"] - 1:
+            title = "Final"
+        try:
+            file = await generate_round_image(title, round_summary(tournament, round_no))
+            embed = self.standings_embed(tournament, f"🏆 Tournament {title} Results")
+            if file:
+                embed.set_image(url=f"attachment://{file.filename}")
+                await outbound.send(channel, embed=embed, file=file, priority=PRIORITY_BULK)
+            else:
+                await outbound.send(channel, embed=embed, priority=PRIORITY_BULK)
+        except discord.HTTPException as e:
+            print(f"Error posting tournament round: {e}")
+
+    async def finish(self, channel, tournament: Dict[str, Any]) -> None:
+        """Pay the prizes and announce the winners"""
+        lines = []
+        for place, (row, prize) in enumerate(zip(get_standings(tournament), TOURNAMENT_PRIZES), 1):
+            add_user_coins(row["user_id"], prize)
+            lines.append(f"**#{place}** {row['pet']['name']} (<@{row['user_id']}>) - {prize} coins")
+        if channel is not None:
+            embed = create_embed(title="🏆 Tournament Over!", description="\n".join(lines), color=0xFFD700)
+            await outbound.send(channel, embed=embed, priority=PRIORITY_BULK)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Pick up tournaments that were running when the bot went down"""
+        for tournament in get_all_tournaments():
+            if tournament["status"] == "running":
+                self.launch(tournament["guild_id"])
+
+    @commands.group(name="tournament", invoke_without_command=True)
+    @commands.guild_only()
+    async def tournament(self, ctx):
+        """Show the current tournament, or see `!help tournament` for its commands"""
+        tournament = get_tournament(str(ctx.guild.id))
+        if tournament is None:
+            await ctx.send("There's no tournament in this server. Start one with `!tournament create [bracket|swiss]`.")
+            return
+        if tournament["status"] == "open":
+            entrants = "\n".join(f"{e['pet']['name']} (<@{e['user_id']}>)" for e in tournament["entrants"][:25])
+            more = len(tournament["entrants"]) - 25
+            if more > 0:
+                entrants += f"\n...and {more} more"
+            embed = create_embed(
+                title=f"🏆 {tournament['format'].title()} Tournament - Registration Open",
+                description=entrants or "No entrants yet.",
+                color=0xFFD700,
+                fields=[("How to Enter", "Use `!tournament join [pet_number]`", False)]
+            )
+            await ctx.send(embed=embed)
+            return
+        await ctx.send(embed=self.standings_embed(tournament, f"🏆 Tournament Standings ({tournament['status']})"))
+
+    @tournament.command(name="create")
+    async def create(self, ctx, fmt: str = "bracket"):
+        """Open a tournament for registration (bracket or swiss)"""
+        guild_id = str(ctx.guild.id)
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            await ctx.send(f"Format must be one of: {', '.join(FORMATS)}")
+            return
+        current = get_tournament(guild_id)
+        if current is not None and current["status"] in ("open", "running"):
+            await ctx.send("This server already has a tournament going! Use `!tournament` to see it.")
+            return
+
+        set_tournament(guild_id, new_tournament(guild_id, ctx.channel.id, str(ctx.author.id), fmt))
+        await ctx.send(f"🏆 {ctx.author.mention} opened a **{fmt}** tournament! "
+                       f"Enter with `!tournament join [pet_number]`.")
+
+    @tournament.command(name="join")
+    async def join(self, ctx, pet_num: int = 1):
+        """Enter one of your pets in the open tournament"""
+        user_id = str(ctx.author.id)
+        tournament = get_tournament(str(ctx.guild.id))
+        if tournament is None:
+            await ctx.send("There's no tournament to join. Start one with `!tournament create`.")
+            return
+        pets = get_user_pets(user_id)
+        if not pets:
+            await ctx.send("You don't have any pets! Use `!adopt` to get one.")
+            return
+        if pet_num < 1 or pet_num > len(pets):
+            await ctx.send("Invalid pet number!")
+            return
+
+        reason = add_entrant(tournament, user_id, pets[pet_num - 1])
+        if reason:
+            await ctx.send(reason)
+            return
+        set_tournament(tournament["guild_id"], tournament)
+        await ctx.send(f"{ctx.author.mention} entered **{pets[pet_num - 1]['name']}** "
+                       f"({len(tournament['entrants'])} entrants).")
+
+    @tournament.command(name="leave")
+    async def leave(self, ctx):
+        """Withdraw your pet before the tournament starts"""
+        tournament = get_tournament(str(ctx.guild.id))
+        if tournament is None or tournament["status"] != "open":
+            await ctx.send("There's no tournament open for registration.")
+            return
+        if not remove_entrant(tournament, str(ctx.author.id)):
+            await ctx.send("You haven't entered this tournament.")
+            return
+        set_tournament(tournament["guild_id"], tournament)
+        await ctx.send(f"{ctx.author.mention} withdrew from the tournament.")
+
+    @tournament.command(name="start")
+    async def start(self, ctx):
+        """Close registration and play the tournament"""
+        tournament = get_tournament(str(ctx.guild.id))
+        if tournament is None or tournament["status"] != "open":
+            await ctx.send("There's no tournament open for registration.")
+            return
+        if not self.can_manage(ctx, tournament):
+            await ctx.send("Only the organizer can start the tournament.")
+            return
+        if len(tournament["entrants"]) < TOURNAMENT_MIN_ENTRANTS:
+            await ctx.send(f"A tournament needs at least {TOURNAMENT_MIN_ENTRANTS} entrants.")
+            return
+
+        start_tournament(tournament)
+        tournament["channel_id"] = ctx.channel.id
+        set_tournament(tournament["guild_id"], tournament)
+        await ctx.send(f"🏆 The tournament begins! {len(tournament['entrants'])} pets, "
+                       f"{tournament['total_rounds']} rounds. Results will be posted here.")
+        self.launch(tournament["guild_id"])
+
+    @tournament.command(name="resume")
+    async def resume(self, ctx):
+        """Continue a tournament that was interrupted"""
+        guild_id = str(ctx.guild.id)
+        tournament = get_tournament(guild_id)
+        if tournament is None or tournament["status"] != "running":
+            await ctx.send("There's no running tournament to resume.")
+            return
+        if not self.can_manage(ctx, tournament):
+            await ctx.send("Only the organizer can resume the tournament.")
+            return
+        task = self.running.get(guild_id)
+        if task is not None and not task.done():
+            await ctx.send("The tournament is already being played!")
+            return
+        await ctx.send("Resuming the tournament...")
+        self.launch(guild_id)
+
+    @tournament.command(name="cancel")
+    async def cancel(self, ctx):
+        """Cancel the tournament; no prizes are paid"""
+        guild_id = str(ctx.guild.id)
+        tournament = get_tournament(guild_id)
+        if tournament is None or tournament["status"] not in ("open", "running"):
+            await ctx.send("There's no tournament to cancel.")
+            return
+        if not self.can_manage(ctx, tournament):
+            await ctx.send("Only the organizer can cancel the tournament.")
+            return
+        task = self.running.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+        tournament["status"] = "cancelled"
+        set_tournament(guild_id, tournament)
+        clear_journal(tournament)
+        await ctx.send("The tournament was cancelled.")
+
+async def setup(bot):
+    await bot.add_cog(TournamentCommands(bot))
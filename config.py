@@ -1,14 +1,14 @@
 import os
 import json
+import importlib.util
 from dotenv import load_dotenv
-try:
-    import yaml
-    YAML_AVAILABLE = True
-except ImportError:
-    YAML_AVAILABLE = False
-    print("YAML module not available - custom config from YAML won't be loaded")
 from typing import Dict, Any, Optional
 
+# PyYAML is only imported when there is a custom config file to parse
+YAML_AVAILABLE = importlib.util.find_spec("yaml") is not None
+if not YAML_AVAILABLE:
+    print("YAML module not available - custom config from YAML won't be loaded")
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -16,6 +16,8 @@ load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN", "YOUR_TOKEN_HERE")
 PET_FILE = os.getenv("PET_FILE", "pets.json")
 BACKUP_INTERVAL = int(os.getenv("BACKUP_INTERVAL", 3600))
+REPLAY_FILE = os.getenv("REPLAY_FILE", "replays.bin")
+PEDIGREE_FILE = os.getenv("PEDIGREE_FILE", "pedigree.bin")
 
 # Game settings
 STARTING_COINS = int(os.getenv("STARTING_COINS", 100))
@@ -94,16 +96,21 @@ ADMIN_IDS = os.getenv("ADMIN_IDS", "").split(",")
 # Load custom items if available
 def load_custom_config(file_path: str = "custom_config.yaml") -> Dict[str, Any]:
     """Load custom configuration from YAML file if it exists"""
+    if not os.path.exists(file_path):
+        return {}
+    
     if not YAML_AVAILABLE:
         print(f"Warning: YAML module not available, can't load {file_path}")
         return {}
     
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r') as file:
-                return yaml.safe_load(file)
-        except Exception as e:
-            print(f"Error loading custom config: {e}")
+    try:
+        import yaml
+        # The C loader is several times faster when PyYAML was built with libyaml
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        with open(file_path, 'r') as file:
+            return yaml.load(file, Loader=loader) or {}
+    except Exception as e:
+        print(f"Error loading custom config: {e}")
     return {}
 
 # Try to load custom configuration
@@ -152,6 +159,54 @@ MOVES_BY_LEVEL = {
     30: ["Mystic Wave"]
 }
 
+# Auto battles: the move policy player pets use (see battle_engine.POLICIES)
+AUTO_BATTLE_POLICY = os.getenv("AUTO_BATTLE_POLICY", "domain_timing")
+
+# PvE wild pet opponents by difficulty
+PVE_DIFFICULTIES = {
+    "easy": {"rarity": "common", "policy": "random", "reward_percent": 25},
+    "normal": {"rarity": "rare", "policy": "greedy", "reward_percent": 50},
+    "hard": {"rarity": "mythic", "policy": "domain_timing", "reward_percent": 100}
+}
+
+# Concurrent battle limits
+MAX_BATTLES = int(os.getenv("MAX_BATTLES", 50))
+MAX_BATTLES_PER_GUILD = int(os.getenv("MAX_BATTLES_PER_GUILD", 5))
+MAX_BATTLES_PER_CHANNEL = int(os.getenv("MAX_BATTLES_PER_CHANNEL", 2))
+
+# A battle with no player input for this many seconds is forfeited by whoever's turn it is
+BATTLE_IDLE_TIMEOUT = int(os.getenv("BATTLE_IDLE_TIMEOUT", 120))
+
+# A player who lets this many of their turns time out in a row forfeits
+MAX_MISSED_TURNS = 3
+
+# Elo ratings for player battles
+ELO_START = 1000
+ELO_K = 32
+
+# Matchmaking: the accepted rating gap starts narrow and widens while a player waits
+MATCH_WINDOW_START = 50
+MATCH_WINDOW_STEP = 50
+MATCH_WINDOW_MAX = 400
+MATCH_WIDEN_INTERVAL = 10  # seconds per widening step
+MATCH_QUEUE_TIMEOUT = int(os.getenv("MATCH_QUEUE_TIMEOUT", 600))
+
+# Pedigrees: ancestry indexes and inbreeding checks look this many generations back
+PEDIGREE_DEPTH = 6
+PEDIGREE_MAX_GENERATIONS = 4  # deepest tree !pedigree draws
+
+# Seasonal events: rarity odds for pets handed out by !eventpets with no rarity given
+EVENT_RARITY_WEIGHTS = {"common": 0.8, "rare": 0.17, "mythic": 0.03}
+
+# Battle replays: the oldest records are dropped once the store is over this size
+REPLAY_STORE_BYTES = int(os.getenv("REPLAY_STORE_BYTES", 2 * 1024 * 1024))
+
+# Tournaments
+TOURNAMENT_MAX_ENTRANTS = int(os.getenv("TOURNAMENT_MAX_ENTRANTS", 256))
+TOURNAMENT_MIN_ENTRANTS = 2
+TOURNAMENT_ROUND_DELAY = 5  # seconds between posting one round and playing the next
+TOURNAMENT_PRIZES = [500, 250, 100]  # coins for 1st, 2nd and 3rd place
+
 # Economy Settings
 DAILY_REWARD = 100
 
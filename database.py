@@ -12,6 +12,8 @@ _data = {
     "coins": {},
     "inventory": {},
     "daily_rewards": {},
+    "tournaments": {},
+    "gene_catalog": {},
     "last_backup": time.time()
 }
 
@@ -76,11 +78,22 @@ def get_user_pets(user_id: str) -> List[Dict[str, Any]]:
     """Get a user's pets"""
     return _data["pets"].get(user_id, [])
 
+def get_all_pets() -> List[Dict[str, Any]]:
+    """Get every stored pet across all users"""
+    return [pet for pets in _data["pets"].values() for pet in pets]
+
 def set_user_pets(user_id: str, pets: List[Dict[str, Any]]) -> None:
     """Set a user's pets"""
     _data["pets"][user_id] = pets
     save_data()
 
+def add_pets_bulk(new_pets: Dict[str, List[Dict[str, Any]]]) -> int:
+    """Add pets to many users' collections with a single save; returns how many were added"""
+    for user_id, pets in new_pets.items():
+        _data["pets"].setdefault(user_id, []).extend(pets)
+    save_data()
+    return sum(len(pets) for pets in new_pets.values())
+
 def get_user_coins(user_id: str) -> int:
     """Get a user's coin balance"""
     return _data["coins"].get(user_id, 0)
@@ -133,5 +146,21 @@ def set_last_daily(user_id: str, timestamp: float) -> None:
     _data["daily_rewards"][user_id] = timestamp
     save_data()
 
-# Initialize database by loading saved data
-load_data() 
\ No newline at end of file
+# Tournament functions
+def get_tournament(guild_id: str) -> Optional[Dict[str, Any]]:
+    """Get a guild's current tournament"""
+    return _data["tournaments"].get(guild_id)
+
+def get_all_tournaments() -> List[Dict[str, Any]]:
+    """Get every guild's current tournament"""
+    return list(_data["tournaments"].values())
+
+def set_tournament(guild_id: str, tournament: Optional[Dict[str, Any]]) -> None:
+    """Save a guild's tournament, or remove it when tournament is None"""
+    if tournament is None:
+        _data["tournaments"].pop(guild_id, None)
+    else:
+        _data["tournaments"][guild_id] = tournament
+    save_data()
+
+# Saved data is loaded by the bot during startup (see bot.main), not at import
@@ -0,0 +1,125 @@
+import asyncio
+import math
+import time
+from typing import Dict, Any, List, Optional, Callable
+
+# Timer wheel resolution: timeouts fire on the first tick at or after their deadline
+WHEEL_TICK = 0.5
+WHEEL_SLOTS = 128
+
+# Global dispatcher storage
+_waiters: Dict[tuple, List[Dict[str, Any]]] = {}  # (event, channel id, user id, message id) -> waiters
+_wheel: List[List[Dict[str, Any]]] = [[] for _ in range(WHEEL_SLOTS)]
+_state = {
+    "started": time.monotonic(),
+    "tick": 0,      # last tick the wheel processed
+    "task": None    # the wheel's ticker, running while anything is waiting
+}
+_stats = {
+    "events": 0,
+    "checks": 0,
+    "matched": 0,
+    "expired": 0
+}
+
+def _current_tick() -> int:
+    return int((time.monotonic() - _state["started"]) / WHEEL_TICK)
+
+def _schedule(waiter: Dict[str, Any], timeout: float) -> None:
+    """Put a waiter on the timer wheel"""
+    waiter["expires"] = _current_tick() + max(1, math.ceil(timeout / WHEEL_TICK))
+    _wheel[waiter["expires"] % WHEEL_SLOTS].append(waiter)
+    if _state["task"] is None:
+        _state["tick"] = _current_tick()
+        _state["task"] = asyncio.create_task(_run_wheel())
+
+async def _run_wheel() -> None:
+    """Expire timed-out waiters, one wheel slot per tick"""
+    try:
+        while any(_wheel):
+            await asyncio.sleep(WHEEL_TICK)
+            # Catch up on every tick that passed, in case the event loop was busy
+            while _state["tick"] < _current_tick():
+                _state["tick"] += 1
+                slot = _wheel[_state["tick"] % WHEEL_SLOTS]
+                # Waiters due on a later turn of the wheel stay in the slot
+                slot[:] = [waiter for waiter in slot if not _expire(waiter)]
+    finally:
+        _state["task"] = None
+
+def _expire(waiter: Dict[str, Any]) -> bool:
+    """Time a waiter out if it's due; returns whether it can leave the wheel"""
+    if waiter["future"].done():
+        return True
+    if waiter["expires"] > _state["tick"]:
+        return False
+    waiter["future"].set_exception(asyncio.TimeoutError())
+    _stats["expired"] += 1
+    return True
+
+async def _wait(key: tuple, timeout: float, check: Optional[Callable[..., bool]]) -> Any:
+    waiter = {"future": asyncio.get_running_loop().create_future(), "check": check}
+    _waiters.setdefault(key, []).append(waiter)
+    _schedule(waiter, timeout)
+    try:
+        return await waiter["future"]
+    finally:
+        # Answered and cancelled waiters leave the wheel right away instead of at their deadline
+        slot = _wheel[waiter["expires"] % WHEEL_SLOTS]
+        if waiter in slot:
+            slot.remove(waiter)
+        waiters = _waiters.get(key)
+        if waiters is not None:
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                del _waiters[key]
+
+async def wait_for_message(channel_id: int, user_id: int, timeout: float,
+                           check: Callable[[Any], bool] = None):
+    """Wait for a user's next message in a channel that passes check; raises asyncio.TimeoutError"""
+    return await _wait(("message", channel_id, user_id, None), timeout, check)
+
+async def wait_for_reaction(channel_id: int, user_id: int, message_id: int, timeout: float,
+                            check: Callable[[Any, Any], bool] = None):
+    """Wait for a user's reaction to a message that passes check; returns (reaction, user)"""
+    return await _wait(("reaction", channel_id, user_id, message_id), timeout, check)
+
+def _dispatch(key: tuple, *args) -> None:
+    """Resolve the waiters for one key whose check accepts the event"""
+    _stats["events"] += 1
+    waiters = _waiters.get(key)
+    if not waiters:
+        return
+    for waiter in list(waiters):
+        if waiter["future"].done():
+            continue
+        _stats["checks"] += 1
+        try:
+            if waiter["check"] is not None and not waiter["check"](*args):
+                continue
+        except Exception as e:
+            waiter["future"].set_exception(e)
+            continue
+        waiter["future"].set_result(args[0] if len(args) == 1 else args)
+        _stats["matched"] += 1
+
+async def on_message(message) -> None:
+    """Listener: route a message to whoever is waiting on its channel and author"""
+    _dispatch(("message", message.channel.id, message.author.id, None), message)
+
+async def on_reaction_add(reaction, user) -> None:
+    """Listener: route a reaction to whoever is waiting on that user and message"""
+    message = reaction.message
+    _dispatch(("reaction", message.channel.id, user.id, message.id), reaction, user)
+
+def get_dispatcher_stats() -> Dict[str, Any]:
+    """Get pending waiter counts and how many events and checks were handled"""
+    return dict(_stats, waiting=sum(len(waiters) for waiters in _waiters.values()),
+                keys=len(_waiters), timers=sum(len(slot) for slot in _wheel))
+
+def format_dispatcher_stats() -> str:
+    """Format dispatcher statistics as one line"""
+    stats = get_dispatcher_stats()
+    return (f"{stats['waiting']} waiting on {stats['keys']} keys, {stats['events']} events, "
+            f"{stats['checks']} checks, {stats['matched']} matched, {stats['expired']} timed out")
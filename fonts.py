@@ -0,0 +1,88 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Dict, Tuple
+
+from startup import lazy_import
+
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
+
+FONTS_DIR = os.path.join("assets", "fonts")
+
+# Rendered text sprites kept for reuse (pet names, stat lines, captions)
+MAX_CACHED_TEXT = 512
+
+_fonts: Dict[tuple, ImageFont.ImageFont] = {}
+_text_cache: Dict[tuple, Tuple[Image.Image, Tuple[int, int]]] = {}
+_cache_lock = threading.Lock()
+
+def get_font(face: str = "default", size: int = 24) -> ImageFont.ImageFont:
+    """Get a font by face and size, loading the file only once"""
+    key = (face, size)
+    font = _fonts.get(key)
+    if font is None:
+        path = os.path.join(FONTS_DIR, f"{face}.ttf")
+        try:
+            font = ImageFont.truetype(path, size)
+        except Exception:
+            print(f"Warning: font {path} could not be loaded, using default font")
+            try:
+                font = ImageFont.load_default(size)
+            except TypeError:
+                # Pillow < 10.1 only has the fixed-size bitmap font
+                font = ImageFont.load_default()
+        _fonts[key] = font
+    return font
+
+def measure_text(text: str, face: str = "default", size: int = 24, anchor: str = "mm") -> Tuple[int, int, int, int]:
+    """Get the bounding box of text relative to its anchor point"""
+    sprite, offset = _render_text(text, face, size, (255, 255, 255, 255), anchor)
+    return (offset[0], offset[1], offset[0] + sprite.width, offset[1] + sprite.height)
+
+def _render_text(text: str, face: str, size: int, fill: tuple, anchor: str) -> Tuple[Image.Image, Tuple[int, int]]:
+    """Lay out and rasterise text once, returning the sprite and its offset from the anchor"""
+    fill = tuple(fill) + (255,) * (4 - len(fill))
+    key = (text, face, size, fill, anchor)
+    cached = _text_cache.get(key)
+    if cached is None:
+        font = get_font(face, size)
+        left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox(
+            (0, 0), text, font=font, anchor=anchor)
+
+        mask = Image.new("L", (max(1, right - left), max(1, bottom - top)), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, fill=fill[3], font=font, anchor=anchor)
+
+        sprite = Image.new("RGBA", mask.size, fill[:3] + (0,))
+        sprite.putalpha(mask)
+        cached = (sprite, (left, top))
+
+        # Drop the oldest sprite once the cache is full (renders may run in worker threads)
+        with _cache_lock:
+            if len(_text_cache) >= MAX_CACHED_TEXT:
+                _text_cache.pop(next(iter(_text_cache)))
+            _text_cache[key] = cached
+    return cached
+
+def draw_text(img: Image.Image, xy: Tuple[int, int], text: str, face: str = "default",
+              size: int = 24, fill: tuple = (255, 255, 255, 255), anchor: str = "mm") -> None:
+    """Draw text onto an RGBA image in place using the cached text sprite"""
+    sprite, (left, top) = _render_text(text, face, size, fill, anchor)
+    x = int(xy[0]) + left
+    y = int(xy[1]) + top
+
+    # Clip the sprite to the image bounds
+    src_left = max(0, -x)
+    src_top = max(0, -y)
+    src_right = min(sprite.width, img.width - x)
+    src_bottom = min(sprite.height, img.height - y)
+    if src_right <= src_left or src_bottom <= src_top:
+        return
+
+    img.alpha_composite(sprite, dest=(x + src_left, y + src_top),
+                        source=(src_left, src_top, src_right, src_bottom))
+
+def clear_text_cache() -> None:
+    """Drop all cached text sprites"""
+    _text_cache.clear()
@@ -0,0 +1,259 @@
+import time
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Optional
+
+from config import COLORS, TRAITS, SPECIES, MAX_HEALTH, MAX_HAPPINESS
+from database import _data
+from startup import lazy_import
+
+np = lazy_import("numpy")
+
+# Genome layout: one byte per field. Each appearance gene has an expressed allele (A)
+# and a hidden one (B) that can resurface in later generations
+COLOR_A, COLOR_B, TRAIT_A, TRAIT_B, SPECIES_A, SPECIES_B = range(6)
+HEALTH_POTENTIAL, HAPPINESS_POTENTIAL, STRENGTH_POTENTIAL = 6, 7, 8
+RARITY = 9
+GENOME_LENGTH = 10
+
+# Appearance genes: (catalog list, expressed allele field, pet key)
+GENES = [("colors", COLOR_A, "color"), ("traits", TRAIT_A, "trait"), ("species", SPECIES_A, "species")]
+
+RARITIES = ["common", "rare", "mythic"]
+
+# Stat potentials run from 0 to MAX_POTENTIAL and scale the stat bonus a child can roll.
+# Founders start at NEUTRAL_POTENTIAL, which gives exactly the base bonus range. Mutations
+# step up or down with equal chance, so bred lines wander around the middle of the range
+# instead of drifting one way
+MAX_POTENTIAL = 15
+NEUTRAL_POTENTIAL = 8
+POTENTIAL_MUTATION_RATE = 0.1
+
+# Bonus a child can roll over its parents' average at the neutral potential: (stat, cap, potential field, bonus)
+STAT_BONUSES = [
+    ("health", MAX_HEALTH, HEALTH_POTENTIAL, 10),
+    ("happiness", MAX_HAPPINESS, HAPPINESS_POTENTIAL, 10),
+    ("strength", 50, STRENGTH_POTENTIAL, 5)
+]
+
+# Chance the child's rarity rolls the higher outcome, by parent rarities:
+# (a mythic parent, both rare, one rare, both common) -> (chance, higher, lower)
+RARITY_ODDS = [
+    (0.4, "mythic", "rare"),
+    (0.2, "mythic", "rare"),
+    (0.6, "rare", "common"),
+    (0.2, "rare", "common")
+]
+
+# Catalog indexes are stored in genomes, so the catalog only ever grows
+_catalog_state = {"merged": False}
+
+def get_catalog() -> Dict[str, List[str]]:
+    """Gene catalog persisted with the data; config entries are appended on first use"""
+    catalog = _data.setdefault("gene_catalog", {})
+    if not _catalog_state["merged"]:
+        for name, configured in (("colors", COLORS), ("traits", TRAITS), ("species", SPECIES)):
+            values = catalog.setdefault(name, [])
+            values.extend(value for value in dict.fromkeys(configured) if value not in values)
+        _catalog_state["merged"] = True
+    return catalog
+
+def gene_index(gene: str, value: str) -> int:
+    """Catalog index of a gene value, adding values only legacy pets carry
+
+    Raises ValueError when the catalog has no room left, rather than giving the
+    pet some other look.
+    """
+    values = get_catalog()[gene]
+    if value not in values:
+        if len(values) >= 256:
+            raise ValueError(f"The gene catalog for {gene} is full, so {value} can't be bred.")
+        values.append(value)
+    return values.index(value)
+
+def parse_legacy_name(name: str) -> Tuple[str, str, str]:
+    """Split a pet name into (color, trait, species) using the catalog
+
+    Known colors and species are matched at the ends of the name, so multi-word
+    parts work; whatever is left in the middle is the trait.
+    """
+    catalog = get_catalog()
+    words = name.split()
+    if len(words) < 3:
+        # Too short to hold all three; reuse what there is
+        words = (words * 3)[:3] if words else ["Plain", "Plain", "Pet"]
+
+    color_words = 1
+    for count in range(len(words) - 2, 0, -1):
+        if " ".join(words[:count]) in catalog["colors"]:
+            color_words = count
+            break
+    species_words = 1
+    for count in range(len(words) - color_words - 1, 0, -1):
+        if " ".join(words[-count:]) in catalog["species"]:
+            species_words = count
+            break
+    return (" ".join(words[:color_words]), " ".join(words[color_words:len(words) - species_words]),
+            " ".join(words[-species_words:]))
+
+def genome_from_pet(pet: Dict[str, Any]) -> bytes:
+    """A pet's genome; pets bred before genomes existed get one from their appearance"""
+    if "genome" in pet:
+        return bytes.fromhex(pet["genome"])
+    parsed = parse_legacy_name(pet["name"])
+    genome = bytearray(GENOME_LENGTH)
+    for (gene, field, key), legacy_value in zip(GENES, parsed):
+        # Without any history both alleles are the one the pet shows
+        genome[field] = genome[field + 1] = gene_index(gene, pet.get(key, legacy_value))
+    genome[HEALTH_POTENTIAL] = genome[HAPPINESS_POTENTIAL] = genome[STRENGTH_POTENTIAL] = NEUTRAL_POTENTIAL
+    genome[RARITY] = RARITIES.index(pet.get("rarity", "common"))
+    return bytes(genome)
+
+def express(genome: bytes) -> Dict[str, str]:
+    """The appearance a genome shows: color, trait, species and rarity"""
+    catalog = get_catalog()
+    traits = {key: catalog[gene][genome[field]] for gene, field, key in GENES}
+    traits["rarity"] = RARITIES[genome[RARITY]]
+    return traits
+
+def max_bonus(bonus, potential):
+    """Largest stat bonus at a potential: the base bonus at NEUTRAL_POTENTIAL, about twice it at the top"""
+    return bonus * (2 * potential + 1) // (MAX_POTENTIAL + 1)
+
+def _rarity_case(rarity1, rarity2):
+    """Which RARITY_ODDS row applies to each pair of parent rarity codes"""
+    mythic = (rarity1 == 2) | (rarity2 == 2)
+    both_rare = (rarity1 == 1) & (rarity2 == 1)
+    one_rare = (rarity1 == 1) | (rarity2 == 1)
+    return np.select([mythic, both_rare, one_rare], [0, 1, 2], 3)
+
+def crossover(genomes1, genomes2, rng) -> Any:
+    """Cross two (N, GENOME_LENGTH) uint8 arrays of parent genomes into N child genomes"""
+    count = len(genomes1)
+    rows = np.arange(count)
+    children = np.empty_like(genomes1)
+
+    for _, field, _ in GENES:
+        # One allele from each parent, either of which may end up expressed
+        allele1 = genomes1[rows, field + rng.integers(0, 2, count)]
+        allele2 = genomes2[rows, field + rng.integers(0, 2, count)]
+        swap = rng.integers(0, 2, count).astype(bool)
+        children[:, field] = np.where(swap, allele2, allele1)
+        children[:, field + 1] = np.where(swap, allele1, allele2)
+
+    for field in (HEALTH_POTENTIAL, HAPPINESS_POTENTIAL, STRENGTH_POTENTIAL):
+        inherited = np.where(rng.integers(0, 2, count).astype(bool), genomes1[:, field], genomes2[:, field])
+        mutation = np.where(rng.random(count) < POTENTIAL_MUTATION_RATE, rng.choice([-1, 1], count), 0)
+        children[:, field] = np.clip(inherited.astype(np.int16) + mutation, 0, MAX_POTENTIAL)
+
+    chance = np.array([row[0] for row in RARITY_ODDS])
+    higher = np.array([RARITIES.index(row[1]) for row in RARITY_ODDS])
+    lower = np.array([RARITIES.index(row[2]) for row in RARITY_ODDS])
+    case = _rarity_case(genomes1[:, RARITY], genomes2[:, RARITY])
+    children[:, RARITY] = np.where(rng.random(count) < chance[case], higher[case], lower[case])
+    return children
+
+def breed_batch(pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]], seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Breed many pairs of parents in one go; the same pairs and seed always give the same children"""
+    if not pairs:
+        return []
+    rng = np.random.default_rng(seed)
+    genomes1 = np.frombuffer(b"".join(genome_from_pet(pet1) for pet1, _ in pairs), dtype=np.uint8).reshape(-1, GENOME_LENGTH)
+    genomes2 = np.frombuffer(b"".join(genome_from_pet(pet2) for _, pet2 in pairs), dtype=np.uint8).reshape(-1, GENOME_LENGTH)
+    children = crossover(genomes1, genomes2, rng)
+
+    # Stats average the parents' and add a bonus that the child's potential scales
+    stats = {}
+    for stat, cap, field, bonus in STAT_BONUSES:
+        parents = np.array([(pet1[stat], pet2[stat]) for pet1, pet2 in pairs], dtype=float)
+        rolled = rng.integers(0, max_bonus(bonus, children[:, field].astype(int)) + 1)
+        stats[stat] = np.minimum(cap, parents.sum(axis=1) // 2 + rolled).astype(int)
+
+    created = time.time()
+    pets = []
+    for i, genome in enumerate(children):
+        genome = genome.tobytes()
+        traits = express(genome)
+        pets.append({
+            "name": f"{traits['color']} {traits['trait']} {traits['species']}",
+            "species": traits["species"],
+            "color": traits["color"],
+            "trait": traits["trait"],
+            "genome": genome.hex(),
+            "health": int(stats["health"][i]),
+            "happiness": int(stats["happiness"][i]),
+            "strength": int(stats["strength"][i]),
+            "rarity": traits["rarity"],
+            "level": 1,
+            "xp": 0,
+            "created_at": created
+        })
+    return pets
+
+def breed(pet1: Dict[str, Any], pet2: Dict[str, Any], seed: Optional[int] = None) -> Dict[str, Any]:
+    """Breed a single pair of parents"""
+    return breed_batch([(pet1, pet2)], seed)[0]
+
+# Previews: exact outcome distributions from the crossover rules, memoized by parent genes
+
+@lru_cache(maxsize=None)
+def allele_odds(a1: int, b1: int, a2: int, b2: int) -> Tuple[Tuple[int, float], ...]:
+    """Chance of each value being expressed: any of the four parental alleles, equally likely"""
+    odds = {}
+    for allele in (a1, b1, a2, b2):
+        odds[allele] = odds.get(allele, 0.0) + 0.25
+    return tuple(sorted(odds.items(), key=lambda item: -item[1]))
+
+@lru_cache(maxsize=None)
+def rarity_odds(rarity1: int, rarity2: int) -> Tuple[Tuple[str, float], ...]:
+    """Chance of each child rarity for two parent rarity codes"""
+    # Same order as _rarity_case: a mythic parent, both rare, one rare, both common
+    if 2 in (rarity1, rarity2):
+        case = 0
+    elif rarity1 == rarity2 == 1:
+        case = 1
+    else:
+        case = 2 if 1 in (rarity1, rarity2) else 3
+    chance, higher, lower = RARITY_ODDS[case]
+    return tuple((rarity, odds) for rarity, odds in ((higher, chance), (lower, 1 - chance)) if odds > 0)
+
+@lru_cache(maxsize=None)
+def potential_odds(potential1: int, potential2: int) -> Tuple[Tuple[int, float], ...]:
+    """Chance of each child potential: one parent's, then maybe a +/-1 mutation"""
+    odds = {}
+    for inherited in (potential1, potential2):
+        for change, chance in ((0, 1 - POTENTIAL_MUTATION_RATE), (-1, POTENTIAL_MUTATION_RATE / 2),
+                               (1, POTENTIAL_MUTATION_RATE / 2)):
+            potential = min(MAX_POTENTIAL, max(0, inherited + change))
+            odds[potential] = odds.get(potential, 0.0) + 0.5 * chance
+    return tuple(sorted(odds.items()))
+
+@lru_cache(maxsize=None)
+def bonus_odds(potential1: int, potential2: int, bonus: int) -> Tuple[float, ...]:
+    """Chance of each stat bonus, from 0 up, given the parents' potentials"""
+    odds = [0.0] * (max_bonus(bonus, MAX_POTENTIAL) + 1)
+    for potential, chance in potential_odds(potential1, potential2):
+        highest = max_bonus(bonus, potential)
+        for rolled in range(highest + 1):
+            odds[rolled] += chance / (highest + 1)
+    return tuple(odds)
+
+def preview_breeding(pet1: Dict[str, Any], pet2: Dict[str, Any]) -> Dict[str, Any]:
+    """Exact outcome distributions for breeding two pets, without breeding them
+
+    Returns rarity, color, trait and species odds as (value, chance) pairs, and
+    each stat's (lowest, highest, average).
+    """
+    genome1, genome2 = genome_from_pet(pet1), genome_from_pet(pet2)
+    catalog = get_catalog()
+    preview = {"rarity": rarity_odds(genome1[RARITY], genome2[RARITY])}
+    for gene, field, key in GENES:
+        odds = allele_odds(genome1[field], genome1[field + 1], genome2[field], genome2[field + 1])
+        preview[key] = [(catalog[gene][allele], chance) for allele, chance in odds]
+
+    for stat, cap, field, bonus in STAT_BONUSES:
+        base = (pet1[stat] + pet2[stat]) // 2
+        odds = bonus_odds(genome1[field], genome2[field], bonus)
+        outcomes = [(min(cap, base + rolled), chance) for rolled, chance in enumerate(odds) if chance > 0]
+        preview[stat] = (int(min(value for value, _ in outcomes)), int(max(value for value, _ in outcomes)),
+                         sum(value * chance for value, chance in outcomes))
+    return preview
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import io
+import time
+from typing import Dict, Any, List, Tuple
+
+from startup import lazy_import
+
+Image = lazy_import("PIL.Image")
+features = lazy_import("PIL.features")
+
+# Whether Pillow was built with WebP support, checked on first encode
+_webp_available = {}
+
+# Encoding profiles per image type: formats are tried in order and the first
+# result under the byte budget wins (the smallest result is used if none fit)
+ENCODE_PROFILES = {
+    "pet": {"formats": [("webp", 85), ("webp", 70), ("png_palette", None)], "budget": 96 * 1024},
+    "battle": {"formats": [("webp", 80), ("webp", 65), ("webp", 50)], "budget": 128 * 1024},
+    "gallery": {"formats": [("webp", 80), ("webp", 65), ("webp", 50)], "budget": 384 * 1024},
+    # Flat UI sheets with text: lossless WebP is smallest and keeps the text sharp
+    "bracket": {"formats": [("webp_lossless", None), ("png_palette", None), ("webp", 80)], "budget": 256 * 1024},
+    "default": {"formats": [("png", None)], "budget": None}
+}
+
+# File extension for each encoder
+FORMAT_EXTENSIONS = {
+    "webp": "webp",
+    "webp_lossless": "webp",
+    "png": "png",
+    "png_optimized": "png",
+    "png_palette": "png"
+}
+
+# Per image type encode statistics
+_encode_stats: Dict[str, Dict[str, Any]] = {}
+
+def _encode(img: Image.Image, fmt: str, quality: int = None) -> bytes:
+    """Encode an image with a single encoder"""
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        img.save(buffer, format="WEBP", quality=quality, method=4)
+    elif fmt == "webp_lossless":
+        img.save(buffer, format="WEBP", lossless=True, method=4)
+    elif fmt == "png_palette":
+        # Flat sprites and UI frames survive a 256 colour palette with no visible loss
+        img.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(buffer, format="PNG", optimize=True)
+    elif fmt == "png_optimized":
+        img.save(buffer, format="PNG", optimize=True)
+    else:
+        img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def webp_available() -> bool:
+    """Check (once) whether Pillow can encode WebP"""
+    if "webp" not in _webp_available:
+        _webp_available["webp"] = features.check("webp")
+    return _webp_available["webp"]
+
+def _profile_formats(kind: str) -> Tuple[List[Tuple[str, Any]], Any]:
+    profile = ENCODE_PROFILES.get(kind, ENCODE_PROFILES["default"])
+    formats = profile["formats"]
+    if not webp_available():
+        formats = [(fmt, quality) for fmt, quality in formats if not fmt.startswith("webp")]
+        formats = formats or [("png", None)]
+    return formats, profile["budget"]
+
+def encode_image(img: Image.Image, kind: str = "default") -> Tuple[bytes, str]:
+    """Encode an image for upload using its type's profile, returning (data, extension)"""
+    started = time.perf_counter()
+    formats, budget = _profile_formats(kind)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+
+    best = None
+    for fmt, quality in formats:
+        try:
+            data = _encode(img, fmt, quality)
+        except Exception as e:
+            print(f"Error encoding {kind} image as {fmt}: {e}")
+            continue
+        if best is None or len(data) < len(best[0]):
+            best = (data, fmt)
+        if budget is None or len(data) <= budget:
+            best = (data, fmt)
+            break
+
+    if best is None:
+        best = (_encode(img, "png"), "png")
+
+    data, fmt = best
+    _record(kind, fmt, len(data), (time.perf_counter() - started) * 1000)
+    return data, FORMAT_EXTENSIONS[fmt]
+
+def _record(kind: str, fmt: str, size: int, elapsed_ms: float) -> None:
+    stats = _encode_stats.setdefault(kind, {
+        "count": 0, "total_ms": 0.0, "total_bytes": 0, "max_bytes": 0, "over_budget": 0, "formats": {}
+    })
+    budget = ENCODE_PROFILES.get(kind, ENCODE_PROFILES["default"])["budget"]
+    stats["count"] += 1
+    stats["total_ms"] += elapsed_ms
+    stats["total_bytes"] += size
+    stats["max_bytes"] = max(stats["max_bytes"], size)
+    if budget is not None and size > budget:
+        stats["over_budget"] += 1
+    stats["formats"][fmt] = stats["formats"].get(fmt, 0) + 1
+
+def get_encode_stats() -> Dict[str, Dict[str, Any]]:
+    """Get encode time and output size statistics per image type"""
+    summary = {}
+    for kind, stats in _encode_stats.items():
+        count = max(1, stats["count"])
+        summary[kind] = {
+            "count": stats["count"],
+            "avg_ms": stats["total_ms"] / count,
+            "avg_bytes": stats["total_bytes"] // count,
+            "max_bytes": stats["max_bytes"],
+            "over_budget": stats["over_budget"],
+            "formats": dict(stats["formats"])
+        }
+    return summary
+
+def format_encode_stats() -> str:
+    """Format encode statistics as one line per image type"""
+    lines = []
+    for kind, stats in sorted(get_encode_stats().items()):
+        lines.append(f"{kind}: {stats['count']}x, {stats['avg_ms']:.1f} ms, "
+                     f"{stats['avg_bytes'] / 1024:.1f} KB avg")
+    return "\n".join(lines) or "No images encoded yet"
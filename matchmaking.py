@@ -0,0 +1,160 @@
+import bisect
+import itertools
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import (ELO_START, ELO_K, MATCH_WINDOW_START, MATCH_WINDOW_STEP, MATCH_WINDOW_MAX,
+                    MATCH_WIDEN_INTERVAL, MATCH_QUEUE_TIMEOUT)
+
+# Width of one rating bucket; a search only ever looks at the buckets inside the widest window
+RATING_BUCKET = 50
+
+# Global matchmaking storage
+_entries: Dict[str, Dict[str, Any]] = {}                    # user id -> queue entry, oldest first
+_buckets: Dict[Any, Dict[int, List[tuple]]] = {}            # guild id -> bucket -> sorted (rating, seq, user id)
+_sequence = itertools.count()
+_stats = {
+    "queued": 0,
+    "matched": 0,
+    "expired": 0,
+    "wait_seconds": 0.0
+}
+
+def get_rating(pet: Dict[str, Any]) -> float:
+    """A pet's Elo rating; unrated pets start at ELO_START"""
+    return pet.get("rating", ELO_START)
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    """Chance of winning against an opponent according to the Elo model"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+def update_ratings(pet1: Dict[str, Any], pet2: Dict[str, Any], winner: str) -> Tuple[int, int]:
+    """Update both pets' ratings after a battle ("challenger", "opponent" or "draw"); returns the changes"""
+    rating1, rating2 = get_rating(pet1), get_rating(pet2)
+    score1 = {"challenger": 1.0, "opponent": 0.0}.get(winner, 0.5)
+    change = round(ELO_K * (score1 - expected_score(rating1, rating2)))
+    pet1["rating"] = rating1 + change
+    pet2["rating"] = rating2 - change
+    return change, -change
+
+def _bucket(rating: float) -> int:
+    return int(rating // RATING_BUCKET)
+
+def window(entry: Dict[str, Any], now: float = None) -> float:
+    """Rating difference an entry accepts; it widens the longer the entry waits"""
+    now = now if now is not None else time.monotonic()
+    steps = int((now - entry["joined"]) / MATCH_WIDEN_INTERVAL)
+    return min(MATCH_WINDOW_MAX, MATCH_WINDOW_START + MATCH_WINDOW_STEP * steps)
+
+def _insert(entry: Dict[str, Any]) -> None:
+    buckets = _buckets.setdefault(entry["guild_id"], {})
+    bisect.insort(buckets.setdefault(_bucket(entry["rating"]), []), entry["key"])
+
+def _remove(entry: Dict[str, Any]) -> None:
+    buckets = _buckets[entry["guild_id"]]
+    bucket = buckets[_bucket(entry["rating"])]
+    del bucket[bisect.bisect_left(bucket, entry["key"])]
+    if not bucket:
+        del buckets[_bucket(entry["rating"])]
+        if not buckets:
+            del _buckets[entry["guild_id"]]
+
+def _nearest(entry: Dict[str, Any], direction: int) -> Optional[Dict[str, Any]]:
+    """Closest other entry at or above (direction 1) or below (direction -1) an entry's rating"""
+    buckets = _buckets.get(entry["guild_id"], {})
+    start = _bucket(entry["rating"])
+    # Nobody can accept a gap wider than MATCH_WINDOW_MAX, so the scan stops there
+    for offset in range(MATCH_WINDOW_MAX // RATING_BUCKET + 2):
+        bucket = buckets.get(start + direction * offset)
+        if not bucket:
+            continue
+        position = bisect.bisect_left(bucket, entry["key"])
+        # Step past the entry itself, then take the neighbour on the requested side
+        candidates = bucket[position:] if direction > 0 else bucket[:position][::-1]
+        for _, _, user_id in candidates[:2]:
+            if user_id != entry["user_id"]:
+                return _entries[user_id]
+    return None
+
+def find_opponent(entry: Dict[str, Any], now: float = None) -> Optional[Dict[str, Any]]:
+    """The closest-rated waiting player either side's window accepts"""
+    best = None
+    for direction in (1, -1):
+        candidate = _nearest(entry, direction)
+        if candidate is None:
+            continue
+        gap = abs(candidate["rating"] - entry["rating"])
+        if gap <= max(window(entry, now), window(candidate, now)):
+            if best is None or gap < abs(best["rating"] - entry["rating"]):
+                best = candidate
+    return best
+
+def _pair(entry: Dict[str, Any], opponent: Dict[str, Any], now: float) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    for queued in (entry, opponent):
+        dequeue(queued["user_id"])
+        _stats["wait_seconds"] += now - queued["joined"]
+    _stats["matched"] += 1
+    # The player who waited longer is the challenger
+    return (opponent, entry) if opponent["joined"] <= entry["joined"] else (entry, opponent)
+
+def enqueue(guild_id: Any, user_id: str, pet_key: str, rating: float, **extra) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Queue a pet; returns the (challenger, opponent) entries if it was paired right away"""
+    now = time.monotonic()
+    entry = dict(extra, guild_id=guild_id, user_id=user_id, pet_key=pet_key, rating=rating, joined=now,
+                 key=(rating, next(_sequence), user_id))
+    opponent = find_opponent(entry, now)
+    _entries[user_id] = entry
+    _insert(entry)
+    _stats["queued"] += 1
+    if opponent is not None:
+        return _pair(entry, opponent, now)
+    return None
+
+def dequeue(user_id: str) -> Optional[Dict[str, Any]]:
+    """Take a player out of the queue, returning their entry if they were in it"""
+    entry = _entries.pop(user_id, None)
+    if entry is not None:
+        _remove(entry)
+    return entry
+
+def get_entry(user_id: str) -> Optional[Dict[str, Any]]:
+    """A player's queue entry, if they're waiting"""
+    return _entries.get(user_id)
+
+def queue_size(guild_id: Any = None) -> int:
+    """Players waiting in one guild, or everywhere"""
+    if guild_id is None:
+        return len(_entries)
+    return sum(len(bucket) for bucket in _buckets.get(guild_id, {}).values())
+
+def sweep_queue(now: float = None) -> Tuple[List[Tuple[Dict[str, Any], Dict[str, Any]]], List[Dict[str, Any]]]:
+    """Retry pairing with the widened windows and drop entries that waited too long
+
+    Returns the new (challenger, opponent) pairs and the expired entries.
+    """
+    now = now if now is not None else time.monotonic()
+    pairs, expired = [], []
+    # Oldest entries first, since theirs are the widest windows
+    for user_id in list(_entries):
+        entry = _entries.get(user_id)
+        if entry is None:
+            continue
+        if now - entry["joined"] > MATCH_QUEUE_TIMEOUT:
+            expired.append(dequeue(user_id))
+            _stats["expired"] += 1
+            continue
+        opponent = find_opponent(entry, now)
+        if opponent is not None:
+            pairs.append(_pair(entry, opponent, now))
+    return pairs, expired
+
+def get_matchmaking_stats() -> Dict[str, Any]:
+    """Get queue sizes and how many players were paired"""
+    return dict(_stats, waiting=len(_entries), guilds=len(_buckets),
+                avg_wait=round(_stats["wait_seconds"] / (2 * _stats["matched"]), 1) if _stats["matched"] else 0.0)
+
+def format_matchmaking_stats() -> str:
+    """Format matchmaking statistics as one line"""
+    stats = get_matchmaking_stats()
+    return (f"{stats['waiting']} waiting in {stats['guilds']} servers, {stats['matched']} matches, "
+            f"{stats['expired']} expired, {stats['avg_wait']:.0f}s avg wait")
@@ -0,0 +1,234 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+# Priorities: lower numbers go first within a channel
+PRIORITY_INTERACTIVE = 0  # replies a user is waiting on (command output, move menus)
+PRIORITY_ANIMATION = 1    # animation frames that can be merged or dropped
+PRIORITY_BULK = 2         # fan-out such as broadcasts
+PRIORITY_NAMES = ["interactive", "animation", "bulk"]
+
+# Token buckets per route and channel: (requests, per seconds)
+ROUTE_LIMITS = {
+    "send": (5, 5.0),
+    "edit": (5, 5.0),
+    "reaction": (1, 0.25)
+}
+
+# Bot-wide limit across every route and channel
+GLOBAL_LIMIT = (50, 1.0)
+
+# Global tokens only interactive calls may use, so animations and fan-out never starve them
+GLOBAL_INTERACTIVE_RESERVE = 10
+
+# A call slower than this was most likely held back by a 429, so its bucket slows down
+SLOW_CALL_SECONDS = 1.5
+
+# How much a bucket slows down after a slow call, and recovers after a fast one
+PENALTY_GROWTH = 2.0
+PENALTY_DECAY = 0.75
+MAX_PENALTY = 8.0
+
+# Global scheduler storage
+_queues: Dict[int, List[tuple]] = {}         # channel id -> heap of (priority, seq, job)
+_workers: Dict[int, asyncio.Task] = {}       # channel id -> task draining its queue
+_buckets: Dict[tuple, Dict[str, float]] = {}  # (route, channel id) -> token bucket
+_merge_jobs: Dict[tuple, Dict[str, Any]] = {}  # merge key -> queued job it can be folded into
+_sequence = itertools.count()
+_stats = {
+    "sent": 0,
+    "merged": 0,
+    "failed": 0,
+    "slowed": 0,
+    "wait_ms": 0.0,
+    "max_depth": 0
+}
+
+def _limit(route: str) -> tuple:
+    return GLOBAL_LIMIT if route == "global" else ROUTE_LIMITS[route]
+
+def _bucket(route: str, channel_id: Optional[int]) -> Dict[str, float]:
+    return _buckets.setdefault((route, channel_id), {
+        "tokens": float(_limit(route)[0]),
+        "updated": time.monotonic(),
+        "penalty": 1.0
+    })
+
+def _refill(route: str, channel_id: Optional[int]) -> Dict[str, float]:
+    capacity, _ = _limit(route)
+    bucket = _bucket(route, channel_id)
+    now = time.monotonic()
+    bucket["tokens"] = min(capacity, bucket["tokens"] + (now - bucket["updated"]) / route_interval(route, channel_id))
+    bucket["updated"] = now
+    return bucket
+
+def _reserve(route: str, channel_id: int, priority: int) -> float:
+    """Take a token from the route's and the global bucket, or return how long to wait for one"""
+    route_bucket = _refill(route, channel_id)
+    global_bucket = _refill("global", None)
+    needed = 1 if priority == PRIORITY_INTERACTIVE else 1 + GLOBAL_INTERACTIVE_RESERVE
+    wait = max((1 - route_bucket["tokens"]) * route_interval(route, channel_id),
+               (needed - global_bucket["tokens"]) * route_interval("global", None))
+    if wait > 0:
+        return wait
+    route_bucket["tokens"] -= 1
+    global_bucket["tokens"] -= 1
+    return 0.0
+
+def _adapt(route: str, channel_id: int, duration: float) -> None:
+    """Slow a bucket down after a call that was held back, and let it recover after fast ones"""
+    bucket = _bucket(route, channel_id)
+    if duration > SLOW_CALL_SECONDS:
+        bucket["penalty"] = min(MAX_PENALTY, bucket["penalty"] * PENALTY_GROWTH)
+        _stats["slowed"] += 1
+    else:
+        bucket["penalty"] = max(1.0, bucket["penalty"] * PENALTY_DECAY)
+
+def route_interval(route: str, channel_id: Optional[int]) -> float:
+    """Seconds per request a route currently allows in a channel"""
+    capacity, period = _limit(route)
+    return period / capacity * _bucket(route, channel_id)["penalty"]
+
+def _finish(job: Dict[str, Any], result: Any = None, error: Exception = None) -> None:
+    for future in job["futures"]:
+        if future.done():
+            continue
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+async def _drain(channel_id: int) -> None:
+    """Run a channel's queued calls in priority order as its buckets allow"""
+    queue = _queues[channel_id]
+    try:
+        while queue:
+            _, _, job = queue[0]
+            wait = _reserve(job["route"], channel_id, job["priority"])
+            if wait > 0:
+                # Something more urgent may be queued while this one waits, so look again after
+                await asyncio.sleep(wait)
+                continue
+
+            heapq.heappop(queue)
+            if job["merge_key"] is not None and _merge_jobs.get(job["merge_key"]) is job:
+                del _merge_jobs[job["merge_key"]]
+
+            started = time.monotonic()
+            _stats["wait_ms"] += (started - job["queued"]) * 1000
+            try:
+                result = await job["call"]()
+            except Exception as e:
+                _stats["failed"] += 1
+                _finish(job, error=e)
+            else:
+                _stats["sent"] += 1
+                _finish(job, result)
+            _adapt(job["route"], channel_id, time.monotonic() - started)
+    finally:
+        del _workers[channel_id]
+        if not queue:
+            del _queues[channel_id]
+
+def submit(route: str, channel_id: int, call: Callable[[], Awaitable[Any]],
+           priority: int = PRIORITY_INTERACTIVE, merge_key: tuple = None) -> asyncio.Future:
+    """Queue an API call; a call with the same merge key as a queued one replaces it"""
+    future = asyncio.get_running_loop().create_future()
+
+    job = _merge_jobs.get(merge_key) if merge_key is not None else None
+    if job is not None:
+        # Only the newest version of a superseded edit goes out; both callers get its result
+        job["call"] = call
+        job["futures"].append(future)
+        _stats["merged"] += 1
+        if priority < job["priority"]:
+            job["priority"] = priority
+            queue = _queues[channel_id]
+            queue[:] = [(queued["priority"], seq, queued) for _, seq, queued in queue]
+            heapq.heapify(queue)
+        return future
+
+    job = {
+        "route": route,
+        "call": call,
+        "priority": priority,
+        "futures": [future],
+        "merge_key": merge_key,
+        "queued": time.monotonic()
+    }
+    queue = _queues.setdefault(channel_id, [])
+    heapq.heappush(queue, (priority, next(_sequence), job))
+    if merge_key is not None:
+        _merge_jobs[merge_key] = job
+    _stats["max_depth"] = max(_stats["max_depth"], len(queue))
+
+    if channel_id not in _workers:
+        _workers[channel_id] = asyncio.create_task(_drain(channel_id))
+    return future
+
+def _channel_id(target) -> int:
+    # Contexts and messages carry their channel; channels are their own target
+    channel = getattr(target, "channel", target)
+    return channel.id
+
+async def send(target, *args, priority: int = PRIORITY_INTERACTIVE, **kwargs):
+    """Send a message to a channel or context through the scheduler"""
+    return await submit("send", _channel_id(target), lambda: target.send(*args, **kwargs), priority)
+
+async def edit(message, priority: int = PRIORITY_INTERACTIVE, **kwargs):
+    """Edit a message through the scheduler, replacing any edit of it still queued"""
+    return await submit("edit", _channel_id(message), lambda: message.edit(**kwargs), priority,
+                        merge_key=("edit", message.id))
+
+def _log_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error in scheduled message edit: {future.exception()}")
+
+def edit_later(message, priority: int = PRIORITY_ANIMATION, **kwargs) -> asyncio.Future:
+    """Queue an edit without waiting for it; a later edit of the same message supersedes it"""
+    future = submit("edit", _channel_id(message), lambda: message.edit(**kwargs), priority,
+                    merge_key=("edit", message.id))
+    future.add_done_callback(_log_failure)
+    return future
+
+async def add_reaction(message, emoji: str, priority: int = PRIORITY_INTERACTIVE) -> None:
+    """Add a reaction through the scheduler"""
+    await submit("reaction", _channel_id(message), lambda: message.add_reaction(emoji), priority)
+
+async def clear_reactions(message, priority: int = PRIORITY_INTERACTIVE) -> None:
+    """Clear a message's reactions through the scheduler"""
+    await submit("reaction", _channel_id(message), message.clear_reactions, priority)
+
+def queue_depth(channel_id: int = None) -> int:
+    """Calls waiting to go out in one channel, or across all channels"""
+    if channel_id is not None:
+        return len(_queues.get(channel_id, []))
+    return sum(len(queue) for queue in _queues.values())
+
+def get_scheduler_stats() -> Dict[str, Any]:
+    """Get queue depths by priority plus sent, merged and failed counts"""
+    depths = {name: 0 for name in PRIORITY_NAMES}
+    for queue in _queues.values():
+        for priority, _, _ in queue:
+            depths[PRIORITY_NAMES[priority]] += 1
+    done = _stats["sent"] + _stats["failed"]
+    return {
+        "queued": depths,
+        "channels": len(_queues),
+        "max_depth": _stats["max_depth"],
+        "sent": _stats["sent"],
+        "merged": _stats["merged"],
+        "failed": _stats["failed"],
+        "slowed": _stats["slowed"],
+        "avg_wait_ms": round(_stats["wait_ms"] / done, 1) if done else 0.0
+    }
+
+def format_scheduler_stats() -> str:
+    """Format scheduler statistics as two lines"""
+    stats = get_scheduler_stats()
+    queued = ", ".join(f"{count} {name}" for name, count in stats["queued"].items())
+    return (f"Queued: {queued} in {stats['channels']} channels (max {stats['max_depth']})\n"
+            f"{stats['sent']} sent, {stats['merged']} merged, {stats['failed']} failed, "
+            f"{stats['slowed']} slowdowns, {stats['avg_wait_ms']:.0f} ms avg wait")
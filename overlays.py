@@ -0,0 +1,300 @@
+from __future__ import annotations
+import math
+import random
+import threading
+from typing import Callable, Dict, Tuple
+
+from startup import lazy_import
+
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+np = lazy_import("numpy")
+
+# Overlay layers are built once per (effect, size, variant) and reused on every render
+MAX_CACHED_OVERLAYS = 128
+
+# Random-looking effects draw from this many seeded variants instead of fresh noise
+OVERLAY_VARIANTS = 8
+
+# Effects whose geometry depends on the RNG and therefore come in seeded variants
+VARIANT_EFFECTS = {"fluff", "mystic", "electric", "venom"}
+
+_layer_cache: Dict[tuple, Image.Image] = {}
+_cache_lock = threading.Lock()
+
+def solid_overlay(size: Tuple[int, int], rgb: Tuple[int, int, int], alpha: np.ndarray) -> Image.Image:
+    """Create a single-colour overlay whose transparency comes from an alpha array"""
+    overlay = Image.new("RGBA", size, rgb + (0,))
+    overlay.putalpha(Image.fromarray(np.ascontiguousarray(alpha, dtype=np.uint8), "L"))
+    return overlay
+
+def get_overlay(effect: str, size: Tuple[int, int], variant: int = 0) -> Image.Image:
+    """Get a cached overlay layer, building it on first use"""
+    key = (effect, size, variant)
+    layer = _layer_cache.get(key)
+    if layer is None:
+        if isinstance(effect, tuple):
+            # ("tint", (r, g, b, a)) - a flat colour wash
+            layer = Image.new("RGBA", size, effect[1])
+        else:
+            builder = _BUILDERS[effect]
+            rng = random.Random(f"{effect}:{variant}")
+            layer = builder(size, rng)
+
+        # Drop the oldest layer once the cache is full (renders may run in worker threads)
+        with _cache_lock:
+            if len(_layer_cache) >= MAX_CACHED_OVERLAYS:
+                _layer_cache.pop(next(iter(_layer_cache)))
+            _layer_cache[key] = layer
+    return layer
+
+def composite_overlay(img: Image.Image, effect, variant: int = None) -> Image.Image:
+    """Composite a cached overlay layer onto an image"""
+    if variant is None:
+        variant = random.randrange(OVERLAY_VARIANTS) if effect in VARIANT_EFFECTS else 0
+    return Image.alpha_composite(img, get_overlay(effect, img.size, variant))
+
+def tint_overlay(img: Image.Image, rgba: Tuple[int, int, int, int]) -> Image.Image:
+    """Composite a flat colour tint onto an image"""
+    return composite_overlay(img, ("tint", tuple(rgba)))
+
+def clear_overlay_cache() -> None:
+    """Drop all cached overlay layers"""
+    _layer_cache.clear()
+
+# Layer builders - each draws the effect geometry onto a transparent layer
+def _build_rainbow(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    gradient = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(gradient)
+
+    # Rainbow colors
+    rainbow_colors = [
+        (255, 0, 0, 100),      # Red
+        (255, 127, 0, 100),    # Orange
+        (255, 255, 0, 100),    # Yellow
+        (0, 255, 0, 100),      # Green
+        (0, 0, 255, 100),      # Blue
+        (75, 0, 130, 100),     # Indigo
+        (148, 0, 211, 100)     # Violet
+    ]
+
+    # Draw rainbow stripes
+    w, h = size
+    stripe_height = h / len(rainbow_colors)
+    for i, color in enumerate(rainbow_colors):
+        y0 = i * stripe_height
+        y1 = (i + 1) * stripe_height
+        draw.rectangle([(0, y0), (w, y1)], fill=color)
+
+    return gradient
+
+def _build_wings(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+    draw.ellipse((w//4, h//3, w//2, h*2//3), fill=(255, 255, 255, 100))
+    draw.ellipse((w//2, h//3, w*3//4, h*2//3), fill=(255, 255, 255, 100))
+    return layer
+
+def _build_music_notes(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+
+    notes = [
+        (w*3//4, h//4),
+        (w*2//3, h//3),
+        (w*4//5, h//2)
+    ]
+
+    for x, y in notes:
+        # Draw music note (simple version)
+        draw.ellipse((x-5, y-5, x+5, y+5), fill=(0, 0, 0, 200))
+        draw.line([(x, y), (x, y-20)], fill=(0, 0, 0, 200), width=2)
+
+    return layer
+
+def _build_glow(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+
+    # Concentric discs, outermost first, fading out towards the edge
+    center = (w//2, h//2)
+    for radius in range(min(w, h)//2, 0, -5):
+        alpha = max(0, 150 - radius * 3)
+        draw.ellipse((center[0] - radius, center[1] - radius,
+                      center[0] + radius, center[1] + radius), fill=(255, 255, 200, alpha))
+
+    return layer
+
+def _build_spikes(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+
+    # Draw spikes around the edge
+    center = (w//2, h//2)
+    radius = min(w, h) // 3
+    spikes = 12
+
+    for i in range(spikes):
+        angle_rad = math.radians(i * (360 / spikes))
+
+        x1 = center[0] + int(radius * 0.8 * math.cos(angle_rad))
+        y1 = center[1] + int(radius * 0.8 * math.sin(angle_rad))
+
+        x2 = center[0] + int(radius * 1.5 * math.cos(angle_rad))
+        y2 = center[1] + int(radius * 1.5 * math.sin(angle_rad))
+
+        draw.line([(x1, y1), (x2, y2)], fill=(100, 100, 100, 200), width=5)
+
+    return layer
+
+def _build_fluff(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+
+    # Draw fluffy dots around the edge
+    center = (w//2, h//2)
+    radius = min(w, h) // 3
+
+    for _ in range(30):
+        angle_rad = math.radians(rng.uniform(0, 360))
+
+        dist = rng.uniform(radius * 0.8, radius * 1.2)
+        x = center[0] + int(dist * math.cos(angle_rad))
+        y = center[1] + int(dist * math.sin(angle_rad))
+
+        dot = rng.randint(5, 15)
+        draw.ellipse((x - dot, y - dot, x + dot, y + dot), fill=(255, 255, 255, 150))
+
+    return layer
+
+def _build_psychic(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    # Purple swirls
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+
+    center = (w//2, h//2)
+    for i in range(0, 360, 30):
+        angle_rad = math.radians(i)
+
+        for radius in range(20, min(w, h)//2, 20):
+            x1 = center[0] + int(radius * math.cos(angle_rad))
+            y1 = center[1] + int(radius * math.sin(angle_rad))
+
+            x2 = center[0] + int(radius * math.cos(angle_rad + 0.5))
+            y2 = center[1] + int(radius * math.sin(angle_rad + 0.5))
+
+            draw.line([(x1, y1), (x2, y2)], fill=(128, 0, 128, 100), width=3)
+
+    return layer
+
+def _build_metallic(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    # 2px stripes every 5 rows
+    w, h = size
+    rows = np.arange(h)
+    stripe_start = rows - rows % 5
+    alpha = (100 + 50 * np.sin(stripe_start / 10)).astype(np.uint8)
+    alpha[rows % 5 >= 2] = 0
+
+    return solid_overlay(size, (200, 200, 220), np.broadcast_to(alpha[:, None], (h, w)))
+
+def _build_mystic(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    # Stars and sparkles
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+
+    for _ in range(20):
+        x = rng.randint(0, w)
+        y = rng.randint(0, h)
+        star = rng.randint(2, 6)
+        alpha = rng.randint(150, 250)
+
+        draw.ellipse((x - star, y - star, x + star, y + star), fill=(255, 255, 220, alpha))
+
+        # Draw star rays
+        for i in range(4):
+            angle = i * (math.pi / 2)
+            x1 = x + int((star + 2) * math.cos(angle))
+            y1 = y + int((star + 2) * math.sin(angle))
+            x2 = x + int((star + 8) * math.cos(angle))
+            y2 = y + int((star + 8) * math.sin(angle))
+
+            draw.line([(x1, y1), (x2, y2)], fill=(255, 255, 220, alpha), width=1)
+
+    return layer
+
+def _build_electric(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    # Lightning bolts
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+
+    for _ in range(5):
+        x = rng.randint(w//4, w*3//4)
+        y = 20
+        points = [(x, y)]
+
+        # Create a jagged path
+        while y < h - 20:
+            x += rng.randint(-15, 15)
+            y += rng.randint(10, 30)
+
+            x = max(10, min(w-10, x))
+            points.append((x, y))
+
+        draw.line(points, fill=(255, 255, 0, 180), width=3)
+
+    return layer
+
+def _build_hypnotic(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    # Hypnotic circles
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+
+    center = (w//2, h//2)
+    for radius in range(10, min(w, h)//2, 15):
+        alpha = max(30, 150 - radius)
+        draw.ellipse((center[0] - radius, center[1] - radius,
+                      center[0] + radius, center[1] + radius), outline=(128, 0, 128, alpha), width=3)
+
+    return layer
+
+def _build_venom(size: Tuple[int, int], rng: random.Random) -> Image.Image:
+    # Green drips fading out towards their tips
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+    w, h = size
+
+    for _ in range(8):
+        x = rng.randint(w//4, w*3//4)
+        y1 = rng.randint(h//4, h*3//4)
+        drip_length = rng.randint(20, 50)
+        y2 = y1 + drip_length
+
+        for y in range(y1, y2):
+            alpha = 200 - int(((y - y1) / drip_length) * 150)
+            draw.ellipse((x-3, y-3, x+3, y+3), fill=(0, 200, 0, alpha))
+
+    return layer
+
+_BUILDERS: Dict[str, Callable[[Tuple[int, int], random.Random], Image.Image]] = {
+    "rainbow": _build_rainbow,
+    "wings": _build_wings,
+    "music_notes": _build_music_notes,
+    "glow": _build_glow,
+    "spikes": _build_spikes,
+    "fluff": _build_fluff,
+    "psychic": _build_psychic,
+    "metallic": _build_metallic,
+    "mystic": _build_mystic,
+    "electric": _build_electric,
+    "hypnotic": _build_hypnotic,
+    "venom": _build_venom
+}
@@ -0,0 +1,190 @@
+import os
+import struct
+from typing import Dict, Any, List
+
+from config import PEDIGREE_DEPTH, PEDIGREE_FILE
+from database import _data
+
+# The pedigree lives in its own append-only file rather than the JSON data file, which is
+# rewritten on every save. Node i is the pet with id i + 1, stored as its two parent ids
+# (0 for an unknown parent) and the name it had when it was registered. Parents are
+# always registered before their children, so ids only ever point back in time.
+_NODE = struct.Struct("<II")   # parent 1 id, parent 2 id; a length-prefixed name follows
+
+# Cached closures and kinships are dropped wholesale past these sizes; both are cheap to rebuild
+CLOSURE_CACHE_SIZE = 20000
+KINSHIP_CACHE_SIZE = 100000
+
+# Global pedigree storage
+_nodes: List[tuple] = []                # (parent 1 id, parent 2 id, name), by id - 1
+_state = {"file_bytes": 0}
+
+# Ancestor closures, rebuilt on demand: pet id -> {ancestor id: fewest generations back}
+_closures: Dict[int, Dict[int, int]] = {}
+_kinship: Dict[tuple, float] = {}
+
+def _pack_node(parent1: int, parent2: int, name: str) -> bytes:
+    data = name.encode("utf-8")[:255]
+    return _NODE.pack(parent1, parent2) + bytes([len(data)]) + data
+
+def _write(data: bytes, mode: str = "ab") -> None:
+    try:
+        with open(PEDIGREE_FILE, mode) as f:
+            f.write(data)
+        _state["file_bytes"] = _state["file_bytes"] + len(data) if mode == "ab" else len(data)
+    except Exception as e:
+        print(f"Error saving pedigree: {e}")
+
+def load_pedigree() -> int:
+    """Load the pedigree file; returns how many pets it holds"""
+    _nodes.clear()
+    blob = b""
+    if os.path.exists(PEDIGREE_FILE):
+        try:
+            with open(PEDIGREE_FILE, "rb") as f:
+                blob = f.read()
+        except Exception as e:
+            print(f"Error loading pedigree: {e}")
+            return 0
+
+    offset = 0
+    while offset + _NODE.size < len(blob):
+        parent1, parent2 = _NODE.unpack_from(blob, offset)
+        length = blob[offset + _NODE.size]
+        end = offset + _NODE.size + 1 + length
+        if end > len(blob):
+            # A node cut off mid-write; everything before it is fine
+            break
+        _nodes.append((parent1, parent2, blob[end - length:end].decode("utf-8", "ignore")))
+        offset = end
+    if offset < len(blob):
+        _write(blob[:offset], "wb")
+    _state["file_bytes"] = offset
+
+    # Older data files kept the pedigree inline; it moves to the pedigree file once
+    legacy = _data.pop("pedigree", None)
+    if legacy and legacy.get("nodes") and not _nodes:
+        _nodes.extend(tuple(node) for node in legacy["nodes"])
+        _write(b"".join(_pack_node(*node) for node in _nodes), "wb")
+    _closures.clear()
+    _kinship.clear()
+    return len(_nodes)
+
+def _add_node(parent1: int, parent2: int, name: str) -> int:
+    _nodes.append((parent1, parent2, name))
+    _write(_pack_node(parent1, parent2, name))
+    return len(_nodes)
+
+def ensure_pet_id(pet: Dict[str, Any]) -> int:
+    """Give a pet a stable pedigree id; pets with no recorded parents become founders"""
+    if "id" not in pet:
+        pet["id"] = _add_node(0, 0, pet["name"])
+    return pet["id"]
+
+def record_birth(child: Dict[str, Any], parent1: Dict[str, Any], parent2: Dict[str, Any]) -> int:
+    """Register a bred pet with links to both parents"""
+    child["id"] = _add_node(ensure_pet_id(parent1), ensure_pet_id(parent2), child["name"])
+    return child["id"]
+
+def get_parents(pet_id: int) -> List[int]:
+    """Known parent ids of a pet"""
+    if not 1 <= pet_id <= len(_nodes):
+        return []
+    return [parent for parent in _nodes[pet_id - 1][:2] if parent]
+
+def get_name(pet_id: int) -> str:
+    """Name a pet had when it entered the pedigree"""
+    return _nodes[pet_id - 1][2] if 1 <= pet_id <= len(_nodes) else "Unknown"
+
+def get_ancestors(pet_id: int) -> Dict[int, int]:
+    """Ancestors up to PEDIGREE_DEPTH generations back, with the fewest generations to each"""
+    closure = _closures.get(pet_id)
+    if closure is not None:
+        return closure
+    # Walk back one generation at a time; the depth limit bounds the walk however deep the lineage
+    closure = {}
+    frontier = get_parents(pet_id)
+    generations = 1
+    while frontier and generations <= PEDIGREE_DEPTH:
+        next_frontier = []
+        for ancestor in frontier:
+            if ancestor not in closure:
+                closure[ancestor] = generations
+                next_frontier.extend(get_parents(ancestor))
+        frontier = next_frontier
+        generations += 1
+    _closures[pet_id] = closure
+    return closure
+
+def kinship(pet1: int, pet2: int, depth: int = PEDIGREE_DEPTH) -> float:
+    """Coefficient of kinship: the chance a gene taken from each pet is identical by descent
+
+    Only the last `depth` generations are searched, which keeps deep lineages bounded.
+    """
+    if depth <= 0 or not pet1 or not pet2:
+        return 0.0
+    if pet1 == pet2:
+        return 0.5 * (1 + inbreeding(pet1, depth))
+    # Unrelated pets are the usual case and are ruled out with the closure index alone
+    if pet1 not in get_ancestors(pet2) and pet2 not in get_ancestors(pet1) and \
+            get_ancestors(pet1).keys().isdisjoint(get_ancestors(pet2)):
+        return 0.0
+
+    key = (min(pet1, pet2), max(pet1, pet2), depth)
+    if key not in _kinship:
+        # Step back through the younger pet's parents; it can't be an ancestor of the older one
+        older, younger = key[0], key[1]
+        parents = get_parents(younger)
+        _kinship[key] = sum(0.5 * kinship(older, parent, depth - 1) for parent in parents)
+    return _kinship[key]
+
+def inbreeding(pet_id: int, depth: int = PEDIGREE_DEPTH) -> float:
+    """Inbreeding coefficient of a pet: the kinship of its parents"""
+    parents = get_parents(pet_id)
+    if len(parents) < 2:
+        return 0.0
+    return kinship(parents[0], parents[1], depth - 1)
+
+def child_inbreeding(parent1: Dict[str, Any], parent2: Dict[str, Any]) -> float:
+    """Inbreeding coefficient a child of two pets would have"""
+    if "id" not in parent1 or "id" not in parent2:
+        # A pet without an id has no recorded ancestry, so it's related to nobody
+        return 0.0
+    # Trimmed between queries, never in the middle of one
+    if len(_closures) > CLOSURE_CACHE_SIZE:
+        _closures.clear()
+    if len(_kinship) > KINSHIP_CACHE_SIZE:
+        _kinship.clear()
+    return kinship(parent1["id"], parent2["id"])
+
+def format_pedigree(pet_id: int, generations: int) -> str:
+    """Draw a pet's family tree, generations deep, as text"""
+    lines = [f"{get_name(pet_id)} (#{pet_id})"]
+
+    def walk(node: int, prefix: str, remaining: int) -> None:
+        parents = get_parents(node)
+        if remaining <= 0 or not parents:
+            return
+        for i, parent in enumerate(parents):
+            last = i == len(parents) - 1
+            lines.append(f"{prefix}{'└─' if last else '├─'} {get_name(parent)} (#{parent})")
+            walk(parent, prefix + ("   " if last else "│  "), remaining - 1)
+
+    walk(pet_id, "", generations)
+    return "\n".join(lines)
+
+def get_pedigree_stats() -> Dict[str, Any]:
+    """Get pedigree store and index sizes"""
+    return {
+        "pets": len(_nodes),
+        "bred": sum(1 for node in _nodes if node[0]),
+        "file_bytes": _state["file_bytes"],
+        "closures": len(_closures),
+        "kinship_cached": len(_kinship)
+    }
+
+def format_pedigree_stats() -> str:
+    """Format pedigree statistics as one line"""
+    stats = get_pedigree_stats()
+    return (f"{stats['pets']} pets ({stats['bred']} bred, {stats['file_bytes'] / 1024:.1f} KB), {stats['closures']} closures, "
+            f"{stats['kinship_cached']} kinship pairs cached")
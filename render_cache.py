@@ -0,0 +1,135 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from startup import lazy_import
+
+Image = lazy_import("PIL.Image")
+
+# Memory the render cache may use before evicting the oldest renders
+RENDER_CACHE_BUDGET = 96 * 1024 * 1024
+
+# The startup warmer stops at this size, leaving the rest of the budget for live renders
+WARM_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# The warmer pauses while a command ran within this many seconds
+WARM_IDLE_GAP = 2.0
+
+# Pause between warm renders so the event loop and executor stay free for live traffic
+WARM_YIELD_DELAY = 0.05
+
+# Global render cache storage
+_cache: Dict[tuple, Image.Image] = {}
+_cache_lock = threading.Lock()
+_state = {
+    "bytes": 0,
+    "hits": 0,
+    "misses": 0,
+    "warmed": 0,
+    "last_activity": 0.0
+}
+
+def appearance_key(pet: Dict[str, Any]) -> Tuple[str, str, str]:
+    """Get the (species, color, rarity) a pet's portrait depends on"""
+    # Legacy pets only carry a name, so take species and color from its words
+    words = pet["name"].split()
+    return (pet.get("species", words[-1]), pet.get("color", words[0]), pet.get("rarity", "common"))
+
+def _image_bytes(img: Image.Image) -> int:
+    return img.width * img.height * len(img.getbands())
+
+def get_render(key: tuple) -> Optional[Image.Image]:
+    """Get a copy of a cached render, or None on a miss"""
+    img = _cache.get(key)
+    if img is None:
+        _state["misses"] += 1
+        return None
+    _state["hits"] += 1
+    # Callers resize and draw on renders, so hand out copies
+    return img.copy()
+
+def put_render(key: tuple, img: Image.Image) -> None:
+    """Cache a render, evicting the oldest ones to stay under the memory budget"""
+    size = _image_bytes(img)
+    if size > RENDER_CACHE_BUDGET:
+        return
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _state["bytes"] -= _image_bytes(old)
+        while _cache and _state["bytes"] + size > RENDER_CACHE_BUDGET:
+            _state["bytes"] -= _image_bytes(_cache.pop(next(iter(_cache))))
+        _cache[key] = img.copy()
+        _state["bytes"] += size
+
+def clear_render_cache() -> None:
+    """Drop all cached renders"""
+    with _cache_lock:
+        _cache.clear()
+        _state["bytes"] = 0
+
+def note_activity() -> None:
+    """Record live traffic so the warmer backs off"""
+    _state["last_activity"] = time.monotonic()
+
+def rank_appearances(pets: List[Dict[str, Any]]) -> List[Tuple[tuple, Dict[str, Any]]]:
+    """Rank appearances by how many stored pets share them, with one example pet each"""
+    counts = Counter()
+    examples = {}
+    for pet in pets:
+        try:
+            key = appearance_key(pet)
+        except (KeyError, IndexError, AttributeError):
+            continue
+        counts[key] += 1
+        examples.setdefault(key, pet)
+    return [(key, examples[key]) for key, _ in counts.most_common()]
+
+async def warm_render_cache(pets: List[Dict[str, Any]], render: Callable[[Dict[str, Any]], Any],
+                            budget: int = WARM_MEMORY_BUDGET) -> int:
+    """Pre-render the most common appearances in the background until the memory budget is reached"""
+    loop = asyncio.get_running_loop()
+    warmed = 0
+    for key, pet in rank_appearances(pets):
+        if _state["bytes"] >= budget:
+            break
+        if key in _cache:
+            continue
+
+        # Live commands go first: wait until the bot has been quiet for a moment
+        while time.monotonic() - _state["last_activity"] < WARM_IDLE_GAP:
+            await asyncio.sleep(WARM_IDLE_GAP)
+
+        species, color, rarity = key
+        appearance = dict(pet, species=species, color=color, rarity=rarity)
+        try:
+            # render() stores its result in the cache itself
+            if await loop.run_in_executor(None, render, appearance) is not None:
+                warmed += 1
+        except Exception as e:
+            print(f"Error warming render for {key}: {e}")
+        await asyncio.sleep(WARM_YIELD_DELAY)
+
+    _state["warmed"] += warmed
+    return warmed
+
+def get_render_cache_stats() -> Dict[str, Any]:
+    """Get render cache size and hit statistics"""
+    return {
+        "entries": len(_cache),
+        "bytes": _state["bytes"],
+        "hits": _state["hits"],
+        "misses": _state["misses"],
+        "warmed": _state["warmed"]
+    }
+
+def format_render_cache_stats() -> str:
+    """Format render cache statistics as one line"""
+    stats = get_render_cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups * 100 if lookups else 0.0
+    return (f"{stats['entries']} renders, {stats['bytes'] / (1024 * 1024):.1f} MB, "
+            f"{hit_rate:.0f}% hits, {stats['warmed']} pre-warmed")
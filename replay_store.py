@@ -0,0 +1,242 @@
+import os
+import struct
+import time
+from typing import Dict, Any, List, Optional
+
+from config import REPLAY_FILE, REPLAY_STORE_BYTES
+from battle_engine import (new_battle, apply_move, forfeit, MOVE_LIST, NO_MOVE, DOMAIN_MOVE,
+                           EVENT_DOMAIN, EVENT_FORFEIT)
+from battle_registry import pet_key
+
+# Bumped whenever the record layout changes; older records are skipped on load
+REPLAY_VERSION = 1
+
+# What kind of battle a record came from
+KIND_BATTLE = 0
+KIND_AUTO = 1
+KIND_PVE = 2
+KIND_NAMES = ["battle", "auto battle", "wild battle"]
+
+# Record layout: header, two pet snapshots, then one byte per move
+_HEADER = struct.Struct("<BBBbQI")   # version, kind, domain flags, forfeited side (-1 if none), seed, time
+_PET = struct.Struct("<QBBdd")       # owner (0 for wild pets), level, rarity, health, strength
+_MOVES = struct.Struct("<H")         # move count
+_FRAME = struct.Struct("<IH")        # record id and length, in front of each record in the file
+SKIP_MOVE = 255
+
+RARITIES = ["common", "rare", "mythic"]
+
+# Global replay storage
+_records: Dict[int, bytes] = {}       # record id -> encoded record, oldest first
+_by_user: Dict[str, List[int]] = {}   # user id -> record ids, oldest first
+_by_pet: Dict[str, List[int]] = {}    # pet key -> record ids, oldest first
+_state = {
+    "bytes": 0,       # size of the records kept
+    "file_bytes": 0,  # size of the file, including records already dropped
+    "next_id": 1
+}
+
+def _pack_text(text: str) -> bytes:
+    data = text.encode("utf-8")[:255]
+    return bytes([len(data)]) + data
+
+def _unpack_text(data: bytes, offset: int) -> tuple:
+    length = data[offset]
+    return data[offset + 1:offset + 1 + length].decode("utf-8", "ignore"), offset + 1 + length
+
+def encode_record(state: Dict[str, Any], owner_ids: List[Optional[str]], kind: int) -> bytes:
+    """Pack a finished battle into a compact record: seed, pet snapshots and move ids"""
+    # A side had its domain if it still has it or already used it
+    used = {event.side for event in state["events"] if event.kind == EVENT_DOMAIN}
+    domain = sum(1 << side for side in (0, 1) if side in used or DOMAIN_MOVE in state["moves"][side])
+    forfeited = state["forfeited"] if state["forfeited"] is not None else -1
+    parts = [_HEADER.pack(REPLAY_VERSION, kind, domain, forfeited, state["seed"], int(time.time()))]
+
+    for side, pet in enumerate(state["pets"]):
+        # The battle's starting HP and strength, not whatever the pet has after settling
+        parts.append(_PET.pack(int(owner_ids[side] or 0), min(255, pet.get("level", 1)),
+                               RARITIES.index(pet.get("rarity", "common")),
+                               state["max_hp"][side], state["strength"][side]))
+        parts.append(_pack_text(pet["name"]))
+        parts.append(_pack_text(pet.get("species", "")))
+
+    moves = [SKIP_MOVE if event.move == NO_MOVE else event.move
+             for event in state["events"] if event.kind != EVENT_FORFEIT]
+    parts.append(_MOVES.pack(len(moves)))
+    parts.append(bytes(moves))
+    return b"".join(parts)
+
+def decode_record(data: bytes) -> Optional[Dict[str, Any]]:
+    """Unpack a record, or return None if it's from another version"""
+    version, kind, domain, forfeited, seed, created = _HEADER.unpack_from(data, 0)
+    if version != REPLAY_VERSION:
+        return None
+    offset = _HEADER.size
+
+    owners, pets = [], []
+    for _ in range(2):
+        owner, level, rarity, health, strength = _PET.unpack_from(data, offset)
+        offset += _PET.size
+        name, offset = _unpack_text(data, offset)
+        species, offset = _unpack_text(data, offset)
+        owners.append(str(owner) if owner else None)
+        pets.append({"name": name, "species": species, "level": level, "rarity": RARITIES[rarity],
+                     "health": health, "strength": strength})
+
+    count, = _MOVES.unpack_from(data, offset)
+    offset += _MOVES.size
+    moves = [NO_MOVE if move == SKIP_MOVE else move for move in data[offset:offset + count]]
+    return {
+        "kind": kind,
+        "seed": seed,
+        "domain": (bool(domain & 1), bool(domain & 2)),
+        "forfeited": forfeited if forfeited >= 0 else None,
+        "created": created,
+        "owners": owners,
+        "pets": pets,
+        "moves": moves
+    }
+
+def rebuild_battle(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Play a record's moves again from its seed, returning the finished battle state"""
+    state = new_battle(record["pets"][0], record["pets"][1], record["seed"], record["domain"])
+    for move in record["moves"]:
+        apply_move(state, None if move == NO_MOVE else MOVE_LIST[move])
+    if record["forfeited"] is not None:
+        forfeit(state, record["forfeited"])
+    return state
+
+def _index_keys(record: Dict[str, Any]) -> tuple:
+    """User ids and pet keys a record is listed under"""
+    users = [owner for owner in record["owners"] if owner is not None]
+    pets = [pet_key(owner, pet) for owner, pet in zip(record["owners"], record["pets"]) if owner is not None]
+    return users, pets
+
+def _add(record_id: int, data: bytes) -> bool:
+    record = decode_record(data)
+    if record is None:
+        return False
+    _records[record_id] = data
+    _state["bytes"] += len(data)
+    users, pets = _index_keys(record)
+    for user_id in set(users):
+        _by_user.setdefault(user_id, []).append(record_id)
+    for key in set(pets):
+        _by_pet.setdefault(key, []).append(record_id)
+    return True
+
+def _evict() -> None:
+    """Drop the oldest records until the store is back under its size cap"""
+    while _state["bytes"] > REPLAY_STORE_BYTES and _records:
+        record_id = next(iter(_records))
+        data = _records.pop(record_id)
+        _state["bytes"] -= len(data)
+        users, pets = _index_keys(decode_record(data))
+        # The oldest record is at the front of every list it's in
+        for index, keys in ((_by_user, users), (_by_pet, pets)):
+            for key in set(keys):
+                ids = index.get(key)
+                if ids and ids[0] == record_id:
+                    ids.pop(0)
+                if ids is not None and not ids:
+                    del index[key]
+
+def _compact() -> None:
+    """Rewrite the file with only the records still kept"""
+    try:
+        temp_file = REPLAY_FILE + ".tmp"
+        with open(temp_file, "wb") as f:
+            for record_id, data in _records.items():
+                f.write(_FRAME.pack(record_id, len(data)) + data)
+        os.replace(temp_file, REPLAY_FILE)
+        _state["file_bytes"] = sum(_FRAME.size + len(data) for data in _records.values())
+    except Exception as e:
+        print(f"Error compacting replays: {e}")
+
+def load_replays() -> int:
+    """Load the replay file and rebuild the indexes; returns how many records were loaded"""
+    if not os.path.exists(REPLAY_FILE):
+        return 0
+    try:
+        with open(REPLAY_FILE, "rb") as f:
+            blob = f.read()
+    except Exception as e:
+        print(f"Error loading replays: {e}")
+        return 0
+
+    offset = 0
+    while offset + _FRAME.size <= len(blob):
+        record_id, length = _FRAME.unpack_from(blob, offset)
+        data = blob[offset + _FRAME.size:offset + _FRAME.size + length]
+        if len(data) < length:
+            # A record cut off mid-write; everything before it is fine
+            break
+        try:
+            _add(record_id, data)
+        except (struct.error, IndexError, UnicodeDecodeError):
+            print(f"Skipping damaged replay record #{record_id}")
+        _state["next_id"] = max(_state["next_id"], record_id + 1)
+        offset += _FRAME.size + length
+
+    _state["file_bytes"] = len(blob)
+    _evict()
+    if offset < len(blob) or _state["file_bytes"] > 2 * REPLAY_STORE_BYTES:
+        _compact()
+    return len(_records)
+
+def save_replay(state: Dict[str, Any], owner_ids: List[Optional[str]], kind: int) -> Optional[int]:
+    """Store a finished battle and return its replay id"""
+    try:
+        data = encode_record(state, owner_ids, kind)
+    except Exception as e:
+        print(f"Error encoding replay: {e}")
+        return None
+
+    record_id = _state["next_id"]
+    _state["next_id"] += 1
+    _add(record_id, data)
+    _evict()
+
+    # Records are appended; dropped ones are only cleared out once the file is twice the cap
+    try:
+        with open(REPLAY_FILE, "ab") as f:
+            f.write(_FRAME.pack(record_id, len(data)) + data)
+        _state["file_bytes"] += _FRAME.size + len(data)
+    except Exception as e:
+        print(f"Error saving replay: {e}")
+    if _state["file_bytes"] > 2 * REPLAY_STORE_BYTES:
+        _compact()
+    return record_id
+
+def get_replay(record_id: int) -> Optional[Dict[str, Any]]:
+    """Get a stored battle record by id"""
+    data = _records.get(record_id)
+    if data is None:
+        return None
+    return dict(decode_record(data), id=record_id)
+
+def get_user_replays(user_id: str, limit: int = 10) -> List[int]:
+    """A user's most recent replay ids, newest first"""
+    return _by_user.get(user_id, [])[::-1][:limit]
+
+def get_pet_replays(key: str, limit: int = 10) -> List[int]:
+    """A pet's most recent replay ids, newest first"""
+    return _by_pet.get(key, [])[::-1][:limit]
+
+def get_replay_stats() -> Dict[str, Any]:
+    """Get record counts and store sizes"""
+    return {
+        "records": len(_records),
+        "bytes": _state["bytes"],
+        "file_bytes": _state["file_bytes"],
+        "avg_bytes": round(_state["bytes"] / len(_records)) if _records else 0,
+        "users": len(_by_user),
+        "pets": len(_by_pet)
+    }
+
+def format_replay_stats() -> str:
+    """Format replay store statistics as one line"""
+    stats = get_replay_stats()
+    return (f"{stats['records']} records, {stats['bytes'] / 1024:.1f} KB "
+            f"(cap {REPLAY_STORE_BYTES / 1024:.0f} KB, {stats['avg_bytes']} B avg), "
+            f"{stats['users']} users, {stats['pets']} pets")
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import json
+import math
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import asset_manifest
+from startup import lazy_import
+
+Image = lazy_import("PIL.Image")
+
+ATLAS_DIR = os.path.join("assets", "atlas")
+ATLAS_MANIFEST = os.path.join(ATLAS_DIR, "manifest.json")
+ATLAS_VERSION = 1
+
+# Pet sprites are pre-scaled to the size battle scenes paste them at
+BATTLE_SPRITE_SIZE = (300, 300)
+
+# Size of the placeholder drawn for species without art
+DEFAULT_SPRITE_SIZE = (300, 300)
+
+# Global atlas storage
+_atlas = {
+    "tiles": {},   # (source path, (w, h)) -> (sheet file, (x, y, w, h))
+    "sheets": {}   # sheet file -> loaded Image, filled lazily
+}
+
+def _overlay_sizes() -> List[Tuple[int, int]]:
+    """Sizes accessories and effects get resized to: every idle sprite plus the placeholder"""
+    sizes = {DEFAULT_SPRITE_SIZE}
+    for path in asset_manifest.list_assets("pet", "idle"):
+        with Image.open(path) as img:
+            sizes.add(img.size)
+    return sorted(sizes)
+
+def _sheet_groups() -> Dict[str, Tuple[Tuple[int, int], List[str]]]:
+    """Describe each atlas sheet as (tile size, source paths)"""
+    pets = []
+    for pose in asset_manifest.POSES:
+        pets.extend(asset_manifest.list_assets("pet", pose))
+    groups = {f"pets_{BATTLE_SPRITE_SIZE[0]}x{BATTLE_SPRITE_SIZE[1]}.png": (BATTLE_SPRITE_SIZE, pets)}
+
+    overlays = asset_manifest.list_assets("accessory") + asset_manifest.list_assets("effect")
+    for size in _overlay_sizes():
+        groups[f"overlays_{size[0]}x{size[1]}.png"] = (size, overlays)
+    return groups
+
+def _source_mtimes(paths: List[str]) -> Dict[str, float]:
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime
+        except OSError:
+            pass
+    return mtimes
+
+def build_atlas(save: bool = True) -> Dict[str, Any]:
+    """Pre-scale every sprite to its target sizes and pack them into atlas sheets"""
+    manifest = {"version": ATLAS_VERSION, "built_at": time.time(), "sources": {}, "sheets": {}}
+    tiles = {}
+    sheets = {}
+
+    for sheet_file, (size, sources) in _sheet_groups().items():
+        if not sources:
+            continue
+
+        # Tiles in a sheet share one size, so a plain grid packs them without gaps
+        columns = math.ceil(math.sqrt(len(sources)))
+        rows = math.ceil(len(sources) / columns)
+        sheet = Image.new("RGBA", (columns * size[0], rows * size[1]), (0, 0, 0, 0))
+        sheet_tiles = {}
+
+        for i, source in enumerate(sources):
+            x = (i % columns) * size[0]
+            y = (i // columns) * size[1]
+            with Image.open(source) as img:
+                sprite = img.convert("RGBA").resize(size, Image.LANCZOS)
+            sheet.paste(sprite, (x, y))
+            sheet_tiles[source] = [x, y, size[0], size[1]]
+            tiles[(source, tuple(size))] = (sheet_file, (x, y, size[0], size[1]))
+
+        sheets[sheet_file] = sheet
+        manifest["sheets"][sheet_file] = {"size": list(size), "tiles": sheet_tiles}
+        manifest["sources"].update(_source_mtimes(sources))
+
+    if save:
+        try:
+            os.makedirs(ATLAS_DIR, exist_ok=True)
+            for sheet_file, sheet in sheets.items():
+                sheet.save(os.path.join(ATLAS_DIR, sheet_file), format="PNG")
+            with open(ATLAS_MANIFEST, "w") as f:
+                json.dump(manifest, f, indent=4)
+        except Exception as e:
+            print(f"Error saving sprite atlas: {e}")
+
+    _atlas["tiles"] = tiles
+    _atlas["sheets"] = sheets
+    return manifest
+
+def _manifest_is_current(manifest: Dict[str, Any]) -> bool:
+    """Check a saved atlas manifest against the current asset files"""
+    if manifest.get("version") != ATLAS_VERSION:
+        return False
+    expected = set()
+    for _, sources in _sheet_groups().values():
+        expected.update(sources)
+    return manifest.get("sources") == _source_mtimes(sorted(expected))
+
+def load_atlas() -> None:
+    """Load the saved atlas manifest, rebuilding the atlas if assets changed"""
+    manifest = None
+    if os.path.exists(ATLAS_MANIFEST):
+        try:
+            with open(ATLAS_MANIFEST, "r") as f:
+                manifest = json.load(f)
+        except Exception as e:
+            print(f"Error loading atlas manifest: {e}")
+
+    if not manifest or not _manifest_is_current(manifest):
+        print("Sprite atlas missing or stale, rebuilding...")
+        build_atlas()
+        return
+
+    tiles = {}
+    for sheet_file, sheet in manifest["sheets"].items():
+        for source, rect in sheet["tiles"].items():
+            tiles[(source, tuple(sheet["size"]))] = (sheet_file, tuple(rect))
+    _atlas["tiles"] = tiles
+    _atlas["sheets"] = {}
+
+def get_sprite(path: str, size: Tuple[int, int]) -> Optional[Image.Image]:
+    """Crop a pre-scaled sprite out of the atlas, or None if it wasn't packed at that size"""
+    entry = _atlas["tiles"].get((path, tuple(size)))
+    if entry is None:
+        return None
+
+    sheet_file, (x, y, w, h) = entry
+    sheet = _atlas["sheets"].get(sheet_file)
+    if sheet is None:
+        try:
+            sheet = Image.open(os.path.join(ATLAS_DIR, sheet_file)).convert("RGBA")
+        except Exception as e:
+            print(f"Error loading atlas sheet {sheet_file}: {e}")
+            return None
+        _atlas["sheets"][sheet_file] = sheet
+    return sheet.crop((x, y, x + w, y + h))
+
+if __name__ == "__main__":
+    # Offline build step: python sprite_atlas.py
+    started = time.perf_counter()
+    result = build_atlas()
+    tile_count = sum(len(sheet["tiles"]) for sheet in result["sheets"].values())
+    print(f"Packed {tile_count} sprites into {len(result['sheets'])} sheets in {ATLAS_DIR} "
+          f"({time.perf_counter() - started:.2f}s)")
@@ -0,0 +1,125 @@
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List
+
+# Startup profile of the last run is compared against this file
+STARTUP_BASELINE = "startup_baseline.json"
+
+# A phase counts as a regression when it is this much slower than the baseline...
+STARTUP_REGRESSION_RATIO = 1.5
+# ...and slower by at least this many milliseconds (ignores noise in tiny phases)
+STARTUP_REGRESSION_MIN_MS = 25.0
+
+# Global startup profile storage
+_profile = {
+    "started": time.perf_counter(),
+    "phases": {},    # phase name -> milliseconds, in the order they ran
+    "deferred": {},  # lazily imported module -> milliseconds spent importing on first use
+    "finished": False
+}
+_import_lock = threading.Lock()
+
+@contextmanager
+def phase(name: str):
+    """Time a startup phase (an import, a cog, an init step)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, (time.perf_counter() - started) * 1000)
+
+def record_phase(name: str, elapsed_ms: float) -> None:
+    """Record how long a startup phase took"""
+    _profile["phases"][name] = round(elapsed_ms, 2)
+
+def finish_startup() -> bool:
+    """Mark startup as finished, returning False if it already was"""
+    if _profile["finished"]:
+        return False
+    _profile["finished"] = True
+    return True
+
+def elapsed_ms() -> float:
+    """Milliseconds since the bot process started importing its modules"""
+    return (time.perf_counter() - _profile["started"]) * 1000
+
+class LazyModule:
+    """Stand-in for a module that is imported the first time one of its attributes is used"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        # Render threads can hit the same module at once; import it only once
+        with _import_lock:
+            if self._module is None:
+                # Several modules can defer the same import; only the first one pays for it
+                first_use = self._name not in sys.modules
+                started = time.perf_counter()
+                self._module = importlib.import_module(self._name)
+                if first_use:
+                    _profile["deferred"][self._name] = round((time.perf_counter() - started) * 1000, 2)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        module = self._module or self._load()
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name} ({state})>"
+
+def lazy_import(name: str) -> LazyModule:
+    """Defer importing a heavy module until it is first used"""
+    return LazyModule(name)
+
+def get_startup_profile() -> Dict[str, Any]:
+    """Get the recorded startup phases and deferred imports"""
+    return {
+        "phases": dict(_profile["phases"]),
+        "deferred": dict(_profile["deferred"]),
+        "total_ms": round(sum(_profile["phases"].values()), 2)
+    }
+
+def format_startup_profile(profile: Dict[str, Any] = None) -> str:
+    """Format a startup profile as one line per phase"""
+    profile = profile or get_startup_profile()
+    lines = [f"{name}: {ms:.1f} ms" for name, ms in profile["phases"].items()]
+    for name, ms in profile["deferred"].items():
+        lines.append(f"{name} (deferred): {ms:.1f} ms")
+    return "\n".join(lines)
+
+def load_startup_baseline(path: str = STARTUP_BASELINE) -> Dict[str, Any]:
+    """Load the recorded startup baseline, or an empty dict if there is none"""
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading startup baseline: {e}")
+    return {}
+
+def save_startup_baseline(path: str = STARTUP_BASELINE) -> None:
+    """Record the current startup profile as the baseline"""
+    try:
+        with open(path, "w") as f:
+            json.dump(get_startup_profile(), f, indent=4)
+    except Exception as e:
+        print(f"Error saving startup baseline: {e}")
+
+def find_startup_regressions(baseline: Dict[str, Any]) -> List[str]:
+    """Describe each phase that got noticeably slower than the baseline"""
+    regressions = []
+    for name, ms in get_startup_profile()["phases"].items():
+        old = baseline.get("phases", {}).get(name)
+        if old is None:
+            continue
+        if ms > old * STARTUP_REGRESSION_RATIO and ms - old >= STARTUP_REGRESSION_MIN_MS:
+            regressions.append(f"{name}: {old:.1f} ms -> {ms:.1f} ms")
+    return regressions
@@ -0,0 +1,310 @@
+import asyncio
+import copy
+import json
+import math
+import os
+import random
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import TOURNAMENT_MAX_ENTRANTS
+from battle_engine import run_battle, domain_timing_policy, DOMAIN_EXPANSIONS
+
+FORMATS = ["bracket", "swiss"]
+
+# Journal files for results of the round in progress, one per guild
+TOURNAMENT_DIR = "tournaments"
+
+# Matches resolved per executor job; a round's chunks run concurrently
+ROUND_CHUNK_SIZE = 64
+
+# Swiss scoring
+WIN_POINTS = 1.0
+DRAW_POINTS = 0.5
+BYE_POINTS = 1.0
+
+def new_tournament(guild_id: str, channel_id: int, organizer: str, fmt: str,
+                   seed: int = None) -> Dict[str, Any]:
+    """Open a tournament for registration"""
+    return {
+        "guild_id": guild_id,
+        "channel_id": channel_id,
+        "organizer": organizer,
+        "format": fmt,
+        "status": "open",
+        "seed": seed if seed is not None else random.getrandbits(32),
+        "entrants": [],        # {"user_id", "pet"} in seed order once started
+        "rounds": [],          # {"matches": [[a, b]], "results": [result or None]}
+        "total_rounds": 0,
+        "created": time.time()
+    }
+
+def add_entrant(tournament: Dict[str, Any], user_id: str, pet: Dict[str, Any]) -> Optional[str]:
+    """Register a pet, or explain why it can't be"""
+    if tournament["status"] != "open":
+        return "Registration for this tournament is closed!"
+    if any(entrant["user_id"] == user_id for entrant in tournament["entrants"]):
+        return "You've already entered a pet! Use `!tournament leave` to withdraw it."
+    if len(tournament["entrants"]) >= TOURNAMENT_MAX_ENTRANTS:
+        return f"This tournament is full ({TOURNAMENT_MAX_ENTRANTS} entrants)."
+    # Entrants fight as they were when they signed up; the owner's pet isn't touched
+    tournament["entrants"].append({"user_id": user_id, "pet": copy.deepcopy(pet)})
+    return None
+
+def remove_entrant(tournament: Dict[str, Any], user_id: str) -> bool:
+    """Withdraw a user's pet while registration is open"""
+    before = len(tournament["entrants"])
+    tournament["entrants"] = [e for e in tournament["entrants"] if e["user_id"] != user_id]
+    return len(tournament["entrants"]) < before
+
+def _power(entrant: Dict[str, Any]) -> Tuple[int, int, int]:
+    pet = entrant["pet"]
+    return (pet.get("level", 1), pet["strength"], pet["health"])
+
+def bracket_positions(size: int) -> List[int]:
+    """Seed numbers in bracket order, so the top seeds can only meet in the late rounds"""
+    positions = [0]
+    while len(positions) < size:
+        count = len(positions) * 2
+        positions = [seed for position in positions for seed in (position, count - 1 - position)]
+    return positions
+
+def start_tournament(tournament: Dict[str, Any]) -> None:
+    """Close registration, seed the entrants and pair the first round"""
+    # The strongest pets get the top seeds
+    tournament["entrants"].sort(key=_power, reverse=True)
+    count = len(tournament["entrants"])
+    tournament["total_rounds"] = max(1, math.ceil(math.log2(count)))
+    tournament["status"] = "running"
+    tournament["rounds"] = [{"matches": first_round_pairings(tournament), "results": None}]
+    tournament["rounds"][0]["results"] = [None] * len(tournament["rounds"][0]["matches"])
+
+def first_round_pairings(tournament: Dict[str, Any]) -> List[List[Optional[int]]]:
+    if tournament["format"] == "swiss":
+        return swiss_pairings(tournament)
+    count = len(tournament["entrants"])
+    size = 2 ** tournament["total_rounds"]
+    # Seeds past the last entrant are byes
+    slots = [seed if seed < count else None for seed in bracket_positions(size)]
+    return [[slots[i], slots[i + 1]] for i in range(0, size, 2)]
+
+def next_round_pairings(tournament: Dict[str, Any]) -> List[List[Optional[int]]]:
+    """Pair the next round from the finished ones"""
+    if tournament["format"] == "swiss":
+        return swiss_pairings(tournament)
+    # Bracket: winners of neighbouring matches meet
+    winners = [match_winner(tournament, match, result)
+               for match, result in zip(tournament["rounds"][-1]["matches"], tournament["rounds"][-1]["results"])]
+    return [[winners[i], winners[i + 1]] for i in range(0, len(winners), 2)]
+
+def match_winner(tournament: Dict[str, Any], match: List[Optional[int]], result: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Entrant who goes through from a bracket match"""
+    a, b = match
+    if b is None or a is None:
+        return a if b is None else b
+    if result["winner"] is not None:
+        return result["winner"]
+    # Brackets can't have draws: more HP left goes through, then the higher seed
+    hp_a = result["hp"][0] / max(1, tournament["entrants"][a]["pet"]["health"])
+    hp_b = result["hp"][1] / max(1, tournament["entrants"][b]["pet"]["health"])
+    if hp_a != hp_b:
+        return a if hp_a > hp_b else b
+    return min(a, b)
+
+def swiss_scores(tournament: Dict[str, Any]) -> Tuple[List[float], List[set], List[bool]]:
+    """Points, past opponents and whether each entrant already had a bye"""
+    count = len(tournament["entrants"])
+    points = [0.0] * count
+    opponents = [set() for _ in range(count)]
+    had_bye = [False] * count
+    for round_data in tournament["rounds"]:
+        for (a, b), result in zip(round_data["matches"], round_data["results"]):
+            if result is None:
+                continue
+            if b is None:
+                points[a] += BYE_POINTS
+                had_bye[a] = True
+                continue
+            opponents[a].add(b)
+            opponents[b].add(a)
+            if result["winner"] is None:
+                points[a] += DRAW_POINTS
+                points[b] += DRAW_POINTS
+            else:
+                points[result["winner"]] += WIN_POINTS
+    return points, opponents, had_bye
+
+def swiss_pairings(tournament: Dict[str, Any]) -> List[List[Optional[int]]]:
+    """Pair entrants with similar scores who haven't met yet"""
+    points, opponents, had_bye = swiss_scores(tournament)
+    order = sorted(range(len(points)), key=lambda i: (-points[i], i))
+
+    pairings = []
+    if len(order) % 2:
+        # The lowest-ranked entrant without a bye sits this round out
+        bye = next((i for i in reversed(order) if not had_bye[i]), order[-1])
+        order.remove(bye)
+        pairings.append([bye, None])
+
+    unpaired = order
+    matches = []
+    while unpaired:
+        a = unpaired.pop(0)
+        # The closest-ranked entrant not played yet, or the closest one if all were played
+        b = next((i for i in unpaired if i not in opponents[a]), unpaired[0])
+        unpaired.remove(b)
+        matches.append([a, b])
+    return matches + pairings
+
+def match_seed(tournament: Dict[str, Any], round_no: int, match_no: int) -> int:
+    """Per-match battle seed, so a resumed tournament replays matches identically"""
+    return random.Random(f"{tournament['seed']}:{round_no}:{match_no}").getrandbits(32)
+
+def resolve_match(tournament: Dict[str, Any], round_no: int, match_no: int) -> Dict[str, Any]:
+    """Fight one match headlessly and return its result"""
+    a, b = tournament["rounds"][round_no]["matches"][match_no]
+    if a is None or b is None:
+        return {"winner": a if b is None else b, "bye": True}
+    pet1 = tournament["entrants"][a]["pet"]
+    pet2 = tournament["entrants"][b]["pet"]
+    domain = (pet1.get("rarity") == "mythic" and pet1["species"] in DOMAIN_EXPANSIONS,
+              pet2.get("rarity") == "mythic" and pet2["species"] in DOMAIN_EXPANSIONS)
+    result = run_battle(pet1, pet2, domain_timing_policy, seed=match_seed(tournament, round_no, match_no),
+                        domain=domain)
+    winner = {"challenger": a, "opponent": b}.get(result["winner"])
+    return {"winner": winner, "turns": result["turns"], "hp": result["hp"], "seed": result["seed"]}
+
+def _resolve_chunk(tournament: Dict[str, Any], round_no: int, match_nos: List[int]) -> List[Tuple[int, Dict[str, Any]]]:
+    return [(match_no, resolve_match(tournament, round_no, match_no)) for match_no in match_nos]
+
+def journal_path(tournament: Dict[str, Any]) -> str:
+    return os.path.join(TOURNAMENT_DIR, f"{tournament['guild_id']}.jsonl")
+
+def _journal_results(tournament: Dict[str, Any], round_no: int, results: List[Tuple[int, Dict[str, Any]]]) -> None:
+    """Append finished match results so an interrupted round doesn't start over"""
+    try:
+        os.makedirs(TOURNAMENT_DIR, exist_ok=True)
+        with open(journal_path(tournament), "a") as f:
+            for match_no, result in results:
+                f.write(json.dumps({"round": round_no, "match": match_no, "result": result}) + "\n")
+    except Exception as e:
+        print(f"Error journaling tournament results: {e}")
+
+def replay_journal(tournament: Dict[str, Any]) -> int:
+    """Restore results journaled for the round in progress; returns how many were restored"""
+    path = journal_path(tournament)
+    if not os.path.exists(path) or not tournament["rounds"]:
+        return 0
+    round_no = len(tournament["rounds"]) - 1
+    results = tournament["rounds"][round_no]["results"]
+    restored = 0
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut off by the interruption; that match just runs again
+                    continue
+                if entry["round"] == round_no and results[entry["match"]] is None:
+                    results[entry["match"]] = entry["result"]
+                    restored += 1
+    except Exception as e:
+        print(f"Error reading tournament journal: {e}")
+    return restored
+
+def clear_journal(tournament: Dict[str, Any]) -> None:
+    """Drop the journal once its round is saved with the tournament"""
+    try:
+        if os.path.exists(journal_path(tournament)):
+            os.remove(journal_path(tournament))
+    except Exception as e:
+        print(f"Error clearing tournament journal: {e}")
+
+async def play_round(tournament: Dict[str, Any]) -> int:
+    """Resolve every unfinished match of the current round concurrently; returns how many were played"""
+    round_no = len(tournament["rounds"]) - 1
+    results = tournament["rounds"][round_no]["results"]
+    pending = [i for i, result in enumerate(results) if result is None]
+
+    loop = asyncio.get_running_loop()
+    jobs = [loop.run_in_executor(None, _resolve_chunk, tournament, round_no, pending[i:i + ROUND_CHUNK_SIZE])
+            for i in range(0, len(pending), ROUND_CHUNK_SIZE)]
+    # Journal each chunk as it lands, so an interruption only loses the chunks still running
+    for job in asyncio.as_completed(jobs):
+        chunk = await job
+        for match_no, result in chunk:
+            results[match_no] = result
+        _journal_results(tournament, round_no, chunk)
+    return len(pending)
+
+def round_finished(tournament: Dict[str, Any]) -> bool:
+    return bool(tournament["rounds"]) and all(result is not None for result in tournament["rounds"][-1]["results"])
+
+def advance_round(tournament: Dict[str, Any]) -> bool:
+    """Pair the next round after a finished one; returns False when the tournament is over"""
+    if len(tournament["rounds"]) >= tournament["total_rounds"]:
+        tournament["status"] = "finished"
+        return False
+    matches = next_round_pairings(tournament)
+    tournament["rounds"].append({"matches": matches, "results": [None] * len(matches)})
+    return True
+
+def get_standings(tournament: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rank entrants: by points and Buchholz for Swiss, by how far they got for brackets"""
+    count = len(tournament["entrants"])
+    points, opponents, _ = swiss_scores(tournament)
+    if tournament["format"] == "swiss":
+        # Buchholz: the sum of opponents' points breaks ties between equal scores
+        tiebreak = [sum(points[o] for o in opponents[i]) for i in range(count)]
+    else:
+        # Rounds survived; the champion survives one more than the finalist
+        tiebreak = [0] * count
+        for round_no, round_data in enumerate(tournament["rounds"]):
+            for match, result in zip(round_data["matches"], round_data["results"]):
+                if result is not None:
+                    winner = match_winner(tournament, match, result)
+                    tiebreak[winner] = round_no + 1
+        points = [float(t) for t in tiebreak]
+    ranked = sorted(range(count), key=lambda i: (-points[i], -tiebreak[i], i))
+    return [{"entrant": i, "points": points[i], "tiebreak": tiebreak[i],
+             "user_id": tournament["entrants"][i]["user_id"], "pet": tournament["entrants"][i]["pet"]}
+            for i in ranked]
+
+def format_standings(tournament: Dict[str, Any], names: Dict[str, str] = None, limit: int = 16) -> str:
+    """Format the top of the standings as a fixed-width table"""
+    names = names or {}
+    swiss = tournament["format"] == "swiss"
+    header = f"{'#':>3} {'Pet':<22} {'Owner':<14} {'Pts' if swiss else 'Rnd':>5}" + (f" {'Buch':>5}" if swiss else "")
+    lines = [header]
+    for rank, row in enumerate(get_standings(tournament)[:limit], 1):
+        owner = names.get(row["user_id"], row["user_id"])
+        line = f"{rank:>3} {row['pet']['name'][:22]:<22} {owner[:14]:<14} {row['points']:>5g}"
+        if swiss:
+            line += f" {row['tiebreak']:>5g}"
+        lines.append(line)
+    return "\n".join(lines)
+
+def round_summary(tournament: Dict[str, Any], round_no: int) -> List[Tuple[str, str, Optional[int], str]]:
+    """(pet 1, pet 2, winning side or None, detail) for each match of a round, for the round image"""
+    entrants = tournament["entrants"]
+    round_data = tournament["rounds"][round_no]
+    summary = []
+    for match, result in zip(round_data["matches"], round_data["results"]):
+        a, b = match
+        name_a = entrants[a]["pet"]["name"] if a is not None else "BYE"
+        name_b = entrants[b]["pet"]["name"] if b is not None else "BYE"
+        if result is None:
+            summary.append((name_a, name_b, None, "pending"))
+            continue
+        if result.get("bye"):
+            summary.append((name_a, name_b, 0 if b is None else 1, "bye"))
+            continue
+        winner = result["winner"]
+        if winner is None and tournament["format"] == "bracket":
+            winner = match_winner(tournament, match, result)
+            detail = f"{result['turns']} turns, on HP"
+        else:
+            detail = f"{result['turns']} turns" if winner is not None else f"draw, {result['turns']} turns"
+        summary.append((name_a, name_b, None if winner is None else (0 if winner == a else 1), detail))
+    return summary
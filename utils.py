@@ -1,37 +1,51 @@
+from __future__ import annotations
 import random
-import discord
 import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Tuple, Optional
-import pytz
 from config import SPECIES, TRAITS, COLORS, BASE_PRIZE_COINS, MAX_HEALTH, MAX_HAPPINESS
 import os
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 import io
 import math
-import colorsys
+import asyncio
+from overlays import composite_overlay, tint_overlay
+import asset_manifest
+from fonts import draw_text
+from sprite_atlas import get_sprite, BATTLE_SPRITE_SIZE
+from image_encoder import encode_image
+from render_cache import appearance_key, get_render, put_render
+from startup import lazy_import
+
+# Heavy modules are imported on first use so the bot reaches the gateway sooner
+discord = lazy_import("discord")
+pytz = lazy_import("pytz")
+colorsys = lazy_import("colorsys")
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+
+# Species and starting stat ranges (inclusive) for each rarity
+RARITY_POOLS = {
+    "common": {"species": ["Rabbit", "Hamster", "Bird"], "health": (40, 60), "happiness": (40, 60), "strength": (5, 15)},
+    "rare": {"species": ["Wolf", "Cat", "Dog"], "health": (60, 80), "happiness": (60, 80), "strength": (15, 25)},
+    "mythic": {"species": ["Dragon", "Phoenix", "Unicorn", "Griffin"], "health": (80, 100), "happiness": (80, 100), "strength": (25, 35)}
+}
+RARITY_ORDER = ["common", "rare", "mythic"]
 
 def generate_pet(rare: bool = False, mythic: bool = False) -> Dict[str, Any]:
     """Generate a new pet with random attributes"""
-    # Select species based on rarity
-    if mythic:
-        species_pool = ["Dragon", "Phoenix", "Unicorn", "Griffin"]  # Mythic species
-    elif rare:
-        species_pool = ["Wolf", "Cat", "Dog"]  # Rare species
-    else:
-        species_pool = ["Rabbit", "Hamster", "Bird"]  # Common species
+    # Set rarity
+    rarity = "mythic" if mythic else "rare" if rare else "common"
+    pool = RARITY_POOLS[rarity]
         
-    species = random.choice(species_pool)
+    species = random.choice(pool["species"])
     color = random.choice(COLORS)
     trait = random.choice(TRAITS)
     
-    # Set rarity
-    rarity = "mythic" if mythic else "rare" if rare else "common"
-    
     # Generate base stats - higher for rare/mythic pets
-    base_health = random.randint(60, 80) if rare else random.randint(80, 100) if mythic else random.randint(40, 60)
-    base_happiness = random.randint(60, 80) if rare else random.randint(80, 100) if mythic else random.randint(40, 60)
-    base_strength = random.randint(15, 25) if rare else random.randint(25, 35) if mythic else random.randint(5, 15)
+    base_health = random.randint(*pool["health"])
+    base_happiness = random.randint(*pool["happiness"])
+    base_strength = random.randint(*pool["strength"])
     
     # Create pet data
     pet = {
@@ -49,6 +63,54 @@ def generate_pet(rare: bool = False, mythic: bool = False) -> Dict[str, Any]:
     
     return pet
 
+def event_rng(seed: int, stream: int = 0):
+    """Random generator for one stream of a seeded event
+
+    Streams of the same seed are independent of each other and of the global `random`
+    module, so an event can be replayed exactly from its seed.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream,)))
+
+def generate_pets(count: int, weights: Dict[str, float], rng=None) -> List[Dict[str, Any]]:
+    """Generate many pets at once, drawing each pet's rarity from weights like {"common": 0.8, ...}"""
+    rng = rng if rng is not None else np.random.default_rng()
+    odds = np.array([weights.get(rarity, 0.0) for rarity in RARITY_ORDER], dtype=float)
+    rarities = rng.choice(len(RARITY_ORDER), size=count, p=odds / odds.sum())
+
+    # Every column is drawn in one go; per-rarity limits are looked up by each pet's rarity
+    pools = [RARITY_POOLS[rarity] for rarity in RARITY_ORDER]
+    species_names = [name for pool in pools for name in pool["species"]]
+    species_offset = np.cumsum([0] + [len(pool["species"]) for pool in pools])[rarities]
+    species_count = np.array([len(pool["species"]) for pool in pools])[rarities]
+    species = species_offset + (rng.random(count) * species_count).astype(int)
+    colors = rng.integers(0, len(COLORS), size=count)
+    traits = rng.integers(0, len(TRAITS), size=count)
+
+    stats = {}
+    for stat in ("health", "happiness", "strength"):
+        low = np.array([pool[stat][0] for pool in pools])[rarities]
+        high = np.array([pool[stat][1] for pool in pools])[rarities]
+        stats[stat] = rng.integers(low, high + 1)
+    health = np.minimum(stats["health"], MAX_HEALTH).tolist()
+    happiness = np.minimum(stats["happiness"], MAX_HAPPINESS).tolist()
+    strength = stats["strength"].tolist()
+
+    pets = []
+    for i, (r, s, c, t) in enumerate(zip(rarities.tolist(), species.tolist(), colors.tolist(), traits.tolist())):
+        pets.append({
+            "name": f"{COLORS[c]} {TRAITS[t]} {species_names[s]}",
+            "species": species_names[s],
+            "color": COLORS[c],
+            "trait": TRAITS[t],
+            "health": health[i],
+            "happiness": happiness[i],
+            "strength": strength[i],
+            "rarity": RARITY_ORDER[r],
+            "level": 1,
+            "xp": 0
+        })
+    return pets
+
 def format_pet_info(pet: Dict[str, Any]) -> str:
     """Format pet information for display"""
     created_date = ""
@@ -58,9 +120,13 @@ def format_pet_info(pet: Dict[str, Any]) -> str:
     rarity_str = ""
     if "rarity" in pet:
         rarity_str = f", Rarity: {pet['rarity'].capitalize()}"
+    
+    rating_str = ""
+    if "rating" in pet:
+        rating_str = f", Rating: {pet['rating']:.0f}"
         
     return (f"{pet['name']} (Health: {pet['health']}, "
-            f"Happiness: {pet['happiness']}, Strength: {pet['strength']}{rarity_str}{created_date})")
+            f"Happiness: {pet['happiness']}, Strength: {pet['strength']}{rarity_str}{rating_str}{created_date})")
 
 def calculate_fight_rewards(winner_pet: Dict[str, Any], loser_pet: Dict[str, Any]) -> int:
     """Calculate coins reward for winning a fight"""
@@ -156,34 +222,15 @@ def ensure_assets_dirs():
 
 def find_matching_image(category: str, name: str, pose: str = "idle") -> Optional[str]:
     """Find a matching image in the assets directory"""
-    # Define search paths based on category
-    if category == "pet":
-        search_dir = f"assets/pets/{pose}"
-    elif category == "accessory":
-        search_dir = "assets/accessories"
-    elif category == "background":
-        search_dir = "assets/backgrounds"
-    elif category == "effect":
-        search_dir = "assets/effects"
-    else:
-        return None
-        
-    # Try exact match first
-    for ext in ['.png', '.jpg', '.gif']:
-        path = os.path.join(search_dir, f"{name.lower()}{ext}")
-        if os.path.exists(path):
-            return path
-            
-    # Try partial matches
-    try:
-        files = os.listdir(search_dir)
-        for file in files:
-            if name.lower() in file.lower():
-                return os.path.join(search_dir, file)
-    except:
-        pass
-        
-    return None
+    # Served from the in-memory asset manifest instead of probing the filesystem
+    return asset_manifest.lookup(category, name, pose)
+
+def load_sprite(path: str, size: Tuple[int, int]) -> Image.Image:
+    """Load an asset image at the given size, cropping it from the sprite atlas when it's packed"""
+    sprite = get_sprite(path, size)
+    if sprite is None:
+        sprite = Image.open(path).convert("RGBA").resize(size, Image.LANCZOS)
+    return sprite
 
 def get_random_color():
     """Generate a random vibrant color"""
@@ -253,44 +300,174 @@ def add_details(draw, x, y, size, color):
                     points.append((px, py))
                 draw.polygon(points, fill=pattern_color)
 
+def image_file(img: Image.Image, kind: str, basename: str) -> discord.File:
+    """Encode an image with its type's encoder profile and wrap it for upload"""
+    data, ext = encode_image(img, kind)
+    return discord.File(io.BytesIO(data), filename=f"{basename}.{ext}")
+
+def render_pet_image(pet: Dict[str, Any]) -> Optional[Image.Image]:
+    """Render a pet's portrait from its species art, color and rarity"""
+    # Portraits only depend on appearance, so reuse an earlier render when there is one
+    key = appearance_key(pet)
+    cached = get_render(key)
+    if cached is not None:
+        return cached
+    
+    # Get the base image path based on species
+    base_path = find_matching_image("pet", pet['species'], "idle")
+    
+    if not base_path:
+        print(f"Warning: Image not found for {pet['species']}")
+        return None
+        
+    # Open and convert the image
+    img = Image.open(base_path).convert('RGBA')
+    
+    # Apply color tint based on pet's color
+    tint = get_color_tint(pet['color'])
+    if tint:
+        img = tint_overlay(img, tint + (100,))  # Add alpha for transparency
+    
+    # Add rarity effects
+    if pet['rarity'] == 'mythic':
+        # Add golden glow
+        img = tint_overlay(img, (255, 215, 0, 50))  # Golden color
+    elif pet['rarity'] == 'rare':
+        # Add blue shimmer
+        img = tint_overlay(img, (0, 191, 255, 30))  # Blue color
+    
+    put_render(key, img)
+    return img
+
 async def generate_pet_image(pet):
     """Generate a pet image based on its attributes"""
     try:
-        # Get the base image path based on species
-        base_path = f"assets/pets/idle/{pet['species'].lower()}_idle.png"
-        
-        if not os.path.exists(base_path):
-            print(f"Warning: Image not found for {pet['species']}")
+        img = render_pet_image(pet)
+        if img is None:
             return None
-            
-        # Open and convert the image
-        img = Image.open(base_path).convert('RGBA')
         
-        # Apply color tint based on pet's color
-        tint = get_color_tint(pet['color'])
-        if tint:
-            tinted = Image.new('RGBA', img.size, tint + (100,))  # Add alpha for transparency
-            img = Image.alpha_composite(img, tinted)
+        return image_file(img, "pet", "pet")
         
-        # Add rarity effects
-        if pet['rarity'] == 'mythic':
-            # Add golden glow
-            glow = Image.new('RGBA', img.size, (255, 215, 0, 50))  # Golden color
-            img = Image.alpha_composite(img, glow)
-        elif pet['rarity'] == 'rare':
-            # Add blue shimmer
-            shimmer = Image.new('RGBA', img.size, (0, 191, 255, 30))  # Blue color
-            img = Image.alpha_composite(img, shimmer)
+    except Exception as e:
+        print(f"Error generating pet image: {e}")
+        return None
+
+# Gallery layout
+GALLERY_TILE_SIZE = (300, 300)
+GALLERY_COLUMNS = 3
+GALLERY_PADDING = 10
+
+def render_gallery_tile(pet: Dict[str, Any], number: int) -> Image.Image:
+    """Render one captioned gallery tile for a pet"""
+    tile = Image.new("RGBA", GALLERY_TILE_SIZE, (47, 49, 54, 255))
+    
+    # Legacy pets only carry a name, so take species and color from its words
+    words = pet["name"].split()
+    appearance = dict(pet)
+    appearance.setdefault("species", words[-1])
+    appearance.setdefault("color", words[0])
+    appearance.setdefault("rarity", "common")
+    
+    try:
+        img = render_pet_image(appearance)
+    except Exception as e:
+        print(f"Error rendering gallery tile: {e}")
+        img = None
+    if img is None:
+        img = create_default_pet_image(appearance["species"], appearance["color"])
+    
+    # Fit the portrait above the caption strip, keeping its aspect ratio
+    caption_height = 80
+    img.thumbnail((GALLERY_TILE_SIZE[0], GALLERY_TILE_SIZE[1] - caption_height))
+    tile.alpha_composite(img, ((GALLERY_TILE_SIZE[0] - img.width) // 2,
+                               (GALLERY_TILE_SIZE[1] - caption_height - img.height) // 2))
+    
+    tile = add_pet_stats(tile, pet)
+    draw_text(tile, (8, 8), f"#{number}", size=20, fill=(255, 255, 255, 255), anchor="lt")
+    return tile
+
+async def generate_gallery_image(pets: List[Dict[str, Any]]) -> Optional[discord.File]:
+    """Composite all of a user's pets into a single captioned contact sheet"""
+    if not pets:
+        return None
         
-        # Save to bytes
-        img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
+    try:
+        # Render tiles in parallel worker threads
+        loop = asyncio.get_running_loop()
+        tiles = await asyncio.gather(*[
+            loop.run_in_executor(None, render_gallery_tile, pet, i + 1)
+            for i, pet in enumerate(pets)
+        ])
+        
+        columns = min(GALLERY_COLUMNS, len(tiles))
+        rows = math.ceil(len(tiles) / columns)
+        tile_w, tile_h = GALLERY_TILE_SIZE
+        sheet = Image.new(
+            "RGBA",
+            (columns * (tile_w + GALLERY_PADDING) + GALLERY_PADDING,
+             rows * (tile_h + GALLERY_PADDING) + GALLERY_PADDING),
+            (32, 34, 37, 255)
+        )
+        for i, tile in enumerate(tiles):
+            x = GALLERY_PADDING + (i % columns) * (tile_w + GALLERY_PADDING)
+            y = GALLERY_PADDING + (i // columns) * (tile_h + GALLERY_PADDING)
+            sheet.paste(tile, (x, y))
         
-        return discord.File(img_byte_arr, filename='pet.png')
+        return image_file(sheet, "gallery", "gallery")
         
     except Exception as e:
-        print(f"Error generating pet image: {e}")
+        print(f"Error generating gallery image: {e}")
+        return None
+
+# Tournament round sheet layout
+ROUND_CARD_SIZE = (300, 64)
+ROUND_COLUMNS = 4
+ROUND_PADDING = 8
+ROUND_HEADER = 48
+ROUND_MAX_CARDS = 128
+
+def render_round_sheet(title: str, matches: List[Tuple[str, str, Optional[int], str]]) -> Image.Image:
+    """Draw a round's matches as a grid of cards, the winner of each highlighted"""
+    shown = matches[:ROUND_MAX_CARDS]
+    columns = max(1, min(ROUND_COLUMNS, len(shown)))
+    rows = max(1, math.ceil(len(shown) / columns))
+    card_w, card_h = ROUND_CARD_SIZE
+    sheet = Image.new(
+        "RGBA",
+        (columns * (card_w + ROUND_PADDING) + ROUND_PADDING,
+         ROUND_HEADER + rows * (card_h + ROUND_PADDING) + ROUND_PADDING),
+        (32, 34, 37, 255)
+    )
+    draw = ImageDraw.Draw(sheet)
+    header = title if len(matches) <= ROUND_MAX_CARDS else f"{title} (first {ROUND_MAX_CARDS} of {len(matches)} matches)"
+    draw_text(sheet, (ROUND_PADDING, ROUND_HEADER // 2), header, size=22, fill=(255, 255, 255, 255), anchor="lm")
+    
+    for i, (name1, name2, winner, detail) in enumerate(shown):
+        x = ROUND_PADDING + (i % columns) * (card_w + ROUND_PADDING)
+        y = ROUND_HEADER + (i // columns) * (card_h + ROUND_PADDING)
+        draw.rectangle([x, y, x + card_w, y + card_h], fill=(47, 49, 54, 255))
+        for side, name in enumerate((name1, name2)):
+            line_y = y + 6 + side * 22
+            if winner == side:
+                # Winner's row gets a gold stripe and bright text
+                draw.rectangle([x, line_y - 2, x + 4, line_y + 18], fill=(255, 215, 0, 255))
+                fill = (255, 255, 255, 255)
+            else:
+                fill = (140, 142, 148, 255)
+            draw_text(sheet, (x + 12, line_y), name[:28], size=16, fill=fill, anchor="lt")
+        draw_text(sheet, (x + card_w - 8, y + card_h - 6), detail, size=12, fill=(170, 170, 170, 255), anchor="rb")
+    return sheet
+
+async def generate_round_image(title: str, matches: List[Tuple[str, str, Optional[int], str]]) -> Optional[discord.File]:
+    """Render a tournament round's results off the event loop"""
+    if not matches:
+        return None
+    try:
+        loop = asyncio.get_running_loop()
+        sheet = await loop.run_in_executor(None, render_round_sheet, title, matches)
+        return image_file(sheet, "bracket", "round")
+    except Exception as e:
+        print(f"Error generating round image: {e}")
         return None
 
 def get_color_tint(color):
@@ -318,50 +495,34 @@ async def generate_battle_image(pet1, pet2):
         background = Image.new('RGBA', (width, height), (200, 200, 255, 255))
         
         # Load pet images
-        pet1_path = f"assets/pets/attack/{pet1['species'].lower()}_idle.png"  # Using idle for now, can add attack poses later
-        pet2_path = f"assets/pets/attack/{pet2['species'].lower()}_idle.png"
+        pet1_path = find_matching_image("pet", pet1['species'], "attack")
+        pet2_path = find_matching_image("pet", pet2['species'], "attack")
         
-        if not os.path.exists(pet1_path) or not os.path.exists(pet2_path):
+        if not pet1_path or not pet2_path:
             return None
             
-        pet1_img = Image.open(pet1_path).convert('RGBA')
-        pet2_img = Image.open(pet2_path).convert('RGBA')
-        
-        # Resize pet images if needed
-        pet_size = (300, 300)
-        pet1_img = pet1_img.resize(pet_size)
-        pet2_img = pet2_img.resize(pet_size)
+        # Pre-scaled sprites come straight from the atlas
+        pet_size = BATTLE_SPRITE_SIZE
+        pet1_img = load_sprite(pet1_path, pet_size)
+        pet2_img = load_sprite(pet2_path, pet_size)
         
         # Apply color tints
         tint1 = get_color_tint(pet1['color'])
         tint2 = get_color_tint(pet2['color'])
         
         if tint1:
-            tinted1 = Image.new('RGBA', pet1_img.size, tint1 + (100,))
-            pet1_img = Image.alpha_composite(pet1_img, tinted1)
+            pet1_img = tint_overlay(pet1_img, tint1 + (100,))
         if tint2:
-            tinted2 = Image.new('RGBA', pet2_img.size, tint2 + (100,))
-            pet2_img = Image.alpha_composite(pet2_img, tinted2)
+            pet2_img = tint_overlay(pet2_img, tint2 + (100,))
         
         # Position pets
         background.paste(pet1_img, (50, 50), pet1_img)
         background.paste(pet2_img, (450, 50), pet2_img)
         
         # Add VS text
-        draw = ImageDraw.Draw(background)
-        try:
-            font = ImageFont.truetype("arial.ttf", 60)
-        except:
-            font = ImageFont.load_default()
-            
-        draw.text((width//2, height//2), "VS", fill=(255, 0, 0), font=font, anchor="mm")
-        
-        # Save to bytes
-        img_byte_arr = io.BytesIO()
-        background.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
+        draw_text(background, (width//2, height//2), "VS", face="battle", size=60, fill=(255, 0, 0))
         
-        return discord.File(img_byte_arr, filename='battle.png')
+        return image_file(background, "battle", "battle")
         
     except Exception as e:
         print(f"Error generating battle image: {e}")
@@ -374,7 +535,7 @@ async def load_pet_image(pet: Dict[str, Any], pose: str = "idle") -> Optional[Im
         species = pet["name"].split()[-1].lower()
         base_image_path = find_matching_image("pet", species, pose)
         
-        if base_image_path and os.path.exists(base_image_path):
+        if base_image_path:
             img = Image.open(base_image_path).convert("RGBA")
         else:
             img = create_default_pet_image(species, pet["name"].split()[0].lower())
@@ -388,15 +549,11 @@ async def load_pet_image(pet: Dict[str, Any], pose: str = "idle") -> Optional[Im
             if pet["rarity"] == "rare":
                 accessory = find_matching_image("accessory", "rare")
                 if accessory:
-                    acc_img = Image.open(accessory).convert("RGBA")
-                    acc_img = acc_img.resize(img.size, Image.LANCZOS)
-                    img = Image.alpha_composite(img, acc_img)
+                    img = Image.alpha_composite(img, load_sprite(accessory, img.size))
             elif pet["rarity"] == "mythic":
                 accessory = find_matching_image("accessory", "mythic")
                 if accessory:
-                    acc_img = Image.open(accessory).convert("RGBA")
-                    acc_img = acc_img.resize(img.size, Image.LANCZOS)
-                    img = Image.alpha_composite(img, acc_img)
+                    img = Image.alpha_composite(img, load_sprite(accessory, img.size))
                     
         # Add visual effects based on stats
         if pet["health"] < 30:
@@ -415,9 +572,7 @@ def add_effect(img: Image.Image, effect_name: str) -> Image.Image:
     effect_path = find_matching_image("effect", effect_name)
     if effect_path:
         try:
-            effect = Image.open(effect_path).convert("RGBA")
-            effect = effect.resize(img.size, Image.LANCZOS)
-            return Image.alpha_composite(img, effect)
+            return Image.alpha_composite(img, load_sprite(effect_path, img.size))
         except:
             pass
     return img
@@ -430,15 +585,8 @@ def create_default_pet_image(species: str, color_name: str) -> Image.Image:
     # Draw a simple shape
     draw.ellipse((50, 50, 250, 250), fill=(200, 200, 200, 255))
     
-    # Try to load a font
-    font_path = os.path.join(FONTS_DIR, "default.ttf")
-    try:
-        font = ImageFont.truetype(font_path, 24)
-    except Exception:
-        font = ImageFont.load_default()
-    
     # Add species name
-    draw.text((150, 150), species.upper(), fill=(0, 0, 0, 255), font=font, anchor="mm")
+    draw_text(img, (150, 150), species.upper(), size=24, fill=(0, 0, 0, 255))
     
     return img
 
@@ -469,61 +617,16 @@ def apply_color_tint(img: Image.Image, color_name: str) -> Image.Image:
     if color_name.lower() == "rainbow":
         return apply_rainbow_effect(img)
     
-    # Create a tinted overlay
-    overlay = Image.new("RGBA", img.size, tint_color)
-    
-    # Composite the overlay with the original image
-    return Image.alpha_composite(img, overlay)
+    # Composite the cached tint overlay with the original image
+    return tint_overlay(img, tint_color)
 
 def apply_rainbow_effect(img: Image.Image) -> Image.Image:
     """Apply a rainbow effect to the image"""
-    # Create a gradient image
-    gradient = Image.new("RGBA", img.size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(gradient)
-    
-    # Rainbow colors
-    rainbow_colors = [
-        (255, 0, 0, 100),      # Red
-        (255, 127, 0, 100),    # Orange
-        (255, 255, 0, 100),    # Yellow
-        (0, 255, 0, 100),      # Green
-        (0, 0, 255, 100),      # Blue
-        (75, 0, 130, 100),     # Indigo
-        (148, 0, 211, 100)     # Violet
-    ]
-    
-    # Draw rainbow stripes
-    height = img.height
-    stripe_height = height / len(rainbow_colors)
-    
-    for i, color in enumerate(rainbow_colors):
-        y0 = i * stripe_height
-        y1 = (i + 1) * stripe_height
-        draw.rectangle([(0, y0), (img.width, y1)], fill=color)
-    
-    # Composite the gradient with the original image
-    return Image.alpha_composite(img, gradient)
+    return composite_overlay(img, "rainbow")
 
 def apply_trait_effect(img: Image.Image, trait: str) -> Image.Image:
     """Apply effects based on the pet's trait"""
-    trait_effects = {
-        "winged": add_wings,
-        "singing": add_music_notes,
-        "glowy": add_glow_effect,
-        "spiky": add_spikes,
-        "fluffy": add_fluff,
-        "invisible": make_partially_transparent,
-        "psychic": add_psychic_effect,
-        "metallic": add_metallic_effect,
-        "mystic": add_mystic_effect,
-        "electric": add_electric_effect,
-        "hypnotic": add_hypnotic_effect,
-        "venomous": add_venom_effect,
-        "musical": add_music_notes,
-        "magical": add_magic_effect
-    }
-    
-    effect_func = trait_effects.get(trait.lower())
+    effect_func = TRAIT_EFFECTS.get(trait.lower())
     if effect_func:
         return effect_func(img)
     return img
@@ -531,281 +634,88 @@ def apply_trait_effect(img: Image.Image, trait: str) -> Image.Image:
 # Trait effect functions
 def add_wings(img: Image.Image) -> Image.Image:
     # Look for wings accessory or just add simple wings
-    wings_path = os.path.join(ACCESSORIES_DIR, "wings.png")
-    if os.path.exists(wings_path):
-        wings = Image.open(wings_path).convert("RGBA")
-        wings = wings.resize(img.size, Image.LANCZOS)
-        return Image.alpha_composite(img, wings)
+    wings_path = asset_manifest.lookup_exact("accessory", "wings")
+    if wings_path:
+        return Image.alpha_composite(img, load_sprite(wings_path, img.size))
     
     # Simple wings if no image
-    result = img.copy()
-    draw = ImageDraw.Draw(result)
-    w, h = img.size
-    draw.ellipse((w//4, h//3, w//2, h*2//3), fill=(255, 255, 255, 100))
-    draw.ellipse((w//2, h//3, w*3//4, h*2//3), fill=(255, 255, 255, 100))
-    return result
+    return composite_overlay(img, "wings")
 
 def add_music_notes(img: Image.Image) -> Image.Image:
-    result = img.copy()
-    draw = ImageDraw.Draw(result)
-    w, h = img.size
-    
-    notes = [
-        (w*3//4, h//4),
-        (w*2//3, h//3),
-        (w*4//5, h//2)
-    ]
-    
-    for x, y in notes:
-        # Draw music note (simple version)
-        draw.ellipse((x-5, y-5, x+5, y+5), fill=(0, 0, 0, 200))
-        draw.line([(x, y), (x, y-20)], fill=(0, 0, 0, 200), width=2)
-    
-    return result
+    return composite_overlay(img, "music_notes")
 
 def add_glow_effect(img: Image.Image) -> Image.Image:
-    # Create a glowing overlay
-    glow = Image.new("RGBA", img.size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(glow)
-    
-    w, h = img.size
-    center = (w//2, h//2)
-    for radius in range(min(w, h)//2, 0, -5):
-        alpha = max(0, 150 - radius * 3)
-        draw.ellipse(
-            (center[0] - radius, center[1] - radius, 
-             center[0] + radius, center[1] + radius), 
-            fill=(255, 255, 200, alpha)
-        )
-    
-    # Composite images
-    return Image.alpha_composite(img, glow)
+    return composite_overlay(img, "glow")
 
 def add_spikes(img: Image.Image) -> Image.Image:
-    result = img.copy()
-    draw = ImageDraw.Draw(result)
-    w, h = img.size
-    
-    # Draw spikes around the edge
-    center = (w//2, h//2)
-    radius = min(w, h) // 3
-    spikes = 12
-    
-    for i in range(spikes):
-        angle = i * (360 / spikes)
-        angle_rad = angle * (3.14159 / 180)
-        
-        x1 = center[0] + int(radius * 0.8 * math.cos(angle_rad))
-        y1 = center[1] + int(radius * 0.8 * math.sin(angle_rad))
-        
-        x2 = center[0] + int(radius * 1.5 * math.cos(angle_rad))
-        y2 = center[1] + int(radius * 1.5 * math.sin(angle_rad))
-        
-        draw.line([(x1, y1), (x2, y2)], fill=(100, 100, 100, 200), width=5)
-    
-    return result
+    return composite_overlay(img, "spikes")
 
 def add_fluff(img: Image.Image) -> Image.Image:
-    result = img.copy()
-    draw = ImageDraw.Draw(result)
-    w, h = img.size
-    
-    # Draw fluffy dots around the edge
-    center = (w//2, h//2)
-    radius = min(w, h) // 3
-    fluffs = 30
-    
-    for i in range(fluffs):
-        angle = random.uniform(0, 360)
-        angle_rad = angle * (3.14159 / 180)
-        
-        dist = random.uniform(radius * 0.8, radius * 1.2)
-        x = center[0] + int(dist * math.cos(angle_rad))
-        y = center[1] + int(dist * math.sin(angle_rad))
-        
-        size = random.randint(5, 15)
-        draw.ellipse(
-            (x - size, y - size, x + size, y + size), 
-            fill=(255, 255, 255, 150)
-        )
-    
-    return result
+    return composite_overlay(img, "fluff")
 
 def make_partially_transparent(img: Image.Image) -> Image.Image:
-    # Make the image semi-transparent
-    result = img.copy()
-    pixels = result.load()
-    
-    for i in range(result.width):
-        for j in range(result.height):
-            r, g, b, a = pixels[i, j]
-            pixels[i, j] = (r, g, b, a // 2)
-    
-    return result
+    # Make the image semi-transparent by halving the alpha channel
+    pixels = np.array(img.convert("RGBA"))
+    pixels[..., 3] //= 2
+
+    return Image.fromarray(pixels, "RGBA")
 
 def add_psychic_effect(img: Image.Image) -> Image.Image:
-    # Add purple swirls
-    result = img.copy()
-    draw = ImageDraw.Draw(result)
-    w, h = img.size
-    
-    center = (w//2, h//2)
-    for i in range(0, 360, 30):
-        angle_rad = i * (3.14159 / 180)
-        
-        for radius in range(20, min(w, h)//2, 20):
-            x1 = center[0] + int(radius * math.cos(angle_rad))
-            y1 = center[1] + int(radius * math.sin(angle_rad))
-            
-            x2 = center[0] + int(radius * math.cos(angle_rad + 0.5))
-            y2 = center[1] + int(radius * math.sin(angle_rad + 0.5))
-            
-            draw.line([(x1, y1), (x2, y2)], fill=(128, 0, 128, 100), width=3)
-    
-    return result
+    return composite_overlay(img, "psychic")
 
 def add_metallic_effect(img: Image.Image) -> Image.Image:
-    # Create a metallic overlay
-    metallic = Image.new("RGBA", img.size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(metallic)
-    
-    w, h = img.size
-    for y in range(0, h, 5):
-        alpha = 100 + 50 * math.sin(y / 10)
-        draw.line([(0, y), (w, y)], fill=(200, 200, 220, int(alpha)), width=2)
-    
-    # Composite images
-    return Image.alpha_composite(img, metallic)
+    return composite_overlay(img, "metallic")
 
 def add_mystic_effect(img: Image.Image) -> Image.Image:
-    # Add stars and sparkles
-    result = img.copy()
-    draw = ImageDraw.Draw(result)
-    w, h = img.size
-    
-    for _ in range(20):
-        x = random.randint(0, w)
-        y = random.randint(0, h)
-        size = random.randint(2, 6)
-        alpha = random.randint(150, 250)
-        
-        draw.ellipse(
-            (x - size, y - size, x + size, y + size), 
-            fill=(255, 255, 220, alpha)
-        )
-        
-        # Draw star rays
-        for i in range(4):
-            angle = i * (3.14159 / 2)
-            x1 = x + int((size + 2) * math.cos(angle))
-            y1 = y + int((size + 2) * math.sin(angle))
-            x2 = x + int((size + 8) * math.cos(angle))
-            y2 = y + int((size + 8) * math.sin(angle))
-            
-            draw.line([(x1, y1), (x2, y2)], fill=(255, 255, 220, alpha), width=1)
-    
-    return result
+    return composite_overlay(img, "mystic")
 
 def add_electric_effect(img: Image.Image) -> Image.Image:
-    # Add lightning bolts
-    result = img.copy()
-    draw = ImageDraw.Draw(result)
-    w, h = img.size
-    
-    for _ in range(5):
-        x1 = random.randint(w//4, w*3//4)
-        y1 = 20
-        
-        points = [(x1, y1)]
-        x, y = x1, y1
-        
-        # Create a jagged path
-        while y < h - 20:
-            x += random.randint(-15, 15)
-            y += random.randint(10, 30)
-            
-            x = max(10, min(w-10, x))
-            points.append((x, y))
-        
-        # Draw the lightning
-        for i in range(len(points) - 1):
-            draw.line([points[i], points[i+1]], fill=(255, 255, 0, 180), width=3)
-    
-    return result
+    return composite_overlay(img, "electric")
 
 def add_hypnotic_effect(img: Image.Image) -> Image.Image:
-    # Add hypnotic circles
-    result = img.copy()
-    draw = ImageDraw.Draw(result)
-    w, h = img.size
-    
-    center = (w//2, h//2)
-    for radius in range(10, min(w, h)//2, 15):
-        alpha = 150 - radius
-        if alpha < 30:
-            alpha = 30
-            
-        draw.ellipse(
-            (center[0] - radius, center[1] - radius, 
-             center[0] + radius, center[1] + radius), 
-            outline=(128, 0, 128, alpha), width=3
-        )
-    
-    return result
+    return composite_overlay(img, "hypnotic")
 
 def add_venom_effect(img: Image.Image) -> Image.Image:
-    # Add green drips
-    result = img.copy()
-    draw = ImageDraw.Draw(result)
-    w, h = img.size
-    
-    for _ in range(8):
-        x = random.randint(w//4, w*3//4)
-        y1 = random.randint(h//4, h*3//4)
-        
-        # Draw drip
-        drip_length = random.randint(20, 50)
-        y2 = y1 + drip_length
-        
-        # Draw the drip with gradient
-        for y in range(y1, y2):
-            alpha = 200 - int(((y - y1) / drip_length) * 150)
-            draw.ellipse(
-                (x-3, y-3, x+3, y+3), 
-                fill=(0, 200, 0, alpha)
-            )
-    
-    return result
+    return composite_overlay(img, "venom")
 
 def add_magic_effect(img: Image.Image) -> Image.Image:
     # Combine mystic and glowy effects
     glowy = add_glow_effect(img)
     return add_mystic_effect(glowy)
 
+# Trait name -> effect function used by apply_trait_effect
+TRAIT_EFFECTS = {
+    "winged": add_wings,
+    "singing": add_music_notes,
+    "glowy": add_glow_effect,
+    "spiky": add_spikes,
+    "fluffy": add_fluff,
+    "invisible": make_partially_transparent,
+    "psychic": add_psychic_effect,
+    "metallic": add_metallic_effect,
+    "mystic": add_mystic_effect,
+    "electric": add_electric_effect,
+    "hypnotic": add_hypnotic_effect,
+    "venomous": add_venom_effect,
+    "musical": add_music_notes,
+    "magical": add_magic_effect
+}
+
 def add_pet_stats(img: Image.Image, pet: Dict[str, Any]) -> Image.Image:
     """Add pet stats to the image"""
     result = img.copy()
     draw = ImageDraw.Draw(result)
     w, h = img.size
     
-    # Try to load a font
-    font_path = os.path.join(FONTS_DIR, "default.ttf")
-    try:
-        name_font = ImageFont.truetype(font_path, 24)
-        stats_font = ImageFont.truetype(font_path, 14)
-    except Exception:
-        name_font = ImageFont.load_default()
-        stats_font = ImageFont.load_default()
-    
     # Add a semi-transparent background for text
     draw.rectangle([(0, h-80), (w, h)], fill=(0, 0, 0, 128))
     
-    # Add pet name
-    draw.text((w//2, h-65), pet["name"], fill=(255, 255, 255, 255), font=name_font, anchor="mm")
+    # Add pet name (text layouts come from the shared font cache)
+    draw_text(result, (w//2, h-65), pet["name"], size=24, fill=(255, 255, 255, 255))
     
     # Add pet stats
     stats_text = f"HP: {pet['health']}  Happiness: {pet['happiness']}  STR: {pet['strength']}"
-    draw.text((w//2, h-30), stats_text, fill=(255, 255, 255, 255), font=stats_font, anchor="mm")
+    draw_text(result, (w//2, h-30), stats_text, size=14, fill=(255, 255, 255, 255))
     
     # Add rarity
     if "rarity" in pet:
@@ -815,6 +725,6 @@ def add_pet_stats(img: Image.Image, pet: Dict[str, Any]) -> Image.Image:
             "mythic": (255, 215, 0)
         }
         color = rarity_colors.get(pet["rarity"].lower(), (200, 200, 200))
-        draw.text((w//2, h-15), pet["rarity"].upper(), fill=color + (255,), font=stats_font, anchor="mm")
+        draw_text(result, (w//2, h-15), pet["rarity"].upper(), size=14, fill=color + (255,))
     
     return result 
\ No newline at end of file